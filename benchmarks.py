@@ -0,0 +1,1751 @@
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from .frame_sampler import FrameSampler
+from .screen_source import FileScreenSource, BACKENDS
+from .zone_check import evaluate_zone
+from .change_gate import ChangeGate
+from .scheduler import AdaptiveScheduler
+from . import geometry_detector
+
+
+def _synthetic_source(width=1920, height=1080, color=(68, 80, 95), noise=12):
+    """Создает PNG-источник с шумом вокруг заданного цвета"""
+    rng = np.random.default_rng(0)
+    frame = np.clip(np.asarray(color) + rng.integers(-noise, noise + 1, (height, width, 3)), 0, 255)
+    name = f"benchmark_frame_{width}x{height}_{'_'.join(str(c) for c in color)}.png"
+    path = os.path.join(tempfile.gettempdir(), name)
+    Image.fromarray(frame.astype(np.uint8)).save(path)
+    return FileScreenSource(path)
+
+
+def _measure(func, repeat):
+    """Возвращает среднее время вызова в миллисекундах"""
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def _legacy_zone_check(source, left, top, zone_size, check_step, color, tolerance, min_matches):
+    """Прежняя схема: отдельный захват 1x1 на каждую точку зоны"""
+    matches_found = 0
+    confidence_scores = []
+    for x in range(left, left + zone_size, check_step):
+        for y in range(top, top + zone_size, check_step):
+            pixel = tuple(int(c) for c in source.grab((x, y, 1, 1))[0, 0])
+            simple_match = all(abs(p - c) <= tolerance for p, c in zip(pixel, color))
+            distance = sum((p - c) ** 2 for p, c in zip(pixel, color)) ** 0.5
+            brightness_match = abs(sum(pixel) / 3 - sum(color) / 3) <= tolerance
+            if simple_match or distance <= tolerance * 1.7 or brightness_match:
+                matches_found += 1
+                max_deviation = max(abs(p - c) for p, c in zip(pixel, color))
+                confidence_scores.append(max(0, 100 - (max_deviation * 100 / tolerance)))
+
+    if confidence_scores:
+        avg_confidence = sum(confidence_scores) / len(confidence_scores)
+        return matches_found >= max(1, int(min_matches * (1 - avg_confidence / 100)))
+    return matches_found >= min_matches
+
+
+def benchmark_zone_check(sizes=(15, 51, 151), check_step=3, repeat=200, source=None):
+    """Задержка проверки зоны чата: покадровый захват против одного снимка зоны"""
+    source = source or _synthetic_source()
+    color, tolerance, min_matches = (68, 80, 95), 15, 3
+    center_x, center_y = 400, 900
+    results = []
+
+    for zone_size in sizes:
+        left, top = center_x - zone_size // 2, center_y - zone_size // 2
+        sampler = FrameSampler(source, max_age=0)
+        sampler.set_probe('chat_zone', (left, top, zone_size, zone_size))
+
+        def vectorized():
+            zone = sampler.region(left, top, zone_size, zone_size)
+            return evaluate_zone(zone, color, tolerance, min_matches, check_step)['result']
+
+        def legacy():
+            return _legacy_zone_check(source, left, top, zone_size, check_step,
+                                      color, tolerance, min_matches)
+
+        points = len(range(0, zone_size, check_step)) ** 2
+        results.append({
+            'zone_size': zone_size,
+            'points': points,
+            'legacy_ms': _measure(legacy, max(1, repeat // 10)),
+            'vectorized_ms': _measure(vectorized, repeat),
+            'same_result': legacy() == vectorized()
+        })
+    return results
+
+
+def _legacy_find_input_fields(pixels, width, height):
+    """Прежний поиск полей ввода циклами по np.asarray(image).ravel().tolist()"""
+    def max_line(indices):
+        line_length = max_line_length = 0
+        for idx in indices:
+            brightness = pixels[idx]
+            if brightness < 50 or brightness > 200:
+                line_length += 1
+                max_line_length = max(max_line_length, line_length)
+            else:
+                line_length = 0
+        return max_line_length
+
+    horizontal_lines = sum(
+        1 for y in range(5, height - 5)
+        if max_line(range(y * width, (y + 1) * width)) >= width * 0.4
+    )
+    vertical_lines = sum(
+        1 for x in range(5, width - 5)
+        if max_line(range(x, width * height, width)) >= height * 0.3
+    )
+
+    corners = 0
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            idx = y * width + x
+            if (abs(pixels[idx - 1] - pixels[idx + 1]) > 50 and
+                    abs(pixels[idx - width] - pixels[idx + width]) > 50):
+                corners += 1
+
+    bounded_areas = 0
+    for start_y in range(10, height - 10, 20):
+        for start_x in range(10, width - 10, 20):
+            start_brightness = pixels[start_y * width + start_x]
+            boundaries_found = 0
+            for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                x, y = start_x, start_y
+                for _ in range(30):
+                    x += dx
+                    y += dy
+                    if x < 0 or x >= width or y < 0 or y >= height:
+                        break
+                    if abs(pixels[y * width + x] - start_brightness) > 80:
+                        boundaries_found += 1
+                        break
+            if boundaries_found >= 3:
+                bounded_areas += 1
+
+    rectangles = (1 if corners >= 4 else 0) + min(bounded_areas, 2)
+    input_fields = 0
+    if horizontal_lines >= 2 and vertical_lines >= 2:
+        input_fields += 1
+    if rectangles >= 1:
+        input_fields += 1
+    return min(input_fields, 2)
+
+
+def _synthetic_chat_frames(width=900, height=300):
+    """Набор кадров: пустой фон, шум и поле ввода чата"""
+    rng = np.random.default_rng(1)
+    background = np.full((height, width), 90, dtype=np.uint8)
+
+    noise = np.clip(90 + rng.normal(0, 40, (height, width)), 0, 255).astype(np.uint8)
+
+    chat = background.copy()
+    chat[200:240, 100:800] = 235
+    chat[200, 100:800] = chat[239, 100:800] = 20
+    chat[200:240, 100] = chat[200:240, 799] = 20
+    chat[40:190, 100:800] = 60
+
+    return [Image.fromarray(frame) for frame in (background, noise, chat)]
+
+
+def load_geometry_frames(paths=()):
+    """Загружает сохраненные скриншоты или берет синтетические кадры"""
+    frames = [Image.open(path).convert('L') for path in paths]
+    return frames or _synthetic_chat_frames()
+
+
+def check_geometry_parity(paths=()):
+    """Сверяет векторный поиск полей ввода с прежним на сохраненных скриншотах"""
+    mismatches = []
+    for index, image in enumerate(load_geometry_frames(paths)):
+        width, height = image.size
+        legacy = _legacy_find_input_fields(np.asarray(image).ravel().tolist(), width, height)
+        vectorized = geometry_detector.find_input_fields(geometry_detector.to_gray_array(image))
+        if legacy != vectorized:
+            name = paths[index] if paths else f"synthetic_{index}"
+            mismatches.append((name, legacy, vectorized))
+    return mismatches
+
+
+def benchmark_geometry(paths=(), repeat=20):
+    """Задержка поиска полей ввода на кадре 900x300: циклы Python против NumPy"""
+    results = []
+    for index, image in enumerate(load_geometry_frames(paths)):
+        width, height = image.size
+        gray = geometry_detector.to_gray_array(image)
+        legacy_result = _legacy_find_input_fields(np.asarray(image).ravel().tolist(), width, height)
+        results.append({
+            'frame': os.path.basename(paths[index]) if paths else f"synthetic_{index}",
+            'legacy_ms': _measure(lambda: _legacy_find_input_fields(np.asarray(image).ravel().tolist(), width, height), 1),
+            'vectorized_ms': _measure(lambda: geometry_detector.find_input_fields(
+                geometry_detector.to_gray_array(image)), repeat),
+            'same_result': legacy_result == geometry_detector.find_input_fields(gray)
+        })
+    return results
+
+
+def benchmark_geometry_pyramid(paths=(), ticks=50):
+    """Средняя стоимость тика: только полное разрешение (по умолчанию) против пирамиды с ранним выходом
+
+    Пирамиду стоит включать, только если здесь на своих скриншотах она быстрее и mismatches = 0.
+    """
+    frames = [geometry_detector.to_gray_array(image) for image in load_geometry_frames(paths)]
+    full = geometry_detector.PyramidGeometryDetector()
+    pyramid = geometry_detector.PyramidGeometryDetector({'enabled': True})
+    mismatches = 0
+
+    for tick in range(ticks):
+        gray = frames[tick % len(frames)]
+        if full.detect(gray) != pyramid.detect(gray):
+            mismatches += 1
+
+    results = []
+    for name, detector in (('full', full), ('pyramid', pyramid)):
+        summary = detector.summary()
+        results.append({
+            'mode': name,
+            'ticks': summary['ticks'],
+            'coarse_share': summary['coarse_share'],
+            'full_share': summary['full_share'],
+            'avg_ms': summary['avg_ms'],
+            'mismatches': mismatches
+        })
+    return results
+
+
+def benchmark_change_gate(paths=(), ticks=100, change_every=10):
+    """Стоимость тика геометрии при простое: кадр меняется раз в change_every тиков"""
+    frames = [np.asarray(image) for image in load_geometry_frames(paths)]
+    detector = geometry_detector.PyramidGeometryDetector()
+
+    def run(gate):
+        results = []
+        for tick in range(ticks):
+            frame = frames[(tick // change_every) % len(frames)]
+            compute = lambda: detector.detect(geometry_detector.to_gray_array(frame))
+            results.append(gate.run('chat_geometry', frame, compute) if gate else compute())
+        return results
+
+    gate = ChangeGate()
+    same_result = run(None) == run(gate)
+    return [{
+        'ticks': ticks,
+        'change_every': change_every,
+        'ungated_ms': _measure(lambda: run(None), 1) / ticks,
+        'gated_ms': _measure(lambda: run(ChangeGate()), 1) / ticks,
+        'same_result': same_result
+    }]
+
+
+def benchmark_capture(regions=((1, 1), (15, 15), (151, 151), (900, 300)), repeat=50):
+    """Задержка захвата области для каждого доступного источника экрана"""
+    results = []
+    for name, backend in BACKENDS.items():
+        try:
+            source = _synthetic_source() if name == 'file' else backend()
+        except Exception as e:
+            results.append({'backend': name, 'region': '-', 'ms': f"недоступен: {type(e).__name__}"})
+            continue
+
+        for width, height in regions:
+            region = (400, 700, width, height)
+            try:
+                ms = _measure(lambda: source.grab(region), repeat)
+            except Exception as e:
+                ms = f"ошибка: {type(e).__name__}"
+            results.append({'backend': name, 'region': f"{width}x{height}", 'ms': ms})
+        source.close()
+    return results
+
+
+def _simulate_schedule(min_interval, max_interval, duration, transitions, clicks, keys=(), key_checks=None):
+    """Прогоняет планировщик на виртуальных часах: тики и задержка обнаружения
+
+    Клик ускоряет все проверки, нажатие клавиши - только key_checks (None - все).
+    """
+    clock = [0.0]
+    scheduler = AdaptiveScheduler(clock=lambda: clock[0])
+    state = lambda: sum(1 for t in transitions if t <= clock[0]) % 2 == 1
+    check = scheduler.add('executor', state, min_interval, max_interval)
+
+    events = sorted([(t, None) for t in clicks] + [(t, key_checks) for t in keys])
+    latencies, pending = {}, list(transitions)
+    while clock[0] < duration:
+        next_due = scheduler.next_due()
+        if events and events[0][0] < next_due:
+            clock[0], names = events.pop(0)
+            scheduler.boost(names)
+            continue
+        clock[0] = next_due
+        for due in scheduler.due():
+            changed = scheduler.record(due, due.func(), 0)
+            while pending and pending[0] <= clock[0]:
+                if changed:
+                    latencies[pending[0]] = (clock[0] - pending[0]) * 1000
+                pending.pop(0)
+    return check.stats['ticks'], latencies
+
+
+def benchmark_scheduler(duration=600):
+    """Десять минут смены: фиксированный таймер 100 мс против адаптивного 50-100 мс
+
+    Проверка executor в простое не реже прежнего таймера, поэтому задержка
+    не больше фиксированной. Строки keys: пользователь печатает в чате
+    (нажатие каждые 2 с); при адресном ускорении ('chat', 'chat_point')
+    клавиши не добавляют executor лишних тиков.
+    """
+    # Переходы состояния; перед половиной из них пользователь кликает мышью
+    transitions = [30 + 45 * i + 0.013 * i for i in range(12)]
+    clicks = [t - 0.02 for t in transitions[::2]]
+    keys = [5 + 2 * i for i in range(duration // 2 - 3)]
+    scenarios = (
+        ('fixed', 100, 100, None),
+        ('adaptive', 50, 100, None),
+        ('adaptive+keys all', 50, 100, None),
+        ('adaptive+keys chat', 50, 100, ('chat', 'chat_point')),
+    )
+    results = []
+    fixed = None
+    for name, min_interval, max_interval, key_checks in scenarios:
+        ticks, latencies = _simulate_schedule(min_interval, max_interval, duration, transitions, clicks,
+                                              keys if 'keys' in name else (), key_checks)
+        after_click = [latencies[t] for t in transitions[::2] if t in latencies]
+        without_click = [latencies[t] for t in transitions[1::2] if t in latencies]
+        row = {
+            'mode': name,
+            'ticks': ticks,
+            'ticks_per_min': ticks * 60 / duration,
+            'click_lat_ms': sum(after_click) / max(1, len(after_click)),
+            'idle_lat_ms': sum(without_click) / max(1, len(without_click)),
+            'max_lat_ms': max(latencies.values(), default=0.0)
+        }
+        fixed = fixed or row
+        row['ok'] = (len(latencies) == len(transitions)
+                     and row['click_lat_ms'] <= fixed['click_lat_ms']
+                     and row['idle_lat_ms'] <= fixed['idle_lat_ms']
+                     and row['max_lat_ms'] <= fixed['max_lat_ms'])
+        results.append(row)
+    return results
+
+
+def _wait_for(predicate, timeout=2.0, app=None):
+    """Ждет выполнения условия, при необходимости обрабатывая события Qt"""
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            return False
+        if app is not None:
+            app.processEvents()
+        time.sleep(0.001)
+    return True
+
+
+def check_detection_worker(flips=5, interval=5):
+    """Фоновый поток проверок на Qt offscreen с файловым источником
+
+    Проверяет доставку переходов в GUI-поток, задержку доставки и то,
+    что при занятом GUI несколько изменений схлопываются в последнее.
+    Отдельно: повтор записи из настроек сам идет по кадру на тик.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtCore import QCoreApplication
+    from .detection_worker import DetectionWorker
+    from .screen_source import create_screen_source
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    dark = _synthetic_source(64, 64, color=(20, 20, 20), noise=0)
+    bright = _synthetic_source(64, 64, color=(230, 230, 230), noise=0)
+    source = FileScreenSource(dark.paths + bright.paths)
+
+    sampler = FrameSampler(source, max_age=0)
+    sampler.set_point_probe('probe', 10, 10)
+    worker = DetectionWorker(sampler)
+    received = []
+    worker.state_changed.connect(lambda name, value: received.append(value))
+    worker.add_check('probe', lambda: sampler.pixel(10, 10)[0] > 128, interval)
+    worker.start()
+
+    results = []
+    try:
+        delivered = _wait_for(lambda: received == [False], app=app)
+
+        # Переход доставляется в GUI-поток
+        latencies = []
+        for expected in (True, False, True, False):
+            count = len(received)
+            source.next_frame()
+            started = time.perf_counter()
+            delivered = _wait_for(lambda: len(received) > count, app=app) and delivered
+            latencies.append((time.perf_counter() - started) * 1000)
+            delivered = delivered and received[-1] == expected
+        results.append({
+            'scenario': 'transitions',
+            'deliveries': len(received),
+            'last_value': received[-1],
+            'avg_latency_ms': sum(latencies) / len(latencies),
+            'ok': delivered
+        })
+
+        # GUI занят: события не обрабатываются, пока поток видит все переключения
+        count = len(received)
+        expected = received[-1]
+        for _ in range(flips):
+            source.next_frame()
+            expected = not expected
+            _wait_for(lambda: worker.value('probe') == expected)
+        app.processEvents()
+        results.append({
+            'scenario': 'busy_gui',
+            'deliveries': len(received) - count,
+            'last_value': received[-1],
+            'avg_latency_ms': 0.0,
+            'ok': len(received) - count == 1 and received[-1] == expected
+        })
+    finally:
+        worker.stop()
+
+    # Повтор записи: кадры переключаются тиками проверок, без next_frame
+    replay = tempfile.mkdtemp(prefix='benchmark_replay_')
+    for i, path in enumerate(dark.paths + bright.paths):
+        Image.open(path).save(os.path.join(replay, f"{i:03d}.png"))
+    sampler = FrameSampler(create_screen_source('file', replay=replay), max_age=0)
+    sampler.set_point_probe('probe', 10, 10)
+    worker = DetectionWorker(sampler)
+    replayed = []
+    worker.state_changed.connect(lambda name, value: replayed.append(value))
+    worker.add_check('probe', lambda: sampler.pixel(10, 10)[0] > 128, interval)
+    worker.start()
+    try:
+        started = time.perf_counter()
+        advanced = _wait_for(lambda: len(replayed) >= 3, app=app)
+        elapsed = (time.perf_counter() - started) * 1000
+    finally:
+        worker.stop()
+    try:
+        create_screen_source(settings={'screen_backend': 'file'})
+        rejected = False
+    except ValueError:
+        rejected = True
+    results.append({
+        'scenario': 'replay',
+        'deliveries': len(replayed),
+        'last_value': replayed[-1] if replayed else None,
+        'avg_latency_ms': elapsed,
+        'ok': advanced and replayed[:3] == [False, True, False] and rejected
+    })
+    return results
+
+
+def check_window_tracker():
+    """Трекер окон на ручном источнике событий: смена окна, размер, заголовок, фильтр по процессу"""
+    from .window_tracker import WindowTracker, FakeWindowEventSource
+
+    source = FakeWindowEventSource({
+        1: {'rect': (0, 0, 1920, 1080), 'title': 'RAGE Multiplayer', 'pid': 10},
+        2: {'rect': (100, 100, 900, 700), 'title': 'Браузер', 'pid': 20}
+    }, foreground=1)
+    tracker = WindowTracker(source)
+    events = []
+    tracker.foreground_changed.connect(lambda hwnd, title: events.append(('foreground', hwnd)))
+    tracker.geometry_changed.connect(lambda hwnd, rect: events.append(('geometry', hwnd)))
+    tracker.title_changed.connect(lambda hwnd, title: events.append(('title', hwnd)))
+
+    tracker.start()
+    source.move(1, (0, 0, 1280, 720))
+    source.move(2, (0, 0, 10, 10))       # не активное окно другого процесса - игнорируется
+    source.move(1, (0, 0, 1280, 720))    # размер не изменился - без события
+    source.rename(1, '')                 # заголовок активного окна пропал
+    source.rename(2, 'Браузер - вкладка')  # окно другого процесса - игнорируется
+    title_cleared = tracker.current_title == ''
+    source.set_foreground(2)
+
+    expected = [('foreground', 1), ('geometry', 1), ('geometry', 1), ('title', 1),
+                ('foreground', 2), ('geometry', 2)]
+    return [{
+        'events': len(events),
+        'size': tracker.size(),
+        'watched_pid': source.watched_pid,
+        'ok': events == expected and tracker.size() == (10, 10) and source.watched_pid == 20
+              and title_cleared and tracker.current_title == 'Браузер - вкладка'
+    }]
+
+
+def check_injection_worker(responses=("Здравствуйте, чем могу помочь?", "Приятной игры!"), max_jobs=2):
+    """Поток ввода на записывающем получателе с настоящими паузами
+
+    Сравнивает время, на которое клик занимает GUI-поток, с временем выполнения
+    задания, проверяет текст в имитируемом поле, сигналы и отказ при полной очереди.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtCore import QCoreApplication
+    from .injection_worker import InjectionWorker, RecordingInputSink
+    from . import text_injection
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    sink = RecordingInputSink(clipboard="исходный буфер", real_sleep=True)
+    worker = InjectionWorker(sink, max_jobs=max_jobs)
+    finished, failed = [], []
+    worker.job_finished.connect(lambda job_id, name, result: finished.append(result))
+    worker.job_failed.connect(lambda job_id, name, error: failed.append(error))
+
+    results = []
+    try:
+        for text in responses:
+            count = len(finished)
+            started = time.perf_counter()
+            worker.submit('response', text_injection.send_response, text, (1405, 1033), True)
+            submit_ms = (time.perf_counter() - started) * 1000
+            done = _wait_for(lambda: len(finished) > count, app=app)
+            # Получатель без задержки: буфер возвращается, как только очередь пуста
+            restored = _wait_for(lambda: sink.clipboard == "исходный буфер")
+            results.append({
+                'scenario': 'response',
+                'submit_ms': submit_ms,
+                'run_ms': worker.stats()[-1]['run_ms'],
+                'ok': done and restored and sink.sent[-1] == text
+            })
+
+        # Очередь ограничена: лишние задания отклоняются сразу
+        def slow_job(sink):
+            sink.sleep(0.05)
+
+        ids = [worker.submit('slow', slow_job) for _ in range(max_jobs + 2)]
+        rejected = ids.count(None)
+        count = len(finished)
+        _wait_for(lambda: worker.pending() == 0 and len(finished) - count == len(ids) - rejected, app=app)
+
+        def broken_job(sink):
+            raise RuntimeError("нет окна")
+
+        worker.submit('broken', broken_job)
+        _wait_for(lambda: failed, app=app)
+        results.append({
+            'scenario': 'queue',
+            'submit_ms': 0.0,
+            'run_ms': 0.0,
+            'ok': 0 < rejected <= 2 and failed == ["нет окна"]
+        })
+    finally:
+        worker.stop()
+    return results
+
+
+def _legacy_send_response(sink, text, click_point, auto_enter):
+    """Прежняя отправка ответа: отдельные нажатия с паузами"""
+    def tap(vk):
+        sink.key_down(vk)
+        sink.sleep(0.01)
+        sink.key_up(vk)
+
+    def chord(vk):
+        sink.key_down(0x11)
+        tap(vk)
+        sink.key_up(0x11)
+
+    original_clipboard = sink.get_clipboard()
+    sink.set_clipboard(text)
+    cursor = sink.cursor_pos()
+    sink.click(*click_point)
+    sink.move_to(*cursor)
+    chord(ord('V'))
+    chord(ord('A'))
+    sink.sleep(0.01)
+    chord(ord('C'))
+    sink.sleep(0.1)
+    sink.get_clipboard()
+    tap(0x27)
+    if auto_enter:
+        sink.sleep(0.01)
+        tap(0x0D)
+    sink.set_clipboard(original_clipboard)
+
+
+def benchmark_input_plan(text="Здравствуйте, чем могу помочь?", repeat=5):
+    """Отправка ответа: нажатия с паузами против пакетов SendInput по плану
+
+    Записывающий получатель выполняет паузы по-настоящему; ожидание буфера
+    после Ctrl+C у него мгновенное, как у окна, которое успевает скопировать.
+    """
+    from .injection_worker import RecordingInputSink
+    from . import text_injection, input_plan
+
+    rows = []
+    for mode, send in (('legacy', _legacy_send_response), ('plan', text_injection.send_response)):
+        sinks = []
+
+        def run():
+            sink = RecordingInputSink(real_sleep=True)
+            send(sink, text, (1405, 1033), True)
+            sinks.append(sink)
+
+        elapsed = _measure(run, repeat)
+        sink = sinks[-1]
+        rows.append({
+            'mode': mode,
+            'ms': elapsed,
+            'keys': len(sink.keys()),
+            'sendinput': sink.batches,
+            'sent_ok': sink.sent == [text]
+        })
+
+    # План сериализуется: точная последовательность проверяется без Windows
+    plan = input_plan.paste_plan().extend(input_plan.finish_plan(auto_enter=True))
+    expected = [['down', 0x11], ['down', 0x56], ['up', 0x56], ['up', 0x11],
+                ['down', 0x27], ['up', 0x27], ['down', 0x0D], ['up', 0x0D]]
+    rows[-1]['sent_ok'] = rows[-1]['sent_ok'] and plan.to_list() == expected \
+        and input_plan.InputPlan.from_list(plan.to_list()) == plan
+    return rows
+
+
+def benchmark_typing(lengths=(8, 24, 48, 64, 96, 160), repeat=20):
+    """Набор символами Unicode против вставки через буфер по длине ответа
+
+    Для каждого способа: время подготовки и отправки на записывающем получателе,
+    число событий SendInput и обращений к буферу обмена. Тексты на кириллице.
+    """
+    from .injection_worker import RecordingInputSink
+    from . import text_injection
+
+    phrase = "Здравствуйте, администрация рассмотрит ваш репорт 🙂 "
+    rows = []
+    for length in lengths:
+        text = (phrase * (length // len(phrase) + 1))[:length]
+        for mode in ('paste', 'type'):
+            sinks = []
+
+            def run():
+                sink = RecordingInputSink(clipboard="исходный буфер", english_layout=False)
+                text_injection.send_text(sink, text, (1405, 1033), True, mode)
+                sink.clipboard_session.restore()
+                sinks.append(sink)
+
+            elapsed = _measure(run, repeat)
+            sink = sinks[-1]
+            rows.append({
+                'length': length,
+                'mode': mode,
+                'auto': text_injection.choose_injection_mode(text) == mode,
+                'ms': elapsed,
+                'events': len(sink.keys()),
+                'clipboard_ops': sink.clipboard_reads + sum(1 for e in sink.events if e[0] == 'clipboard'),
+                'ok': sink.sent == [text] and sink.clipboard == "исходный буфер"
+            })
+    return rows
+
+
+def check_clipboard_session(burst=4, restore_delay=0.2):
+    """Сессия буфера обмена на серии ответов через поток ввода
+
+    Серия из burst ответов: один снимок и одно восстановление всех форматов
+    (текст и картинка) после паузы. Вторая серия: пользователь копирует свое
+    во время паузы - снимок отбрасывается, буфер не затирается.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtCore import QCoreApplication
+    from .injection_worker import InjectionWorker, RecordingInputSink
+    from .clipboard_session import CF_UNICODETEXT
+    from . import text_injection
+
+    CF_DIB = 8
+    app = QCoreApplication.instance() or QCoreApplication([])
+    sink = RecordingInputSink(real_sleep=True, restore_delay=restore_delay)
+    backend = sink.clipboard_session.backend
+    original = {CF_UNICODETEXT: "скриншот".encode('utf-16-le') + b'\0\0', CF_DIB: bytes(range(256)) * 64}
+    backend.restore(original)
+
+    worker = InjectionWorker(sink)
+    finished = []
+    worker.job_finished.connect(lambda job_id, name, result: finished.append(result))
+    session = sink.clipboard_session
+
+    results = []
+    try:
+        for scenario in ('burst', 'user_copy'):
+            count = len(finished)
+            started = time.perf_counter()
+            for i in range(burst):
+                worker.submit('response', text_injection.send_response, f"Ответ {i}", (1405, 1033), False)
+            _wait_for(lambda: len(finished) - count == burst, app=app)
+            sent_ms = (time.perf_counter() - started) * 1000
+
+            if scenario == 'user_copy':
+                backend.set_text("скопировал пользователь")
+            _wait_for(lambda: not session.active, timeout=restore_delay * 5)
+            metrics = session.metrics()
+
+            if scenario == 'burst':
+                ok = backend.formats == original and metrics['restored'] == 1
+            else:
+                ok = backend.get_text() == "скопировал пользователь" and metrics['dropped'] == 1
+            results.append({
+                'scenario': scenario,
+                'sends': burst,
+                'sessions': metrics['sessions'],
+                'sent_ms': sent_ms,
+                'snapshot_ms': metrics['snapshot_ms'],
+                'restore_ms': metrics['restore_ms'],
+                'ok': ok and metrics['sends_per_session'] == burst
+            })
+    finally:
+        worker.stop()
+    return results
+
+
+def check_paste_verification(sends=8, every=4, copy_delay=0.02):
+    """Политики проверки вставки через поток ввода
+
+    Задержка отправки - от постановки задания до сигнала о его завершении;
+    окно кладет скопированный текст в буфер через copy_delay. Вставки
+    с автоотправкой проверяются только с inline (сценарии +inline).
+    Отдельно: потерянная вставка перед Enter восстанавливается повтором,
+    потерянная вставка без автоотправки дает сигнал mismatch без повтора,
+    а проверка после отправки пропускается, если пользователь переключил
+    окно (switched) или начал печатать (typed).
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtCore import QCoreApplication
+    from .injection_worker import InjectionWorker, RecordingInputSink
+    from .paste_verifier import PasteVerifier, VerificationPolicy
+    from . import text_injection
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    text = "Здравствуйте, администрация рассмотрит ваш репорт в ближайшее время. Ожидайте ответа."
+
+    def run(policy, auto_enter, lost_pastes=0, count=sends, between=None):
+        sink = RecordingInputSink(real_sleep=True, copy_delay=copy_delay, lost_pastes=lost_pastes)
+        worker = InjectionWorker(sink)
+        verifier = PasteVerifier(policy)
+        finished, mismatches = {}, []
+        worker.job_finished.connect(lambda job_id, name, result: finished.setdefault(job_id, time.perf_counter()))
+        verifier.mismatch.connect(lambda expected, got: mismatches.append(got))
+
+        latencies = []
+        submitted = 0
+        try:
+            for _ in range(count):
+                # Без автоотправки администратор отправляет поле сам
+                sink.field = ""
+                placement = verifier.placement('paste', auto_enter)
+                started = time.perf_counter()
+                job_id = worker.submit('response', text_injection.send_response, text, (1405, 1033),
+                                       auto_enter, verifier if placement == 'inline' else None)
+                submitted += 1
+                if placement == 'after':
+                    # Действие пользователя между отправкой и проверкой
+                    if between:
+                        worker.submit('user', lambda sink: between(sink))
+                        submitted += 1
+                    worker.submit('verify', verifier.verify_job, text, sink.foreground_window())
+                    submitted += 1
+                _wait_for(lambda: job_id in finished, app=app)
+                latencies.append((finished[job_id] - started) * 1000)
+                # Следующая отправка - после проверки предыдущей
+                _wait_for(lambda: len(finished) == submitted, app=app)
+            app.processEvents()
+        finally:
+            worker.stop()
+        return sink, verifier, latencies, mismatches
+
+    rows = []
+    for mode in ('off', 'sampled', 'always'):
+        for auto_enter, inline in ((False, False), (True, False), (True, True)):
+            sink, verifier, latencies, _ = run(VerificationPolicy(mode, every, inline=inline), auto_enter)
+            expected_sent = [text] * sends if auto_enter else []
+            expected_checked = {'off': 0, 'sampled': sends // every, 'always': sends}[mode]
+            if auto_enter and not inline:
+                expected_checked = 0
+            rows.append({
+                'scenario': f"{mode}{' +enter' if auto_enter else ''}{' +inline' if inline else ''}",
+                'send_ms': sum(latencies) / len(latencies),
+                'max_send_ms': max(latencies),
+                'checked': verifier.stats['checked'],
+                'failed': verifier.stats['failed'],
+                'ok': sink.sent == expected_sent and verifier.stats['retried'] == 0
+                      and verifier.stats['checked'] == expected_checked
+            })
+
+    sink, verifier, latencies, mismatches = run(VerificationPolicy('always', inline=True), True,
+                                                lost_pastes=1, count=1)
+    rows.append({
+        'scenario': 'retry',
+        'send_ms': latencies[0],
+        'max_send_ms': latencies[0],
+        'checked': verifier.stats['checked'],
+        'failed': verifier.stats['failed'],
+        'ok': sink.sent == [text] and verifier.stats['recovered'] == 1 and not mismatches
+    })
+
+    sink, verifier, latencies, mismatches = run(VerificationPolicy('always'), False, lost_pastes=1, count=1)
+    rows.append({
+        'scenario': 'mismatch',
+        'send_ms': latencies[0],
+        'max_send_ms': latencies[0],
+        'checked': verifier.stats['checked'],
+        'failed': verifier.stats['failed'],
+        'ok': verifier.stats['failed'] == 1 and verifier.stats['retried'] == 0 and mismatches == [""]
+    })
+
+    def switch_window(sink):
+        sink.layout.backend.foreground += 1
+
+    for scenario, between in (('switched', switch_window), ('typed', lambda sink: sink.user_type(" ok"))):
+        sink, verifier, latencies, mismatches = run(VerificationPolicy('always'), False, count=1,
+                                                    between=between)
+        rows.append({
+            'scenario': scenario,
+            'send_ms': latencies[0],
+            'max_send_ms': latencies[0],
+            'checked': verifier.stats['checked'],
+            'failed': verifier.stats['failed'],
+            # Поле пользователя не трогается: ни Ctrl+A, ни повторной вставки
+            'ok': verifier.stats['skipped'] == 1 and verifier.stats['checked'] == 0 and not mismatches
+                  and ('down', ord('A')) not in sink.events
+    })
+    return rows
+
+
+def benchmark_coord_mapper(points=((719, 317), (300, 320), (22, 330), (1405, 1033)),
+                           sizes=((1920, 1080), (1280, 720)), switches=1000, lookups=20):
+    """Пересчет точек: размер окна и формула на каждый вызов против кэша с переключениями окна"""
+    from .coord_mapper import CoordinateMapper
+    from .window_tracker import WindowTracker, FakeWindowEventSource
+
+    source = FakeWindowEventSource({1: {'rect': (0, 0) + sizes[0]}}, foreground=1)
+    tracker = WindowTracker(source)
+    tracker.start()
+
+    def legacy_normalize(x, y):
+        window_width, window_height = tracker.size()
+        return (int(x * window_width / 1920), int(y * window_height / 1080))
+
+    def legacy():
+        for i in range(switches):
+            source.move(1, (0, 0) + sizes[i % len(sizes)])
+            for _ in range(lookups):
+                for x, y in points:
+                    legacy_normalize(x, y)
+
+    mapper = CoordinateMapper()
+    mapper.set_points(points)
+
+    def cached():
+        for i in range(switches):
+            mapper.set_size(sizes[i % len(sizes)])
+            for _ in range(lookups):
+                for x, y in points:
+                    mapper.map(x, y)
+
+    legacy_ms = _measure(legacy, 1)
+    cached_ms = _measure(cached, 1)
+    calls = switches * lookups * len(points)
+    ok = all(mapper.map(x, y) == (int(x * sizes[-1][0] / 1920), int(y * sizes[-1][1] / 1080))
+             for x, y in points)
+    return [{
+        'calls': calls,
+        'legacy_us': legacy_ms * 1000 / calls,
+        'cached_us': cached_ms * 1000 / calls,
+        'builds': mapper.stats['resolution_builds'],
+        'misses': mapper.stats['misses'],
+        'ok': ok
+    }]
+
+
+def benchmark_macro(repeat=50):
+    """Макрос кнопки: компиляция и выполнение против трех отдельных отправок
+
+    Приветствие набирается символами, ответ вставляется, команда уходит Enter.
+    Число макросов в секунду - на записывающем получателе без реальных пауз.
+    """
+    from .injection_worker import RecordingInputSink
+    from . import text_injection, macro_engine
+
+    greeting = "Здравствуйте!"
+    answer = "Администрация рассмотрит ваш репорт в ближайшее время, ожидайте ответа в личных сообщениях."
+    command = "/tp 123"
+    steps = [
+        macro_engine.parse_step('text', greeting, True),
+        macro_engine.parse_step('text', answer, True),
+        macro_engine.parse_step('command', command),
+    ]
+    expected = [greeting, answer, command]
+
+    def separate(sink):
+        text_injection.send_text(sink, greeting, (1405, 1033), True)
+        text_injection.send_text(sink, answer, (1405, 1033), True)
+        text_injection.send_command(sink, command)
+
+    compiled = macro_engine.compile_macro('benchmark', steps)
+    compile_us = _measure(lambda: macro_engine.compile_macro('benchmark', steps), repeat) * 1000
+
+    rows = []
+    for mode, run_one in (('separate', separate),
+                          ('macro', lambda sink: macro_engine.run_macro(sink, compiled))):
+        sinks = []
+
+        def run():
+            sink = RecordingInputSink(clipboard="исходный буфер")
+            run_one(sink)
+            sink.clipboard_session.restore()
+            sinks.append(sink)
+
+        elapsed = _measure(run, repeat)
+        sink = sinks[-1]
+        rows.append({
+            'mode': mode,
+            'compile_us': compile_us if mode == 'macro' else 0.0,
+            'run_ms': elapsed,
+            'per_second': 1000 / elapsed if elapsed else 0.0,
+            'sendinput': sink.batches,
+            'sent_ok': sink.sent == expected and sink.clipboard == "исходный буфер"
+        })
+    return rows
+
+
+def _peak_in_window(times, window):
+    """Наибольшее число отправок в любом окне длиной window секунд"""
+    times = sorted(times)
+    return max((sum(1 for t in times[i:] if t - start < window) for i, start in enumerate(times)), default=0)
+
+
+def _settled_before_enter(events):
+    """После каждого Ctrl+V до Enter есть пауза"""
+    pasted = settled = False
+    for event in events:
+        if event == ('down', ord('V')):
+            pasted, settled = True, False
+        elif event[0] == 'sleep' and pasted:
+            settled = True
+        elif event == ('down', 0x0D):
+            if pasted and not settled:
+                return False
+            pasted = False
+    return True
+
+
+def check_send_queue(rate=3, per=0.3, burst=1, dedupe_window=0.2):
+    """Очередь чат-команд: пачка кликов с двойным кликом без очереди и через нее
+
+    Проверяет, что в любом окне per секунд уходит не больше burst + rate - 1 строк, повтор
+    отбрасывается, а поток ввода не спит в ожидании жетона: ответ, поставленный
+    после пачки команд, выполняется сразу (other_ms - его ожидание в очереди потока).
+    Между Ctrl+V и Enter каждой команды должна быть пауза, пока окно читает буфер.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtCore import QCoreApplication
+    from .injection_worker import InjectionWorker, RecordingInputSink
+    from .send_queue import SendQueue
+    from . import text_injection
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    clicks = ["/re 1", "/re 1", "/tp 5", "/a на месте", "/re 2", "/re 3", "/hp 1"]
+    unique = list(dict.fromkeys(clicks))
+
+    sink = RecordingInputSink(real_sleep=True)
+    started = time.perf_counter()
+    times = []
+    for command in clicks:
+        text_injection.send_command(sink, command)
+        times.append(time.perf_counter())
+    rows = [{
+        'mode': 'direct',
+        'sent': len(sink.sent),
+        'peak': _peak_in_window(times, per),
+        'total_ms': (times[-1] - started) * 1000,
+        'wait_ms_avg': 0.0,
+        'other_ms': 0.0,
+        'max_depth': 0,
+        'ok': sink.sent == clicks and _settled_before_enter(sink.events)
+    }]
+
+    sink = RecordingInputSink(real_sleep=True)
+    worker = InjectionWorker(sink)
+    send_queue = SendQueue(worker, rate, per, burst, dedupe_window)
+    # Отправки идут ровно через per / rate: окно на 1 мс короче, чтобы не считать дрожание таймера
+    window = per - 0.001
+    try:
+        started = time.perf_counter()
+        for command in clicks:
+            send_queue.submit(command)
+        # Ответ кнопки, нажатой, пока команды ждут лимит
+        time.sleep(0.01)
+        worker.submit('response', lambda sink: None)
+        _wait_for(lambda: send_queue.stats['sent'] == len(unique), timeout=5.0, app=app)
+        metrics = send_queue.metrics()
+        times = [entry['sent_at'] for entry in send_queue.history]
+        other_ms = next(job['queue_ms'] for job in worker.stats() if job['name'] == 'response')
+        settle = max((event[1] for event in sink.events if event[0] == 'sleep'), default=0.0)
+        rows.append({
+            'mode': 'queue',
+            'sent': len(sink.sent),
+            'peak': _peak_in_window(times, window),
+            'total_ms': (times[-1] - started) * 1000 if times else 0.0,
+            'wait_ms_avg': metrics['wait_ms_avg'],
+            'other_ms': other_ms,
+            'max_depth': metrics['max_depth'],
+            'ok': sink.sent == unique and _settled_before_enter(sink.events) and metrics['deduped'] == 1
+                  and _peak_in_window(times, window) <= burst + rate - 1 and metrics['depth'] == 0
+                  and other_ms < per / rate * 1000 / 2 and settle < per / rate
+        })
+    finally:
+        worker.stop()
+    return rows
+
+
+def benchmark_pointer(target=(1405, 1033), cursor=(300, 200), repeat=5):
+    """Клик по полю ввода: вызовы pyautogui с паузами против одного пакета SendInput и клика сообщением
+
+    Прежний путь повторен на записывающем получателе с паузой pyautogui.PAUSE (0.1 с)
+    после каждого moveTo. post_fallback - под точкой не окно игры.
+    """
+    from .injection_worker import RecordingInputSink
+    from .pointer_actions import click_plan
+    from . import input_plan
+
+    def legacy(sink):
+        original = sink.cursor_pos()
+        sink.move_to(*target)
+        sink.sleep(0.1)
+        sink.click(*target)
+        sink.move_to(*original)
+        sink.sleep(0.1)
+
+    scenarios = (
+        ('legacy', {}, legacy),
+        ('sendinput', {}, lambda sink: sink.pointer.click(target)),
+        ('post', {'pointer_mode': 'post'}, lambda sink: sink.pointer.click(target)),
+        ('post_fallback', {'pointer_mode': 'post', 'post_clicks': False}, lambda sink: sink.pointer.click(target)),
+    )
+    rows = []
+    for name, options, click in scenarios:
+        sinks = []
+
+        def run():
+            sink = RecordingInputSink(real_sleep=True, **options)
+            sink.cursor = cursor
+            click(sink)
+            sinks.append(sink)
+
+        elapsed = _measure(run, repeat)
+        sink = sinks[-1]
+        rows.append({
+            'mode': name,
+            'ms': elapsed,
+            'sendinput': sink.batches,
+            'moves': sum(1 for event in sink.events if event[0] == 'move'),
+            'ok': sink.clicks[-1][:2] == target and sink.cursor == cursor
+        })
+
+    # Координаты пакета: пиксели переводятся в 0..65535 виртуального рабочего стола
+    inputs = input_plan.build_inputs(click_plan((960, 540), (0, 0)).steps, (0, 0, 1920, 1080))
+    flags = [item.mi.dwFlags for item in inputs]
+    rows[1]['ok'] = rows[1]['ok'] and (inputs[0].mi.dx, inputs[0].mi.dy) == (32785, 32798) \
+        and flags == [0xC001, 0x0002, 0x0004, 0xC001] and (inputs[3].mi.dx, inputs[3].mi.dy) == (0, 0) \
+        and all(item.type == input_plan.INPUT_MOUSE for item in inputs)
+    return rows
+
+
+def check_layout_tracker(sends=10):
+    """Раскладка при отправке: запрос и Shift наугад на каждую отправку против кэша и явного переключения
+
+    Пользователь работает в русской раскладке. Проверяется раскладка окна
+    в момент Ctrl+V и возврат раскладки пользователя после серии отправок
+    (в потоке ввода - по простою очереди, здесь - явно в конце), в том числе
+    у макроса и когда окно применяет запрос смены раскладки с задержкой.
+    """
+    from .injection_worker import RecordingInputSink
+    from .layout_tracker import ENGLISH_HKL, RUSSIAN_HKL, ENGLISH_LANGID
+    from . import text_injection, input_plan, macro_engine
+
+    text = "Администрация рассмотрит ваш репорт в ближайшее время, ожидайте ответа."
+
+    def legacy(sink):
+        backend = sink.layout.backend
+        toggle = (backend.get_layout(backend.foreground) & 0xFFFF) != ENGLISH_LANGID
+        sink.set_clipboard(text)
+        sink.pointer.click((1405, 1033))
+        plan = input_plan.InputPlan()
+        if toggle:
+            plan.tap(input_plan.VK_SHIFT).wait(10)
+        input_plan.execute(plan.extend(input_plan.paste_plan()).extend(input_plan.finish_plan(True)), sink)
+
+    rows = []
+    for name, english, send in (('legacy', False, legacy),
+                                ('tracker', False, lambda sink: text_injection.send_response(sink, text, (1405, 1033), True)),
+                                ('tracker_en', True, lambda sink: text_injection.send_response(sink, text, (1405, 1033), True))):
+        sink = RecordingInputSink(english_layout=english, real_sleep=True)
+        backend = sink.layout.backend
+        user_layout = ENGLISH_HKL if english else RUSSIAN_HKL
+        started = time.perf_counter()
+        for _ in range(sends):
+            send(sink)
+        elapsed = (time.perf_counter() - started) * 1000 / sends
+        sink.layout.restore()
+        english_pastes = sum(1 for layout in sink.paste_layouts if layout == ENGLISH_HKL)
+        rows.append({
+            'mode': name,
+            'ms': elapsed,
+            'queries': backend.queries,
+            'switches': len(backend.requests),
+            'english_pastes': english_pastes,
+            'ok': sink.sent == [text] * sends and backend.layouts[backend.foreground] == user_layout
+                  and english_pastes == sends
+        })
+
+    # Макрос вставляет текст так же, как обычная отправка
+    macro = macro_engine.compile_macro('macro', [{'type': 'text', 'text': text, 'enter': True}])
+    sink = RecordingInputSink(english_layout=False)
+    backend = sink.layout.backend
+    started = time.perf_counter()
+    for _ in range(sends):
+        macro_engine.run_macro(sink, macro)
+    elapsed = (time.perf_counter() - started) * 1000 / sends
+    sink.layout.restore()
+    rows.append({
+        'mode': 'macro',
+        'ms': elapsed,
+        'queries': backend.queries,
+        'switches': len(backend.requests),
+        'english_pastes': sum(1 for layout in sink.paste_layouts if layout == ENGLISH_HKL),
+        'ok': sink.paste_layouts == [ENGLISH_HKL] * sends and backend.layouts[backend.foreground] == RUSSIAN_HKL
+    })
+
+    # Окно применяет запрос не сразу: обновление кэша до этого не считается выбором пользователя
+    sink = RecordingInputSink(english_layout=False)
+    backend = sink.layout.backend
+    delivered = []
+    backend.request_layout = lambda hwnd, hkl: delivered.append((hwnd, hkl))
+    sink.layout.switch_to_english()
+    sink.layout.refresh()
+    stale_kept = sink.layout.is_english()
+    for hwnd, hkl in delivered:
+        backend.layouts[hwnd] = hkl
+    sink.layout.refresh()
+    sink.layout.restore()
+    rows.append({
+        'mode': 'async',
+        'ms': 0.0,
+        'queries': backend.queries,
+        'switches': len(delivered),
+        'english_pastes': 0,
+        'ok': stale_kept and delivered[-1] == (backend.foreground, RUSSIAN_HKL) and len(delivered) == 2
+    })
+
+    # В потоке ввода раскладка возвращается сама, когда очередь простаивает
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtCore import QCoreApplication
+    from .injection_worker import InjectionWorker
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    sink = RecordingInputSink(english_layout=False, restore_delay=0.05)
+    backend = sink.layout.backend
+    worker = InjectionWorker(sink, max_jobs=sends)
+    try:
+        started = time.perf_counter()
+        for _ in range(sends):
+            worker.submit('response', text_injection.send_response, text, (1405, 1033), True)
+        restored = _wait_for(lambda: len(sink.sent) == sends and backend.layouts[backend.foreground] == RUSSIAN_HKL,
+                             app=app)
+        rows.append({
+            'mode': 'worker',
+            'ms': (time.perf_counter() - started) * 1000 / sends,
+            'queries': backend.queries,
+            'switches': len(backend.requests),
+            'english_pastes': sum(1 for layout in sink.paste_layouts if layout == ENGLISH_HKL),
+            'ok': restored and len(backend.requests) == 2
+        })
+    finally:
+        worker.stop()
+    return rows
+
+
+def benchmark_response_pool(sizes=(5, 100, 500), clicks=5000):
+    """Выбор ответа кнопки: разбор списка и random.choice на клик против мешка ответов
+
+    repeats - сколько раз подряд выпал тот же ответ; max_gap - наибольшее число
+    кликов, за которое какой-то ответ так и не выпал. Строки weighted - мешки
+    с весами не больше половины мешка: повторов подряд быть не должно, в каждом
+    мешке ответ выпадает столько раз, каков его вес.
+    """
+    import random
+    from .response_pool import ResponsePool
+
+    def max_gap(sequence, size):
+        last, gap = {}, 0
+        for i, response in enumerate(sequence):
+            gap = max(gap, i - last.get(response, -1))
+            last[response] = i
+        return max(gap, *(len(sequence) - last.get(f"Ответ {j}", -1) for j in range(size)))
+
+    rows = []
+    for size in sizes:
+        responses = [f"  Ответ {i}  " for i in range(size)] + ["", "   "]
+        rng = random.Random(0)
+
+        def legacy():
+            valid_responses = [r for r in responses if r.strip()]
+            return random.choice(valid_responses).strip()
+
+        pool = ResponsePool(responses, rng=rng)
+        for name, pick in (('legacy', legacy), ('pool', pool.next)):
+            random.seed(0)
+            started = time.perf_counter()
+            sequence = [pick() for _ in range(clicks)]
+            elapsed = (time.perf_counter() - started) * 1e6 / clicks
+            rows.append({
+                'responses': size,
+                'mode': name,
+                'pick_us': elapsed,
+                'repeats': sum(1 for a, b in zip(sequence, sequence[1:]) if a == b),
+                'max_gap': max_gap(sequence, size),
+                'ok': name == 'legacy' or (len(pool) == size and all(
+                    len(set(sequence[i:i + size])) == size for i in range(0, clicks - size + 1, size)))
+            })
+
+    for weights in ([2, 2, 2], [3, 2, 2, 1, 1, 1], [5, 3, 1, 1]):
+        responses = [f"Ответ {i}" for i in range(len(weights))]
+        pool = ResponsePool(responses, weights, rng=random.Random(0))
+        size = sum(weights)
+        started = time.perf_counter()
+        sequence = [pool.next() for _ in range(clicks - clicks % size)]
+        elapsed = (time.perf_counter() - started) * 1e6 / len(sequence)
+        expected = dict(zip(responses, weights))
+        repeats = sum(1 for a, b in zip(sequence, sequence[1:]) if a == b)
+        rows.append({
+            'responses': len(weights),
+            'mode': 'weighted ' + '/'.join(map(str, weights)),
+            'pick_us': elapsed,
+            'repeats': repeats,
+            'max_gap': max_gap(sequence, len(weights)),
+            'ok': repeats == 0 and all(
+                all(sequence[i:i + size].count(r) == w for r, w in expected.items())
+                for i in range(0, len(sequence), size))
+        })
+    return rows
+
+
+def benchmark_startup(sizes=(10, 100, 1000)):
+    """Загрузка панели кнопок: add_button с сохранением после каждой кнопки против batch()
+
+    writes - сколько раз переписан файл кнопок; us_per_button должно оставаться
+    почти постоянным с ростом числа кнопок. Нужны Windows и PyQt6.
+    """
+    import json
+    from PyQt6.QtWidgets import QApplication, QWidget
+    from . import button_editor
+    from .settings_store import SettingsStore
+
+    app = QApplication.instance() or QApplication([])
+
+    class CountingPanel(button_editor.BasePanel):
+        def save_buttons(self):
+            if not self._batch_depth:
+                self.writes = getattr(self, 'writes', 0) + 1
+            super().save_buttons()
+
+        def load_default_buttons(self):
+            # Замер начинается с пустой панели
+            pass
+
+    rows = []
+    for size in sizes:
+        # Панели берут хранилище у родителя, так что настоящая папка настроек не трогается
+        host = QWidget()
+        host.settings_store = SettingsStore(tempfile.mkdtemp(prefix='benchmark_startup_'))
+        settings_dir = host.settings_store.settings_dir
+        try:
+            # Позиции по столбцам, как их раскладывает find_free_grid_position
+            items = [{'name': f"Кнопка {i}", 'description': f"Ответ {i}",
+                      'position': [i % 9, i // 9]} for i in range(size)]
+            config_file = os.path.join(settings_dir, "button_config.json")
+
+            # Старый путь: каждая кнопка сохраняет весь файл
+            panel = CountingPanel(host)
+            panel.writes = 0
+            started = time.perf_counter()
+            for item in items:
+                panel.add_button(item['name'], item['description'], tuple(item['position']))
+            legacy_ms = (time.perf_counter() - started) * 1000
+            rows.append({'buttons': size, 'mode': 'legacy', 'ms': legacy_ms,
+                         'us_per_button': legacy_ms * 1000 / size, 'writes': panel.writes,
+                         'ok': len(panel.button_data) == size})
+            panel.deleteLater()
+            host.settings_store.writer.flush()
+
+            # Загрузка при запуске: один пакет и одна запись файла
+            with open(config_file, 'w', encoding='utf-8') as f:
+                json.dump(items, f)
+            started = time.perf_counter()
+            panel = CountingPanel(host)
+            load_ms = (time.perf_counter() - started) * 1000
+            positions = {data['position'] for data in panel.button_data.values()}
+            rows.append({'buttons': size, 'mode': 'batch', 'ms': load_ms,
+                         'us_per_button': load_ms * 1000 / size, 'writes': getattr(panel, 'writes', 0),
+                         'ok': len(panel.button_data) == size and len(positions) == size
+                         and panel.writes == 1})
+
+            # Новые кнопки без позиции в пакете занимают свободные клетки
+            with panel.batch():
+                for i in range(size, size + 20):
+                    panel.add_button(f"Кнопка {i}", "")
+            positions = {data['position'] for data in panel.button_data.values()}
+            rows[-1]['ok'] = rows[-1]['ok'] and len(positions) == size + 20 and panel.writes == 2
+            panel.deleteLater()
+            app.processEvents()
+        finally:
+            host.settings_store.writer.stop()
+            host.deleteLater()
+    return rows
+
+
+def benchmark_config_writer(buttons=100, ticks=120, interval=0.004):
+    """Перетаскивание слайдера ширины: запись двух JSON на каждый шаг против ConfigWriter
+
+    tick_ms - время шага в GUI-потоке; writes - сколько раз записаны файлы.
+    Проверяется и сбой посреди записи: прежний файл цел, временных файлов не остается.
+    """
+    import json
+    from .config_writer import ConfigWriter
+
+    directory = tempfile.mkdtemp(prefix='benchmark_config_')
+    config_file = os.path.join(directory, "button_config.json")
+    size_file = os.path.join(directory, "main_size_settings.json")
+
+    def snapshot(width):
+        return [{'name': f"Кнопка {i}", 'description': f"Ответ {i} " * 10, 'position': [i % 9, i // 9],
+                 'width': width, 'height': 40} for i in range(buttons)]
+
+    def legacy_write(path, data):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    writer = ConfigWriter(delay=0.1, max_delay=0.5)
+
+    def deferred_write(path, data):
+        writer.write_json(path, data, indent=2, ensure_ascii=False)
+
+    rows = []
+    for name, write in (('legacy', legacy_write), ('writer', deferred_write)):
+        tick_total = tick_max = 0.0
+        for tick in range(ticks):
+            width = 90 + tick
+            started = time.perf_counter()
+            write(config_file, snapshot(width))
+            write(size_file, {'width': width, 'height': 40, 'row_spacing': 5})
+            elapsed = (time.perf_counter() - started) * 1000
+            tick_total += elapsed
+            tick_max = max(tick_max, elapsed)
+            time.sleep(interval)
+        if name == 'writer':
+            writer.flush()
+        with open(config_file, encoding='utf-8') as f:
+            saved = json.load(f)
+        metrics = writer.metrics()
+        rows.append({
+            'mode': name,
+            'tick_ms': tick_total / ticks,
+            'tick_ms_max': tick_max,
+            'writes': ticks * 2 if name == 'legacy' else metrics['written'],
+            'latency_ms_max': metrics['latency_ms_max'] if name == 'writer' else 0.0,
+            'ok': saved[0]['width'] == 90 + ticks - 1
+        })
+
+    # Сбой сериализации: прежний файл не тронут
+    writer.write_json(config_file, {'broken': object()})
+    writer.flush()
+    with open(config_file, encoding='utf-8') as f:
+        intact = json.load(f)[0]['width'] == 90 + ticks - 1
+
+    # Изменение данных на месте после запроса: в файл попадает снимок на момент запроса
+    advanced = {'responses': ["Ответ 1"], 'weights': [1]}
+    writer.write_json(size_file, {'advanced': advanced})
+    advanced['responses'] = ["Ответ 1", "Ответ 2"]
+    advanced['extra'] = True
+    writer.flush()
+    with open(size_file, encoding='utf-8') as f:
+        snapshot_ok = json.load(f) == {'advanced': {'responses': ["Ответ 1"], 'weights': [1]}}
+    writer.stop()
+    metrics = writer.metrics()
+    rows.append({
+        'mode': 'failure',
+        'tick_ms': 0.0,
+        'tick_ms_max': 0.0,
+        'writes': metrics['failed'],
+        'latency_ms_max': 0.0,
+        'ok': intact and snapshot_ok and metrics['failed'] == 1 and
+              not [f for f in os.listdir(directory) if f.endswith('.tmp')]
+    })
+    return rows
+
+
+def check_settings_store(repeat=50):
+    """Запуск: каждый компонент читает свой файл настроек против одной загрузки хранилища
+
+    reads - сколько раз файлы открывались и разбирались за один запуск.
+    Проверяется и запись: update сохраняет чужие ключи, сигнал changed приходит,
+    файл на диске совпадает с памятью.
+    """
+    import json
+    from .settings_store import SettingsStore, SETTINGS_FILES
+
+    directory = tempfile.mkdtemp(prefix='benchmark_settings_')
+    contents = {
+        'app_settings.json': {'executor_enabled': True, 'screen_backend': 'auto', 'pointer_mode': 'post',
+                              'clipboard_restore_delay': 1.5, 'chat_rate_limit': 3,
+                              'click_coordinates': [22, 330]},
+        'color_settings.json': {'check_coords': [270, 320], 'required_color': [68, 68, 68], 'tolerance': 10},
+        'chat_detection_settings.json': {'chat_check_coords': [100, 100], 'chat_required_color': [68, 80, 95],
+                                         'geometry_pyramid': {'levels': 3}},
+        'hotkey_settings.json': {'chat_commands': {'key': 'F1', 'description': "Открыть чат команды"}},
+        'main_size_settings.json': {'width': 120, 'height': 40, 'row_spacing': 5},
+        'chat_size_settings.json': {'width': 120, 'height': 30, 'row_spacing': 5},
+        'button_width.cfg': "120",
+    }
+    for name, value in contents.items():
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            f.write(json.dumps(value) if name.endswith('.json') else value)
+
+    # Сколько раз каждый файл читался при запуске до хранилища
+    legacy_reads = {
+        'app_settings.json': 7,
+        'chat_detection_settings.json': 2,
+        'button_width.cfg': 2,
+        'color_settings.json': 1,
+        'hotkey_settings.json': 1,
+        'main_size_settings.json': 1,
+        'chat_size_settings.json': 1,
+    }
+
+    def legacy():
+        for name, count in legacy_reads.items():
+            for _ in range(count):
+                path = os.path.join(directory, name)
+                if os.path.exists(path):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        json.load(f) if name.endswith('.json') else f.read().strip()
+
+    def stored():
+        store = SettingsStore(directory)
+        for name, count in legacy_reads.items():
+            for _ in range(count):
+                store.get(name)
+        return store
+
+    legacy_ms = _measure(legacy, repeat)
+    store_ms = _measure(stored, repeat)
+    store = stored()
+    rows = [
+        {'mode': 'legacy', 'ms': legacy_ms, 'scans': 0, 'reads': sum(legacy_reads.values()), 'ok': True},
+        {'mode': 'store', 'ms': store_ms, 'scans': store.stats['scans'], 'reads': store.stats['parses'],
+         'ok': store.stats['scans'] == 1 and store.stats['parses'] == len(SETTINGS_FILES)}
+    ]
+
+    changes = []
+    store.changed.connect(lambda name, value: changes.append(name))
+    store.update('app_settings.json', {'executor_enabled': False})
+    store.set('button_width.cfg', "150")
+    store.writer.flush()
+    store.writer.stop()
+    with open(os.path.join(directory, 'app_settings.json'), encoding='utf-8') as f:
+        saved = json.load(f)
+    with open(os.path.join(directory, 'button_width.cfg'), encoding='utf-8') as f:
+        width = f.read()
+    rows.append({
+        'mode': 'write',
+        'ms': 0.0,
+        'scans': store.stats['scans'],
+        'reads': store.stats['parses'],
+        'ok': saved == dict(contents['app_settings.json'], executor_enabled=False) and width == "150"
+              and changes == ['app_settings.json', 'button_width.cfg'] and store.stats['parses'] == len(SETTINGS_FILES)
+    })
+    return rows
+
+
+def benchmark_button_reload(buttons=500, saves=5):
+    """Перезагрузка файла кнопок: пересоздание всех кнопок против применения разницы
+
+    В файле меняются пять кнопок (добавление, удаление, переименование, перенос,
+    новый текст). created - сколько кнопок создано заново. Проверяется и
+    наблюдение за файлом: несколько записей подряд дают один сигнал.
+    """
+    import json
+    from PyQt6.QtCore import QEventLoop, QTimer
+    from PyQt6.QtWidgets import QApplication, QGridLayout, QPushButton, QWidget
+    from . import button_diff
+    from .file_watcher import DebouncedFileWatcher
+
+    app = QApplication.instance() or QApplication([])
+    directory = tempfile.mkdtemp(prefix='benchmark_reload_')
+    path = os.path.join(directory, "button_config.json")
+
+    items = [{'name': f"Кнопка {i}", 'description': f"Ответ {i}", 'position': [i % 9, i // 9],
+              'width': 120, 'height': 40} for i in range(buttons)]
+    edited = [dict(item) for item in items]
+    edited[1]['name'] = "Кнопка 1 (новая)"
+    edited[2]['position'] = [0, buttons // 9 + 2]
+    edited[3]['description'] = "Новый ответ"
+    del edited[4]
+    edited.append({'name': "Кнопка новая", 'description': "Ответ", 'position': [1, buttons // 9 + 2],
+                   'width': 120, 'height': 40})
+
+    def write(data):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    created = []
+
+    def make_button(name):
+        created.append(name)
+        btn = QPushButton(name)
+        btn.setFixedSize(120, 20)
+        btn.setStyleSheet("QPushButton { background-color: #3A3A3A; color: white; }")
+        return btn
+
+    def build(layout, entries):
+        widgets = {}
+        for name, entry in entries.items():
+            widgets[name] = make_button(name)
+            layout.addWidget(widgets[name], *entry['position'])
+        return widgets
+
+    rows = []
+    for mode in ('rebuild', 'diff'):
+        container = QWidget()
+        layout = QGridLayout(container)
+        write(items)
+        entries = button_diff.load_button_entries(path)
+        widgets = build(layout, entries)
+        kept = dict(widgets)
+        app.processEvents()
+        write(edited)
+        created.clear()
+
+        started = time.perf_counter()
+        new_entries = button_diff.load_button_entries(path)
+        if mode == 'rebuild':
+            for widget in widgets.values():
+                layout.removeWidget(widget)
+                widget.deleteLater()
+            widgets = build(layout, new_entries)
+            diff = button_diff.diff_buttons(entries, new_entries)
+        else:
+            diff = button_diff.diff_buttons(entries, new_entries)
+            button_diff.apply_grid_diff(layout, widgets, diff, new_entries, make_button)
+        app.processEvents()
+        elapsed = (time.perf_counter() - started) * 1000
+
+        positions_ok = all(layout.itemAtPosition(*entry['position']).widget() is widgets[name]
+                           for name, entry in new_entries.items())
+        rows.append({
+            'mode': mode,
+            'ms': elapsed,
+            'created': len(created),
+            'kept': sum(1 for name, widget in widgets.items() if kept.get(name) is widget),
+            'diff': ' '.join(f"{key}={len(value)}" for key, value in diff.items() if value),
+            'ok': positions_ok and len(widgets) == len(new_entries) and
+                  diff['renamed'] == [("Кнопка 1", "Кнопка 1 (новая)")] and len(diff['moved']) == 1
+        })
+        container.deleteLater()
+
+    # Несколько сохранений подряд: один сигнал после паузы
+    watcher = DebouncedFileWatcher(path, delay_ms=150)
+    signals = []
+    watcher.changed.connect(lambda changed_path: signals.append(time.perf_counter()))
+    for i in range(saves):
+        write(items if i % 2 else edited)
+        app.processEvents()
+        time.sleep(0.02)
+    last_write = time.perf_counter()
+    loop = QEventLoop()
+    QTimer.singleShot(600, loop.quit)
+    loop.exec()
+    watcher.stop()
+    rows.append({
+        'mode': 'watch',
+        'ms': (signals[0] - last_write) * 1000 if signals else 0.0,
+        'created': 0,
+        'kept': 0,
+        'diff': f"events={watcher.stats['events']}",
+        'ok': len(signals) == 1
+    })
+    return rows
+
+
+def benchmark_response_library(sizes=(100, 1000, 10000), repeat=20, limit=45):
+    """Поиск ответа: перебор всех кнопок против индекса FTS5 библиотеки ответов
+
+    Запросы: редкое слово, частый префикс с редким словом и слово, которого нет.
+    search_us - среднее время одного запроса, get_us - чтение настроек кнопки
+    при нажатии. sync_ms - повторный импорт после правки одной кнопки (так
+    библиотека догоняет сохраненный файл в GUI-потоке), full_ms - тот же импорт
+    с полной перезаписью таблицы. ok - те же кнопки, что и у перебора, а у
+    библиотеки еще и совпадение экспорта с исходным списком.
+    """
+    import re
+    from .response_library import ResponseLibrary
+
+    words = ["привет", "жалоба", "репорт", "правила", "администратор", "игрок", "ожидайте", "наказание"]
+    rows = []
+    for size in sizes:
+        items = [{
+            'name': f"Кнопка {i}",
+            'description': f"{words[i % len(words)]} {words[(i * 3) % len(words)]} номер{i}",
+            'position': [i % 9, i // 9],
+            'width': 120,
+            'height': 20,
+        } for i in range(size)]
+        for i in range(0, size, 5):
+            items[i]['advanced'] = {'response_count': 2, 'responses': [f"вариант{i} ожидайте", f"ответ{i}"]}
+        queries = [f"номер{size - 7}", f"ожид вариант{size - 5}", "несуществующее", "жалоба"]
+
+        def legacy(query):
+            query_words = re.findall(r'\w+', query.lower())
+            found = []
+            for item in items:
+                responses = ' '.join((item.get('advanced') or {}).get('responses', []))
+                tokens = re.findall(r'\w+', f"{item['name']} {item['description']} {responses}".lower())
+                if all(any(token.startswith(word) for token in tokens) for word in query_words):
+                    found.append(item['name'])
+                    if len(found) == limit:
+                        break
+            return found
+
+        library = ResponseLibrary()
+        started = time.perf_counter()
+        library.import_items(items)
+        import_ms = (time.perf_counter() - started) * 1000
+
+        # Правка одной кнопки в середине файла и полная перезапись той же таблицы
+        edited = size // 2
+        items[edited] = dict(items[edited], description=items[edited]['description'] + " изменено")
+        written = library.stats['rows_written']
+        started = time.perf_counter()
+        library.import_items(items)
+        sync_ms = (time.perf_counter() - started) * 1000
+        sync_rows = library.stats['rows_written'] - written
+        full = ResponseLibrary()
+        full.import_items(items[1:] + items[:1])
+        started = time.perf_counter()
+        full.import_items(items)
+        full_ms = (time.perf_counter() - started) * 1000
+        full_ok = full.export_items() == items
+        full.close()
+
+        expected = {query: legacy(query) for query in queries}
+        by_name = {item['name']: item.get('advanced') for item in items}
+        names = [item['name'] for item in items[::max(1, size // 100)]]
+        for name, search, get in (('legacy', legacy, by_name.get),
+                                  ('library', lambda q: list(library.search(q, limit)),
+                                   lambda button: library.get(button)['advanced'])):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                results = {query: search(query) for query in queries}
+            elapsed = (time.perf_counter() - started) * 1e6 / (repeat * len(queries))
+            started = time.perf_counter()
+            settings = [get(button) for button in names]
+            get_us = (time.perf_counter() - started) * 1e6 / len(names)
+            rows.append({
+                'buttons': size,
+                'mode': name,
+                'import_ms': import_ms if name == 'library' else 0.0,
+                'sync_ms': sync_ms if name == 'library' else 0.0,
+                'full_ms': full_ms if name == 'library' else 0.0,
+                'search_us': elapsed,
+                'get_us': get_us,
+                'found': ' '.join(str(len(results[query])) for query in queries),
+                'ok': results == expected and settings == [by_name[button] for button in names]
+                      and (name == 'legacy' or (library.export_items() == items and sync_rows == 2
+                                                and full_ok))
+            })
+        library.close()
+    return rows
+
+
+def _print_table(title, rows):
+    print(title)
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    print("  ".join(f"{c:>14}" for c in columns))
+    for row in rows:
+        print("  ".join(f"{row[c]:>14.3f}" if isinstance(row[c], float) else f"{str(row[c]):>14}"
+                        for c in columns))
+    print()
+
+
+BENCHMARKS = {
+    'zone': ("Проверка зоны чата", benchmark_zone_check),
+    'geometry': ("Поиск полей ввода чата", benchmark_geometry),
+    'pyramid': ("Пирамида поиска полей ввода", benchmark_geometry_pyramid),
+    'gate': ("Пропуск детектора без изменений кадра", benchmark_change_gate),
+    'capture': ("Захват области экрана по источникам", benchmark_capture),
+    'worker': ("Фоновый поток проверок", check_detection_worker),
+    'scheduler': ("Адаптивный планировщик проверок", benchmark_scheduler),
+    'tracker': ("Отслеживание активного окна", check_window_tracker),
+    'coords': ("Кэш пересчета координат по размеру окна", benchmark_coord_mapper),
+    'injection': ("Фоновый поток ввода", check_injection_worker),
+    'plan': ("Пакетная отправка нажатий", benchmark_input_plan),
+    'typing': ("Набор символами против вставки", benchmark_typing),
+    'clipboard': ("Сессия буфера обмена на серию отправок", check_clipboard_session),
+    'verify': ("Политики проверки вставки", check_paste_verification),
+    'macro': ("Макросы кнопок", benchmark_macro),
+    'sendqueue': ("Очередь чат-команд с лимитом", check_send_queue),
+    'pointer': ("Клик с возвратом курсора", benchmark_pointer),
+    'layout': ("Кэш раскладки клавиатуры", check_layout_tracker),
+    'pool': ("Мешки ответов кнопок", benchmark_response_pool),
+    'startup': ("Загрузка панели кнопок", benchmark_startup),
+    'config': ("Отложенная запись настроек", benchmark_config_writer),
+    'settings': ("Хранилище настроек в памяти", check_settings_store),
+    'reload': ("Перезагрузка файла кнопок", benchmark_button_reload),
+    'library': ("Поиск в библиотеке ответов", benchmark_response_library),
+}
+
+# Бенчмарки, которые принимают пути к сохраненным скриншотам
+USES_SCREENSHOTS = {'geometry', 'pyramid', 'gate'}
+
+
+def main(argv=None):
+    """Запуск: python -m scripts.benchmarks [имя ...] [скриншот.png ...]"""
+    args = argv if argv is not None else sys.argv[1:]
+    paths = [a for a in args if a.lower().endswith(('.png', '.jpg', '.bmp'))]
+    names = [a for a in args if a not in paths] or list(BENCHMARKS)
+
+    failed = []
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Неизвестный бенчмарк: {name}. Доступны: {', '.join(BENCHMARKS)}")
+            continue
+        title, func = BENCHMARKS[name]
+        # Бенчмарки, которым нужны модули Windows, на других системах пропускаются,
+        # а ошибка одного бенчмарка не мешает запустить остальные
+        try:
+            rows = func(paths) if name in USES_SCREENSHOTS else func()
+        except ImportError as e:
+            print(f"{title}: пропущен, нет модуля {e.name or e}\n")
+            continue
+        except Exception as e:
+            failed.append(name)
+            print(f"{title}: ошибка {type(e).__name__}: {e}\n")
+            continue
+        _print_table(title, rows)
+
+    if 'geometry' in names:
+        mismatches = check_geometry_parity(paths)
+        print("Сверка геометрии: " + ("OK" if not mismatches else f"расхождения {mismatches}"))
+
+    if failed:
+        print(f"С ошибкой: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import json
+import logging
+
+
+# Поля записи кнопки, которые сравниваются при перезагрузке файла
+ENTRY_FIELDS = ('description', 'position', 'width', 'height', 'advanced')
+
+
+def parse_button_entries(data):
+    """Записи кнопок из списка файла кнопок: имя -> description, position, width, height, advanced
+
+    Записи без имени пропускаются, из повторов остается первая - как при загрузке панели.
+    """
+    entries = {}
+    for item in data or []:
+        if not isinstance(item, dict):
+            continue
+        name = item.get('name')
+        if not isinstance(name, str) or not name or name in entries:
+            continue
+        entries[name] = {
+            'description': item.get('description', ''),
+            'position': tuple(item.get('position', (0, 0))),
+            'width': item.get('width'),
+            'height': item.get('height'),
+            'advanced': item.get('advanced')
+        }
+    return entries
+
+
+def load_button_entries(path):
+    """Записи кнопок из JSON-файла; None, если файл не читается (например, записан не до конца)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return parse_button_entries(json.load(f))
+    except Exception as e:
+        logging.error(f"Ошибка чтения файла кнопок {path}: {e}")
+        return None
+
+
+def diff_buttons(old, new):
+    """Разница двух наборов кнопок
+
+    Возвращает словарь списков: added и removed (имена), renamed (старое, новое имя),
+    moved (имя, старая, новая позиция) и changed (имена с другим описанием или настройками).
+    Пропавшая и появившаяся кнопка считаются переименованной, если у них
+    совпадает позиция или, при отсутствии такой пары, описание.
+    """
+    removed = [name for name in old if name not in new]
+    added = [name for name in new if name not in old]
+
+    def match_key(entry, key):
+        value = entry.get(key)
+        return tuple(value) if isinstance(value, list) else value
+
+    renamed = []
+    for key in ('position', 'description'):
+        candidates = {}
+        for name in removed:
+            candidates.setdefault(match_key(old[name], key), []).append(name)
+        for name in list(added):
+            matches = candidates.get(match_key(new[name], key))
+            if matches:
+                old_name = matches.pop(0)
+                renamed.append((old_name, name))
+                removed.remove(old_name)
+                added.remove(name)
+
+    moved, changed = [], []
+    pairs = [(name, name) for name in new if name in old] + renamed
+    for old_name, name in pairs:
+        before, after = old[old_name], new[name]
+        if tuple(before.get('position', (0, 0))) != tuple(after.get('position', (0, 0))):
+            moved.append((name, tuple(before.get('position', (0, 0))), tuple(after.get('position', (0, 0)))))
+        if any(before.get(field) != after.get(field) for field in ENTRY_FIELDS if field != 'position'):
+            changed.append(name)
+
+    return {
+        'added': added,
+        'removed': removed,
+        'renamed': renamed,
+        'moved': moved,
+        'changed': changed
+    }
+
+
+def is_empty(diff):
+    """Нет ни одного изменения"""
+    return not any(diff.values())
+
+
+def apply_grid_diff(layout, widgets, diff, entries, create_widget):
+    """Приводит кнопки сетки к entries, трогая только изменившиеся
+
+    widgets - словарь имя -> виджет, обновляется на месте; create_widget(name)
+    создает кнопку для новой записи. Удаленные кнопки убираются, переименованные
+    получают новый текст, сдвинутые переставляются, новые добавляются.
+    """
+    for name in diff['removed']:
+        widget = widgets.pop(name, None)
+        if widget:
+            layout.removeWidget(widget)
+            widget.deleteLater()
+
+    for old_name, name in diff['renamed']:
+        widget = widgets.pop(old_name, None)
+        if widget:
+            widget.setText(name)
+            widget.button_name = name
+            widgets[name] = widget
+
+    for name, _, position in diff['moved']:
+        widget = widgets.get(name)
+        if widget:
+            layout.removeWidget(widget)
+            layout.addWidget(widget, *position)
+
+    for name in diff['added']:
+        widget = create_widget(name)
+        widget.button_name = name
+        widgets[name] = widget
+        layout.addWidget(widget, *entries[name]['position'])
@@ -1,4 +1,5 @@
-from PyQt6.QtWidgets import QTableWidget, QTableWidgetItem, QDialog, QGroupBox, QSpinBox, QCheckBox, QTextEdit, QTabWidget, QLineEdit, QSlider
+from PyQt6.QtWidgets import QTableWidget, QTableWidgetItem, QDialog, QGroupBox, QSpinBox, QCheckBox, QTextEdit, QTabWidget, QLineEdit, QSlider, QComboBox
+from PyQt6.QtWidgets import QListWidget, QListWidgetItem
 from PyQt6.QtWidgets import QMainWindow, QWidget, QHBoxLayout, QMessageBox, QPushButton, QApplication, QVBoxLayout, QLabel, QScrollArea
 
 from PyQt6.QtCore import Qt, QPoint, QPropertyAnimation, QEasingCurve, pyqtSignal, QObject, QEvent, QTimer, QMimeData
@@ -10,19 +11,35 @@ from .buttons_panel import ButtonsPanel
 from .styles import set_dark_theme
 from .draggable_button import DraggableButton
 from .button_executor import ButtonExecutor
+from .frame_sampler import FrameSampler
+from .screen_source import create_screen_source
+from .detection_worker import DetectionWorker
+from .injection_worker import InjectionWorker, create_input_sink
+from .clipboard_session import load_restore_delay
+from .paste_verifier import PasteVerifier, load_verification_policy
+from .send_queue import SendQueue, load_send_queue_settings
+from .window_tracker import WindowTracker, create_window_event_source
+from .coord_mapper import CoordinateMapper
+from .pointer_actions import load_pointer_mode
+from .settings_store import get_base_path, get_settings_store
+from .response_library import create_response_library
+from .file_watcher import DebouncedFileWatcher
+from . import text_injection
+from . import macro_engine
+from . import response_pool
 
 import json
 import os
-import sys
 
 import pyautogui
 import time
 import keyboard
-from pathlib import Path
+from contextlib import contextmanager
 import win32gui
 import win32process
 import psutil
 import logging
+import threading
 
 logging.basicConfig(
     level=logging.INFO,
@@ -30,15 +47,6 @@ logging.basicConfig(
     filename='button_executor.log'
 )
 
-def get_base_path():
-    """Возвращает правильный базовый путь для всех режимов работы"""
-    if getattr(sys, 'frozen', False):
-        # Режим EXE - берем папку, где лежит исполняемый файл
-        return os.path.dirname(sys.executable)
-    else:
-        # Режим разработки - берем папку проекта (ATools)
-        return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
 class BasePanel(QWidget):
     """Базовый класс для панелей Ответы и Чат команды"""
     
@@ -48,8 +56,10 @@ class BasePanel(QWidget):
         self.is_chat_commands = is_chat_commands
         self.supports_advanced_settings = not is_chat_commands
         self.base_path = get_base_path()
-        self.settings_dir = os.path.join(self.base_path, "scripts", "settings")
+        self.settings_store = getattr(parent, 'settings_store', None) or get_settings_store()
+        self.settings_dir = self.settings_store.settings_dir
         os.makedirs(self.settings_dir, exist_ok=True)
+        self.config_writer = self.settings_store.writer
         
         # Определяем файл конфигурации в зависимости от типа панели
         if is_chat_commands:
@@ -63,8 +73,19 @@ class BasePanel(QWidget):
             
         self.button_data = {}
         self.advanced_settings = {}
+        self.compiled_macros = {}
+        self.response_pools = {}
+        # Настройки, из которых собраны мешок и макрос кнопки (см. response_pool, compiled_macro)
+        self._pool_settings = {}
+        self._macro_steps = {}
         self.current_button = None
         
+        # Пакетное изменение: вложенность, отложенное сохранение и занятые клетки сетки
+        self._batch_depth = 0
+        self._batch_dirty = False
+        self._batch_occupied = None
+        self._batch_scan = 0
+        
         # Настройки размеров по умолчанию
         self.button_width = 120
         self.button_height = 40
@@ -139,8 +160,33 @@ class BasePanel(QWidget):
                 ("Фикс микрофона", "Исправить проблемы с микрофоном"),
             ]
         
-        for name, desc in default_buttons:
-            self.add_button(name, desc)
+        with self.batch():
+            for name, desc in default_buttons:
+                self.add_button(name, desc)
+
+    @contextmanager
+    def batch(self):
+        """Пакетное изменение кнопок
+
+        Внутри блока save_buttons только отмечает изменения, а файл пишется один раз
+        при выходе из внешнего блока. Свободные клетки ищутся по множеству занятых
+        позиций без обхода сетки, перерисовка панели отключена до конца блока.
+        """
+        self._batch_depth += 1
+        if self._batch_depth == 1:
+            self._batch_occupied = {data['position'] for data in self.button_data.values()}
+            self._batch_scan = 0
+            self.buttons_panel.setUpdatesEnabled(False)
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._batch_occupied = None
+                self.buttons_panel.setUpdatesEnabled(True)
+                if self._batch_dirty:
+                    self._batch_dirty = False
+                    self.save_buttons()
 
     def add_button(self, name, description="", position=None):
         """Добавляет новую кнопку"""
@@ -154,7 +200,7 @@ class BasePanel(QWidget):
         if position is None:
             position = self.find_free_grid_position()
 
-        while self.buttons_panel.buttons_layout.itemAtPosition(*position):
+        while not self.is_position_free(position):
             position = self.find_free_grid_position()
 
         try:
@@ -175,16 +221,35 @@ class BasePanel(QWidget):
                 "widget": btn,
                 "position": position
             }
+            if self._batch_occupied is not None:
+                self._batch_occupied.add(position)
             
             self.save_buttons()
         except Exception as e:
             logging.error(f"Ошибка создания кнопки '{name}': {e}")
 
+    def is_position_free(self, position):
+        """Свободна ли клетка сетки (в пакете - по множеству занятых позиций)"""
+        if self._batch_occupied is not None:
+            return position not in self._batch_occupied
+        return not self.buttons_panel.buttons_layout.itemAtPosition(*position)
+
     def find_free_grid_position(self):
         """Находит свободную позицию в сетке"""
         max_rows = self.buttons_panel.max_rows
         current_columns = self.buttons_panel.current_columns
         
+        if self._batch_occupied is not None:
+            # В пакете клетки только занимаются: продолжаем поиск с прошлой свободной
+            while True:
+                col, row = divmod(self._batch_scan, max_rows)
+                if (row, col) not in self._batch_occupied:
+                    break
+                self._batch_scan += 1
+            while col >= self.buttons_panel.current_columns:
+                self.buttons_panel.add_column()
+            return (row, col)
+        
         for col in range(current_columns):
             for row in range(max_rows):
                 if not self.buttons_panel.buttons_layout.itemAtPosition(row, col):
@@ -394,7 +459,10 @@ class BasePanel(QWidget):
         self.save_buttons()
 
     def save_buttons(self):
-        """Сохраняет кнопки в файл"""
+        """Сохраняет кнопки в файл; внутри batch() - один раз в конце пакета"""
+        if self._batch_depth:
+            self._batch_dirty = True
+            return
         try:
             data_to_save = []
             for name, data in self.button_data.items():
@@ -415,8 +483,7 @@ class BasePanel(QWidget):
                     
                 data_to_save.append(button_info)
             
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, indent=2, ensure_ascii=False)
+            self.config_writer.write_json(self.config_file, data_to_save, indent=2, ensure_ascii=False)
                 
         except Exception as e:
             logging.error(f"Ошибка сохранения кнопок: {e}")
@@ -431,7 +498,9 @@ class BasePanel(QWidget):
                 data = json.load(f)
                 if not data:
                     return
-                    
+            
+            # Файл пишется один раз в конце загрузки, а не после каждой кнопки
+            with self.batch():
                 for item in data:
                     name = item.get('name')
                     if not isinstance(name, str) or not name:
@@ -449,10 +518,43 @@ class BasePanel(QWidget):
                         self.button_data[name]['height'] = item.get('height', self.button_height)
                         if item.get('advanced'):
                             self.advanced_settings[name] = item['advanced']
+            
+            # Макросы и мешки ответов компилируются один раз при загрузке; с библиотекой
+            # ответов исполнитель берет настройки из нее и собирает их при первом нажатии
+            if not getattr(self.parent, 'response_library', None):
+                self.compiled_macros = macro_engine.compile_macros(self.advanced_settings)
+                self.response_pools = response_pool.compile_pools(self.advanced_settings)
+                self._pool_settings = {name: self.advanced_settings[name] for name in self.response_pools}
+                self._macro_steps = {name: self.advanced_settings[name]['macro'] for name in self.compiled_macros}
                             
         except Exception as e:
             logging.error(f"Ошибка загрузки кнопок: {e}")
 
+    def response_pool(self, name, settings):
+        """Мешок ответов кнопки с настройками settings или None, если ответ один
+
+        Собранный мешок переиспользуется, пока настройки те же; иначе (первое
+        нажатие с библиотекой ответов, правка файла кнопок) собирается заново.
+        """
+        if settings.get('response_count', 1) <= 1:
+            return None
+        pool = self.response_pools.get(name)
+        if pool is None or self._pool_settings.get(name) != settings:
+            pool = self.response_pools[name] = response_pool.compile_pool(settings)
+            self._pool_settings[name] = settings
+        return pool
+
+    def compiled_macro(self, name, settings):
+        """Скомпилированный макрос кнопки с настройками settings или None; кэшируется как мешок"""
+        steps = settings.get('macro')
+        if not steps:
+            return None
+        macro = self.compiled_macros.get(name)
+        if macro is None or self._macro_steps.get(name) != steps:
+            macro = self.compiled_macros[name] = macro_engine.compile_macro(name, steps)
+            self._macro_steps[name] = steps
+        return macro
+
     def update_all_buttons_width(self, value):
         """Обновляет ширину всех кнопок"""
         self.button_width = max(80, value)
@@ -498,40 +600,39 @@ class BasePanel(QWidget):
                 'row_spacing': self.row_spacing
             }
             
-            size_file = os.path.join(self.settings_dir, f"{'chat' if self.is_chat_commands else 'main'}_size_settings.json")
-            with open(size_file, 'w', encoding='utf-8') as f:
-                json.dump(size_settings, f, indent=2, ensure_ascii=False)
+            self.settings_store.set(self.size_settings_name(), size_settings)
                 
         except Exception as e:
             logging.error(f"Ошибка сохранения настроек размеров: {e}")
 
+    def size_settings_name(self):
+        """Файл настроек размеров панели"""
+        return f"{'chat' if self.is_chat_commands else 'main'}_size_settings.json"
+
     def load_size_settings(self):
         """Загружает настройки размеров"""
         try:
-            size_file = os.path.join(self.settings_dir, f"{'chat' if self.is_chat_commands else 'main'}_size_settings.json")
-            if os.path.exists(size_file):
-                with open(size_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                    
-                    self.button_width = settings.get('width', 120)
-                    self.button_height = settings.get('height', 40)
-                    self.row_spacing = settings.get('row_spacing', 5)
-                    
-                    # Применяем настройки к layout
-                    self.buttons_panel.buttons_layout.setVerticalSpacing(self.row_spacing)
-                    
-                    # Обновляем слайдеры если они есть
-                    if hasattr(self, 'settings_panel'):
-                        if hasattr(self.settings_panel, 'width_slider'):
-                            self.settings_panel.width_slider.setValue(self.button_width)
-                            self.settings_panel.width_value.setText(f"{self.button_width} px")
-                        if hasattr(self.settings_panel, 'height_slider'):
-                            self.settings_panel.height_slider.setValue(self.button_height)
-                            self.settings_panel.height_value.setText(f"{self.button_height} px")
-                        if hasattr(self.settings_panel, 'spacing_slider'):
-                            self.settings_panel.spacing_slider.setValue(self.row_spacing)
-                            self.settings_panel.spacing_value.setText(f"{self.row_spacing} px")
-                            
+            settings = self.settings_store.get(self.size_settings_name())
+            if settings:
+                self.button_width = settings.get('width', 120)
+                self.button_height = settings.get('height', 40)
+                self.row_spacing = settings.get('row_spacing', 5)
+                
+                # Применяем настройки к layout
+                self.buttons_panel.buttons_layout.setVerticalSpacing(self.row_spacing)
+                
+                # Обновляем слайдеры если они есть
+                if hasattr(self, 'settings_panel'):
+                    if hasattr(self.settings_panel, 'width_slider'):
+                        self.settings_panel.width_slider.setValue(self.button_width)
+                        self.settings_panel.width_value.setText(f"{self.button_width} px")
+                    if hasattr(self.settings_panel, 'height_slider'):
+                        self.settings_panel.height_slider.setValue(self.button_height)
+                        self.settings_panel.height_value.setText(f"{self.button_height} px")
+                    if hasattr(self.settings_panel, 'spacing_slider'):
+                        self.settings_panel.spacing_slider.setValue(self.row_spacing)
+                        self.settings_panel.spacing_value.setText(f"{self.row_spacing} px")
+                        
         except Exception as e:
             logging.error(f"Ошибка загрузки настроек размеров: {e}")
 
@@ -552,6 +653,8 @@ class BasePanel(QWidget):
                 'response_count': 1,
                 'count_reports': False,
                 'auto_enter': False,
+                'injection_mode': 'auto',
+                'macro': [],
                 'responses': [self.settings_panel.btn_desc_edit.toPlainText()]
             }
         
@@ -560,7 +663,7 @@ class BasePanel(QWidget):
         # Создаем окно настроек
         self.advanced_settings_window = QWidget()
         self.advanced_settings_window.setWindowTitle(f"Расширенные настройки: {self.current_button}")
-        self.advanced_settings_window.setFixedSize(400, 300 if settings['response_count'] == 1 else 350)
+        self.advanced_settings_window.setFixedSize(400, 540 if settings['response_count'] == 1 else 590)
         
         layout = QVBoxLayout()
         layout.setContentsMargins(15, 15, 15, 15)
@@ -570,12 +673,12 @@ class BasePanel(QWidget):
         response_group = QGroupBox("Настройки ответов")
         response_layout = QVBoxLayout()
         
-        # Настройка количества ответов (максимум 5)
+        # Настройка количества ответов
         count_layout = QHBoxLayout()
-        count_layout.addWidget(QLabel("Кол-во ответов (1-5):"))
+        count_layout.addWidget(QLabel(f"Кол-во ответов (1-{response_pool.MAX_RESPONSES}):"))
         
         self.response_count_input = QSpinBox()
-        self.response_count_input.setRange(1, 5)
+        self.response_count_input.setRange(1, response_pool.MAX_RESPONSES)
         self.response_count_input.setValue(settings['response_count'])
         self.response_count_input.valueChanged.connect(self.update_response_fields)
         count_layout.addWidget(self.response_count_input)
@@ -585,6 +688,8 @@ class BasePanel(QWidget):
         # Поля для ответов (только если ответов > 1)
         if settings['response_count'] > 1:
             self.response_fields = []
+            self.response_weights = []
+            self.response_rows = []
             self.response_scroll = QScrollArea()
             self.response_scroll.setWidgetResizable(True)
             
@@ -592,8 +697,9 @@ class BasePanel(QWidget):
             self.response_container_layout = QVBoxLayout(response_container)
             
             # Заполняем поля ответов
+            weights = settings.get('weights', [])
             for i, response in enumerate(settings['responses']):
-                self.add_response_field(i, response)
+                self.add_response_field(i, response, weights[i] if i < len(weights) else 1)
             
             self.response_scroll.setWidget(response_container)
             response_layout.addWidget(self.response_scroll)
@@ -610,10 +716,26 @@ class BasePanel(QWidget):
         self.auto_enter_check.setChecked(settings['auto_enter'])
         layout.addWidget(self.auto_enter_check)
         
+        # Способ ввода: набор символами не трогает буфер обмена
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("Способ ввода:"))
+        self.injection_mode_combo = QComboBox()
+        self.injection_mode_combo.addItem(
+            f"Авто (набор до {text_injection.TYPE_THRESHOLD} символов)", 'auto')
+        self.injection_mode_combo.addItem("Вставка через буфер", 'paste')
+        self.injection_mode_combo.addItem("Набор символами", 'type')
+        self.injection_mode_combo.setCurrentIndex(
+            max(0, self.injection_mode_combo.findData(settings.get('injection_mode', 'auto'))))
+        mode_layout.addWidget(self.injection_mode_combo)
+        layout.addLayout(mode_layout)
+        
+        layout.addWidget(self.create_macro_group(settings.get('macro', [])))
+        
         # Информационное сообщение (только если ответов > 1)
         if settings['response_count'] > 1:
             info_label = QLabel(
-                "При количестве ответов > 1 будет выбран случайный вариант. "
+                "При количестве ответов > 1 варианты идут в случайном порядке без повторов, "
+                "пока не выйдут все (вес - сколько раз вариант выпадает за круг). "
                 "Основное описание кнопки будет отключено."
             )
             info_label.setWordWrap(True)
@@ -634,8 +756,91 @@ class BasePanel(QWidget):
         self.advanced_settings_window.setLayout(layout)
         self.advanced_settings_window.show()
 
-    def add_response_field(self, index, text=""):
-        """Добавляет поле для ответа"""
+    def create_macro_group(self, steps):
+        """Список шагов макроса: если он не пуст, кнопка выполняет шаги вместо текста"""
+        macro_group = QGroupBox("Макрос (шаги вместо текста)")
+        macro_layout = QVBoxLayout()
+        
+        self.macro_list = QListWidget()
+        for step in steps:
+            self.add_macro_item(step)
+        macro_layout.addWidget(self.macro_list)
+        
+        # Новый шаг: тип, значение и Enter для текста
+        step_layout = QHBoxLayout()
+        self.macro_step_type = QComboBox()
+        for kind, title in macro_engine.STEP_TYPES.items():
+            self.macro_step_type.addItem(title, kind)
+        step_layout.addWidget(self.macro_step_type)
+        
+        self.macro_step_value = QLineEdit()
+        self.macro_step_value.setPlaceholderText("текст, /команда, ctrl+v, x, y или мс")
+        step_layout.addWidget(self.macro_step_value)
+        
+        self.macro_step_enter = QCheckBox("Enter")
+        step_layout.addWidget(self.macro_step_enter)
+        macro_layout.addLayout(step_layout)
+        
+        buttons_layout = QHBoxLayout()
+        for title, handler in (("Добавить", self.add_macro_step),
+                               ("Удалить", self.remove_macro_step),
+                               ("↑", lambda: self.move_macro_step(-1)),
+                               ("↓", lambda: self.move_macro_step(1))):
+            btn = QPushButton(title)
+            btn.clicked.connect(handler)
+            buttons_layout.addWidget(btn)
+        macro_layout.addLayout(buttons_layout)
+        
+        macro_group.setLayout(macro_layout)
+        return macro_group
+
+    def add_macro_item(self, step, row=None):
+        item = QListWidgetItem(macro_engine.describe_step(step))
+        item.setData(Qt.ItemDataRole.UserRole, step)
+        if row is None:
+            self.macro_list.addItem(item)
+        else:
+            self.macro_list.insertItem(row, item)
+        return item
+
+    def add_macro_step(self):
+        """Добавляет шаг из полей редактора после выделенного"""
+        try:
+            step = macro_engine.parse_step(
+                self.macro_step_type.currentData(),
+                self.macro_step_value.text(),
+                self.macro_step_enter.isChecked()
+            )
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", f"Неверный шаг макроса: {e}")
+            return
+        
+        row = self.macro_list.currentRow()
+        item = self.add_macro_item(step, row + 1 if row >= 0 else None)
+        self.macro_list.setCurrentItem(item)
+        self.macro_step_value.clear()
+
+    def remove_macro_step(self):
+        row = self.macro_list.currentRow()
+        if row >= 0:
+            self.macro_list.takeItem(row)
+
+    def move_macro_step(self, offset):
+        row = self.macro_list.currentRow()
+        target = row + offset
+        if row < 0 or not 0 <= target < self.macro_list.count():
+            return
+        item = self.macro_list.takeItem(row)
+        self.macro_list.insertItem(target, item)
+        self.macro_list.setCurrentRow(target)
+
+    def macro_steps(self):
+        """Шаги макроса из списка редактора"""
+        return [self.macro_list.item(i).data(Qt.ItemDataRole.UserRole)
+                for i in range(self.macro_list.count())]
+
+    def add_response_field(self, index, text="", weight=1):
+        """Добавляет поле для ответа и его вес"""
         if not hasattr(self, 'response_container_layout'):
             return None
         
@@ -652,15 +857,31 @@ class BasePanel(QWidget):
             }
         """)
         
-        # Добавляем метку и поле в layout
-        label = QLabel(f"Ответ {index + 1}:")
-        self.response_container_layout.addWidget(label)
-        self.response_container_layout.addWidget(field)
+        weight_input = QSpinBox()
+        weight_input.setRange(1, 10)
+        weight_input.setValue(weight)
+        
+        # Метка, вес и поле - одна строка, которая удаляется целиком
+        row = QWidget()
+        row_layout = QVBoxLayout(row)
+        row_layout.setContentsMargins(0, 0, 0, 0)
+        header_layout = QHBoxLayout()
+        header_layout.addWidget(QLabel(f"Ответ {index + 1}:"))
+        header_layout.addStretch()
+        header_layout.addWidget(QLabel("Вес:"))
+        header_layout.addWidget(weight_input)
+        row_layout.addLayout(header_layout)
+        row_layout.addWidget(field)
+        self.response_container_layout.addWidget(row)
         
         # Сохраняем поле в список
         if not hasattr(self, 'response_fields'):
             self.response_fields = []
+            self.response_weights = []
+            self.response_rows = []
         self.response_fields.append(field)
+        self.response_weights.append(weight_input)
+        self.response_rows.append(row)
         
         return field
 
@@ -673,11 +894,15 @@ class BasePanel(QWidget):
                 responses = [field.toPlainText() for field in self.response_fields]
                 if responses and self.current_button in self.advanced_settings:
                     self.advanced_settings[self.current_button]['responses'] = responses
+                    self.advanced_settings[self.current_button]['weights'] = \
+                        [weight.value() for weight in self.response_weights]
                 
                 # Удаляем поля
-                for field in self.response_fields:
-                    field.deleteLater()
+                for row in self.response_rows:
+                    row.deleteLater()
                 self.response_fields = []
+                self.response_weights = []
+                self.response_rows = []
                 
                 # Удаляем scroll area если она есть
                 if hasattr(self, 'response_scroll'):
@@ -702,22 +927,26 @@ class BasePanel(QWidget):
         # Инициализируем список полей если нужно
         if not hasattr(self, 'response_fields'):
             self.response_fields = []
+            self.response_weights = []
+            self.response_rows = []
         
         # Добавляем недостающие поля
+        saved = self.advanced_settings.get(self.current_button, {})
         while len(self.response_fields) < count:
             new_index = len(self.response_fields)
             # Используем сохраненные ответы или пустые строки
             default_text = ""
-            if (self.current_button in self.advanced_settings and 
-                len(self.advanced_settings[self.current_button]['responses']) > new_index):
-                default_text = self.advanced_settings[self.current_button]['responses'][new_index]
+            if len(saved.get('responses', [])) > new_index:
+                default_text = saved['responses'][new_index]
+            weight = saved['weights'][new_index] if len(saved.get('weights', [])) > new_index else 1
             
-            self.add_response_field(new_index, default_text)
+            self.add_response_field(new_index, default_text, weight)
         
         # Удаляем лишние поля
         while len(self.response_fields) > count:
-            field = self.response_fields.pop()
-            field.deleteLater()
+            self.response_fields.pop()
+            self.response_weights.pop()
+            self.response_rows.pop().deleteLater()
         
         # Показываем scroll area
         self.response_scroll.show()
@@ -734,6 +963,8 @@ class BasePanel(QWidget):
             'response_count': response_count,
             'count_reports': self.count_reports_check.isChecked(),
             'auto_enter': self.auto_enter_check.isChecked(),
+            'injection_mode': self.injection_mode_combo.currentData(),
+            'macro': self.macro_steps(),
             'responses': []
         }
         
@@ -743,8 +974,20 @@ class BasePanel(QWidget):
         else:
             # Для нескольких ответов собираем их из полей
             settings['responses'] = [field.toPlainText() for field in self.response_fields]
+            settings['weights'] = [weight.value() for weight in self.response_weights]
         
         self.advanced_settings[self.current_button] = settings
+        if response_count > 1:
+            self.response_pools[self.current_button] = response_pool.compile_pool(settings)
+            self._pool_settings[self.current_button] = settings
+        else:
+            self.response_pools.pop(self.current_button, None)
+        if settings['macro']:
+            self.compiled_macros[self.current_button] = macro_engine.compile_macro(
+                self.current_button, settings['macro'])
+            self._macro_steps[self.current_button] = settings['macro']
+        else:
+            self.compiled_macros.pop(self.current_button, None)
         self.update_description_field_state()
         self.save_buttons()
         self.advanced_settings_window.close()
@@ -1148,22 +1391,21 @@ class DraggableButton(QPushButton):
 
 class ButtonEditor(QMainWindow):
     buttons_updated = pyqtSignal(dict)
+    # Библиотека ответов догнала файл кнопок (число кнопок); приходит из потока синхронизации
+    library_synced = pyqtSignal(int)
 
     def load_click_coordinates(self):
         """Загружает сохраненные координаты клика из app_settings.json"""
-        script_dir = Path(__file__).parent  # Папка scripts/
-        settings_path = script_dir / "scripts" / "settings" / "app_settings.json"
-        if os.path.exists(settings_path):
+        settings = self.settings_store.get("app_settings.json")
+        if settings is not None:
             try:
-                with open(settings_path, 'r') as f:
-                    settings = json.load(f)
-                    coords = settings.get('click_coords', (22, 330))
-                    # Проверяем что координаты валидны
-                    if isinstance(coords, (list, tuple)) and len(coords) == 2:
-                        self.click_coordinates = tuple(int(x) for x in coords)
-                    else:
-                        self.click_coordinates = (22, 330)
-                    logging.info(f"Загружены координаты клика: {self.click_coordinates}")
+                coords = settings.get('click_coords', (22, 330))
+                # Проверяем что координаты валидны
+                if isinstance(coords, (list, tuple)) and len(coords) == 2:
+                    self.click_coordinates = tuple(int(x) for x in coords)
+                else:
+                    self.click_coordinates = (22, 330)
+                logging.info(f"Загружены координаты клика: {self.click_coordinates}")
             except Exception as e:
                 logging.info(f"Ошибка загрузки координат клика: {e}")
                 self.click_coordinates = (22, 330)
@@ -1175,28 +1417,76 @@ class ButtonEditor(QMainWindow):
         self.executor_enabled = False  # По умолчанию выключен
         self.click_coordinates = (22, 330)
         self.base_path = get_base_path()
-        self._is_checking = False
         self.report_count = 0
-        self.settings_dir = os.path.join(self.base_path, "scripts", "settings")
+        # Все настройки читаются один раз при запуске и дальше берутся из памяти
+        self.settings_store = get_settings_store()
+        self.settings_dir = self.settings_store.settings_dir
         os.makedirs(self.settings_dir, exist_ok=True)
+        app_settings = self.settings_store.section("app_settings.json")
         
         self.config_file = os.path.join(self.settings_dir, "button_config.json")
         self.width_config_file = os.path.join(self.settings_dir, "button_width.cfg")
         self.color_settings_file = os.path.join(self.settings_dir, "color_settings.json")
         self.load_click_coordinates()
 
+        # Настройки пишутся в фоне с объединением частых изменений (слайдеры, перетаскивание)
+        self.config_writer = self.settings_store.writer
+
+        # Необязательная библиотека ответов в SQLite: поиск по большому набору кнопок в исполнителе
+        self.response_library = create_response_library(app_settings, self.settings_dir)
+        self.library_query = ''
+        self.library_watcher = None
+
         if hasattr(self, 'executor_window'):
             self.executor_window.setAttribute(Qt.WA_TransparentForMouseEvents)
 
         self.original_mouse_pos = None
         self.button_data = {}
-        self.advanced_settings = {}
         self.current_button = None
         self.executor_window = None
         self.watcher = None
         self.should_executor_be_visible = False
         self._current_button_width = 120
-        
+
+        # Общий кадр для всех цветовых проб (исполнитель, чат)
+        # Захват и анализ выполняет фоновый поток, сюда приходят только изменения
+        try:
+            self.screen_source = create_screen_source(settings=app_settings)
+        except Exception as e:
+            QMessageBox.critical(None, "Ошибка", f"Не удалось подготовить захват экрана: {e}")
+            raise
+        self.detection_worker = DetectionWorker(FrameSampler(self.screen_source))
+        self.detection_worker.state_changed.connect(self.on_detection_state_changed)
+        self.frame_sampler = self.detection_worker.frame_sampler
+
+        # Вставка ответов и команд идет в отдельном потоке, клик только ставит задание
+        try:
+            input_sink = create_input_sink(load_restore_delay(app_settings), load_pointer_mode(app_settings))
+        except Exception as e:
+            QMessageBox.critical(None, "Ошибка", f"Не удалось подготовить отправку ответов: {e}")
+            raise
+        self.injection_worker = InjectionWorker(input_sink)
+        self.paste_verifier = PasteVerifier(load_verification_policy(app_settings), self)
+        # Чат-команды идут через очередь с защитой от двойных кликов и лимитом антиспама
+        self.send_queue = SendQueue(self.injection_worker, **load_send_queue_settings(app_settings))
+
+        # Активное окно и его размер приходят событиями системы
+        self.window_tracker = WindowTracker(create_window_event_source(), self)
+        self.window_tracker.foreground_changed.connect(self.on_foreground_changed)
+        self.window_tracker.geometry_changed.connect(self.on_window_geometry_changed)
+        self.window_tracker.title_changed.connect(self.on_window_title_changed)
+
+        # Раскладка активного окна кэшируется: смена окна и редкий опрос вместо запроса на каждую отправку
+        self.layout_tracker = self.injection_worker.sink.layout
+        self.layout_timer = QTimer(self)
+        self.layout_timer.timeout.connect(self.layout_tracker.refresh)
+        self.layout_timer.start(500)
+
+        # Пиксельные координаты точек для текущего размера окна
+        self.coord_mapper = CoordinateMapper()
+        screen = QGuiApplication.primaryScreen().availableGeometry()
+        self.coord_mapper.set_size((screen.width(), screen.height()))
+
         self.load_chat_settings()
 
         self.target_windows = []
@@ -1214,29 +1504,27 @@ class ButtonEditor(QMainWindow):
         self.load_width_from_file()
         self.load_buttons_from_file()
         self.load_color_settings()
+        self.update_coordinate_points()
         
         if not self.button_data:
             self.load_initial_buttons()
 
         self.setup_executor_button()
         
-        self.check_timer = QTimer(self)
-        self.check_timer.timeout.connect(self.check_conditions)
-        self.check_timer.start(100)
-
-        self.resolution_timer = QTimer(self)
-        self.resolution_timer.timeout.connect(self.update_game_resolution)
-        self.resolution_timer.start(1000)
+        # После изменений и действий пользователя проверка идет чаще, в простое - как раньше раз в 100 мс
+        self.detection_worker.add_check('executor', self.detect_executor_state, 50, 100)
 
  # Настройки обнаружения чата
         self.chat_detection_coords = (100, 100)
         self.chat_detection_color = (68, 80, 95)
         self.chat_color_tolerance = 10
         
-        # Таймер для проверки чата
-        self.chat_check_timer = QTimer(self)
-        self.chat_check_timer.timeout.connect(self.check_chat_conditions)
-        self.chat_check_timer.start(150)  # Проверка чата каждые 150мс
+        # Проверка чата в фоновом потоке
+        self.detection_worker.add_check('chat_point', self.check_chat_opened, 75, 150)
+        # Нажатие клавиши может открыть или закрыть только чат
+        self.detection_worker.watch_user_input(key_checks=('chat', 'chat_point'))
+        self.detection_worker.start()
+        self.window_tracker.start()
 
     def setup_ui(self):
         central_widget = QWidget()
@@ -1277,23 +1565,98 @@ class ButtonEditor(QMainWindow):
         
         main_layout.addWidget(self.tab_widget)
 
-    def check_chat_conditions(self):
-        """Проверяет условия для открытия чат-команд"""
-        if hasattr(self, 'chat_executor_window') and self.chat_executor_window:
-            if self.chat_executor_window.mouse_over:
+        if self.response_library:
+            self.setup_library_search(main_layout)
+
+    def setup_library_search(self, main_layout):
+        """Поле поиска по библиотеке ответов; окно исполнителя не берет фокус, поэтому поле здесь"""
+        config_file = self.commands_tab.config_file
+        self._library_syncing = False
+        self._library_sync_pending = None
+        self._library_sync_lock = threading.Lock()
+        self.library_synced.connect(self.on_library_synced)
+        self.sync_response_library(config_file)
+        # Файл кнопок остается основным, библиотека догоняет его после каждого сохранения
+        self.library_watcher = DebouncedFileWatcher(config_file, parent=self)
+        self.library_watcher.changed.connect(self.sync_response_library)
+
+        self.library_search = QLineEdit()
+        self.library_search.setPlaceholderText("Поиск ответа по названию, тексту и вариантам...")
+        self.library_search.setClearButtonEnabled(True)
+        self.library_search.textChanged.connect(self.search_responses)
+        main_layout.addWidget(self.library_search)
+
+    def sync_response_library(self, path):
+        """Переносит изменившийся файл кнопок в библиотеку в отдельном потоке
+
+        Разбор файла и запись в базу не задерживают GUI; сохранение во время
+        синхронизации запомнится и будет перенесено сразу после нее.
+        """
+        with self._library_sync_lock:
+            if self._library_syncing:
+                self._library_sync_pending = path
                 return
-                
-        chat_opened = self.check_chat_opened()
-        
-        if chat_opened:
-            if not hasattr(self, 'chat_executor_window') or not self.chat_executor_window:
-                self.open_chat_executor()
-            elif self.chat_executor_window.isHidden():
-                self.chat_executor_window.show()
-        else:
-            if hasattr(self, 'chat_executor_window') and self.chat_executor_window:
-                if not self.chat_executor_window.mouse_over:
-                    self.chat_executor_window.hide()
+            self._library_syncing = True
+        threading.Thread(target=self._sync_library_job, args=(path,), daemon=True).start()
+
+    def _sync_library_job(self, path):
+        while path:
+            try:
+                if self.response_library.sync_json(path):
+                    self.library_synced.emit(self.response_library.count())
+            except Exception as e:
+                logging.error(f"Ошибка обновления библиотеки ответов: {e}")
+            with self._library_sync_lock:
+                path, self._library_sync_pending = self._library_sync_pending, None
+                self._library_syncing = bool(path)
+
+    def on_library_synced(self, count):
+        """Библиотека обновлена - обновляем результаты поиска в исполнителе"""
+        logging.info(f"Библиотека ответов обновлена: {count} кнопок")
+        if self.executor_window:
+            self.executor_window.search_library(self.library_query)
+
+    def search_responses(self, text):
+        """Показывает в исполнителе кнопки библиотеки, подходящие под запрос"""
+        self.library_query = text
+        if self.executor_window:
+            self.executor_window.search_library(text)
+
+    def on_detection_state_changed(self, name, value):
+        """Реагирует на изменения состояния из фонового потока"""
+        if name == 'executor':
+            self.should_executor_be_visible = value
+            self.update_executor_visibility()
+        elif name == 'chat_point':
+            self.check_chat_conditions(value)
+
+    def on_foreground_changed(self, hwnd, title):
+        """Активное окно сменилось - сразу перепроверяем условия"""
+        self.layout_tracker.set_window(hwnd)
+        self.detection_worker.boost()
+        self.check_conditions()
+
+    def on_window_title_changed(self, hwnd, title):
+        """Заголовок активного окна сменился - от него зависит is_target_window_active"""
+        self.detection_worker.boost()
+        self.check_conditions()
+
+    def on_window_geometry_changed(self, hwnd, rect):
+        """Активное окно переместилось или изменило размер"""
+        self.update_game_resolution()
+
+    def check_chat_conditions(self, chat_opened):
+        """Передает состояние чата окну чат-команд; видимость решает само окно
+
+        Окно создается при первом открытии чата. Пока мышь над окном, оно
+        не скрывается; отложенное скрытие применяет ChatExecutor.leaveEvent.
+        """
+        if not hasattr(self, 'chat_executor_window') or not self.chat_executor_window:
+            if not chat_opened:
+                return
+            self.open_chat_executor()
+        if self.chat_executor_window:
+            self.chat_executor_window.on_chat_point_changed(chat_opened)
     
     def open_chat_executor(self):
         """Открывает окно чат-команд"""
@@ -1318,7 +1681,8 @@ class ButtonEditor(QMainWindow):
         """Проверяет, открыт ли чат по цвету"""
         try:
             x, y = self.chat_detection_coords
-            pixel_color = pyautogui.pixel(x, y)
+            self.frame_sampler.set_point_probe('chat_point', x, y)
+            pixel_color = self.frame_sampler.pixel(x, y)
             
             color_match = all(
                 abs(p - c) <= self.chat_color_tolerance 
@@ -1348,18 +1712,14 @@ class ButtonEditor(QMainWindow):
         }
         
         try:
-            chat_settings_path = os.path.join(self.settings_dir, "chat_detection_settings.json")
-            with open(chat_settings_path, 'w', encoding='utf-8') as f:
-                json.dump(chat_settings, f, indent=2, ensure_ascii=False)
+            # Остальные ключи файла (geometry_pyramid, change_gate) сохраняются;
+            # окно чат-команд получает новые настройки сигналом хранилища
+            self.settings_store.update("chat_detection_settings.json", chat_settings)
                 
             logging.info(f"✅ Сохранены настройки чата с зоной: {coords} - {color}")
             
         except Exception as e:
             logging.error(f"❌ Ошибка сохранения настроек чата: {e}")
-        
-        # Передаем настройки в окно чат-команд
-        if hasattr(self, 'chat_executor_window') and self.chat_executor_window:
-            self.chat_executor_window.update_chat_detection_settings(coords, color, tolerance)
     
     def save_chat_settings(self):
         """Сохраняет настройки обнаружения чата"""
@@ -1370,9 +1730,7 @@ class ButtonEditor(QMainWindow):
                 'chat_tolerance': self.chat_color_tolerance
             }
             
-            chat_settings_path = os.path.join(self.settings_dir, "chat_detection_settings.json")
-            with open(chat_settings_path, 'w', encoding='utf-8') as f:
-                json.dump(chat_settings, f, indent=2, ensure_ascii=False)
+            self.settings_store.update("chat_detection_settings.json", chat_settings)
                 
         except Exception as e:
             logging.error(f"Ошибка сохранения настроек чата: {e}")
@@ -1380,16 +1738,13 @@ class ButtonEditor(QMainWindow):
     def load_chat_settings(self):
         """Загружает настройки обнаружения чата"""
         try:
-            chat_settings_path = os.path.join(self.settings_dir, "chat_detection_settings.json")
-            if os.path.exists(chat_settings_path):
-                with open(chat_settings_path, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                    
-                    self.chat_detection_coords = tuple(settings.get('chat_check_coords', (100, 100)))
-                    self.chat_detection_color = tuple(settings.get('chat_required_color', (68, 80, 95)))
-                    self.chat_color_tolerance = settings.get('chat_tolerance', 10)
-                    
-                    logging.info(f"Загружены настройки чата: {self.chat_detection_coords}")
+            settings = self.settings_store.get("chat_detection_settings.json")
+            if settings:
+                self.chat_detection_coords = tuple(settings.get('chat_check_coords', (100, 100)))
+                self.chat_detection_color = tuple(settings.get('chat_required_color', (68, 80, 95)))
+                self.chat_color_tolerance = settings.get('chat_tolerance', 10)
+                
+                logging.info(f"Загружены настройки чата: {self.chat_detection_coords}")
                     
         except Exception as e:
             logging.error(f"Ошибка загрузки настроек чата: {e}")
@@ -1433,21 +1788,21 @@ class ButtonEditor(QMainWindow):
 
     def load_width_from_file(self):
         """Загружает сохраненную ширину кнопок"""
-        if os.path.exists(self.width_config_file):
+        text = self.settings_store.get("button_width.cfg")
+        if text is not None:
             try:
-                with open(self.width_config_file, 'r') as f:
-                    width = int(f.read().strip())
-                    if hasattr(self, 'commands_tab') and hasattr(self.commands_tab.settings_panel, 'width_slider'):
-                        self.commands_tab.settings_panel.width_slider.setValue(width)
+                width = int(text)
+                if hasattr(self, 'commands_tab') and hasattr(self.commands_tab.settings_panel, 'width_slider'):
+                    self.commands_tab.settings_panel.width_slider.setValue(width)
             except Exception as e:
                 logging.info(f"Ошибка загрузки ширины: {e}, используем значение по умолчанию")
 
     def save_width_to_file(self):
         """Сохраняет текущую ширину кнопок"""
         try:
-            with open(self.width_config_file, 'w') as f:
-                if hasattr(self, 'commands_tab') and hasattr(self.commands_tab.settings_panel, 'width_slider'):
-                    f.write(str(self.commands_tab.settings_panel.width_slider.value()))
+            if hasattr(self, 'commands_tab') and hasattr(self.commands_tab.settings_panel, 'width_slider'):
+                self.settings_store.set("button_width.cfg",
+                                        str(self.commands_tab.settings_panel.width_slider.value()))
         except Exception as e:
             logging.info(f"Ошибка сохранения ширины: {e}")
 
@@ -1507,7 +1862,8 @@ class ButtonEditor(QMainWindow):
         """Обработчик событий для проверки ЛКМ и автоматического закрытия"""
         if event.type() == QEvent.Type.MouseButtonPress:
             if event.button() == Qt.MouseButton.LeftButton:
-                if self.check_screen_color() and self.is_target_window_active():
+                self.detection_worker.request_check('executor')
+                if self.detection_worker.value('executor', False) and self.is_target_window_active():
                     if not hasattr(self, 'executor_window') or not self.executor_window:
                         self.open_executor_window()
                     elif not self.executor_window.isVisible():
@@ -1518,13 +1874,13 @@ class ButtonEditor(QMainWindow):
             if hasattr(self, 'last_check_time') and current_time - self.last_check_time > 0.1:
                 self.last_check_time = current_time
                 if hasattr(self, 'executor_window') and self.executor_window:
-                    if not self.check_screen_color():
+                    if not self.detection_worker.value('executor', True):
                         self.executor_window.hide()
         
         return super().eventFilter(obj, event)
 
     def check_conditions(self):
-        """Проверяет условия для показа/скрытия исполнителя"""
+        """Просит фоновый поток проверить условия для показа/скрытия исполнителя"""
         # Проверяем, включен ли автоматический исполнитель
         if not self.executor_enabled:
             # Если автоматический режим выключен - не показываем окно
@@ -1533,23 +1889,15 @@ class ButtonEditor(QMainWindow):
                     self.executor_window.hide()
             return
         
-        if self._is_checking:
-            return
-        self._is_checking = True
-        
-        try:
-            if hasattr(self, 'executor_window') and self.executor_window:
-                if self.executor_window.mouse_over:
-                    self._is_checking = False
-                    return
-                    
-            current_state = self.check_screen_color()
-            
-            if current_state != self.should_executor_be_visible:
-                self.should_executor_be_visible = current_state
-                self.update_executor_visibility()
-        finally:
-            self._is_checking = False
+        # Применяем последний известный результат и просим свежую проверку
+        self.should_executor_be_visible = self.detection_worker.value(
+            'executor', self.should_executor_be_visible)
+        self.update_executor_visibility()
+        self.detection_worker.request_check('executor')
+
+    def detect_executor_state(self):
+        """Выполняется в фоновом потоке: нужно ли показывать исполнитель"""
+        return self.executor_enabled and self.check_screen_color()
 
     def update_executor_visibility(self):
         """Обновляет видимость исполнителя с учетом настроек"""
@@ -1593,12 +1941,13 @@ class ButtonEditor(QMainWindow):
         """Проверяет цвет в двух точках"""
         try:
             x1, y1 = self.normalize_coordinates(*self.check_coords)
-            screenshot1 = pyautogui.screenshot(region=(x1-2, y1-2, 5, 5))
-            pixel1 = screenshot1.getpixel((2, 2))
-            
             x2, y2 = self.normalize_coordinates(*self.check_coords2)
-            screenshot2 = pyautogui.screenshot(region=(x2-2, y2-2, 5, 5))
-            pixel2 = screenshot2.getpixel((2, 2))
+
+            # Обе точки берем из общего кадра - один захват на тик
+            self.frame_sampler.set_point_probe('executor_point1', x1, y1)
+            self.frame_sampler.set_point_probe('executor_point2', x2, y2)
+            pixel1 = self.frame_sampler.pixel(x1, y1)
+            pixel2 = self.frame_sampler.pixel(x2, y2)
             
             tolerance = self.color_tolerance
             
@@ -1659,11 +2008,11 @@ class ButtonEditor(QMainWindow):
             left = max(0, center[0] - size[0] // 2)
             top = max(0, center[1] - size[1] // 2)
             
-            screenshot = pyautogui.screenshot()
+            screenshot = self.screen_source.grab_image((left, top, size[0], size[1]))
             for x in range(left, left + size[0], 2):
                 for y in range(top, top + size[1], 2):
                     try:
-                        pixel = screenshot.getpixel((x, y))
+                        pixel = screenshot.getpixel((x - left, y - top))
                         if all(abs(p - e) <= tolerance for p, e in zip(pixel, expected_color)):
                             return True
                     except:
@@ -1693,18 +2042,7 @@ class ButtonEditor(QMainWindow):
         
     def _get_pixel_color(self, coord):
         """Возвращает цвет пикселя по координатам"""
-        try:
-            import ctypes
-            user32 = ctypes.windll.user32
-            gdi32 = ctypes.windll.gdi32
-            hdc = user32.GetDC(0)
-            pixel = gdi32.GetPixel(hdc, coord[0], coord[1])
-            rgb = (pixel & 0xff, (pixel >> 8) & 0xff, (pixel >> 16) & 0xff)
-            user32.ReleaseDC(0, hdc)
-            return rgb
-        except:
-            screenshot = pyautogui.screenshot()
-            return screenshot.getpixel(coord)
+        return self.screen_source.pixel(coord[0], coord[1])
 
     def _color_close_enough(self, color1, color2, tolerance):
         """Проверяет, достаточно ли близки цвета с учетом допуска"""
@@ -1727,11 +2065,9 @@ class ButtonEditor(QMainWindow):
 
     def is_target_window_active(self):
         """Упрощенная проверка - всегда возвращает True для активного окна"""
-        try:
-            active_window = win32gui.GetWindowText(win32gui.GetForegroundWindow())
-            return bool(active_window)
-        except:
+        if not self.window_tracker.source:
             return True
+        return bool(self.window_tracker.current_title)
         
     def check_color_in_zone(self, center_coords, size, target_color, tolerance=10, step=2):
         """
@@ -1742,15 +2078,15 @@ class ButtonEditor(QMainWindow):
         tolerance: допустимое отклонение цвета
         """
         try:
-            screenshot = pyautogui.screenshot()
-            
             left = max(0, center_coords[0] - size[0] // 2)
             top = max(0, center_coords[1] - size[1] // 2)
             
+            screenshot = self.screen_source.grab_image((left, top, size[0], size[1]))
+            
             for x in range(left, left + size[0], step):
                 for y in range(top, top + size[1], step):
                     try:
-                        pixel = screenshot.getpixel((x, y))
+                        pixel = screenshot.getpixel((x - left, y - top))
                         if self._color_close_enough(pixel, target_color, tolerance):
                             return True
                     except:
@@ -1762,25 +2098,12 @@ class ButtonEditor(QMainWindow):
 
     def normalize_coordinates(self, x, y):
         """Нормализует координаты относительно активного окна"""
-        try:
-            active_window = win32gui.GetForegroundWindow()
-            if active_window:
-                rect = win32gui.GetWindowRect(active_window)
-                window_width = rect[2] - rect[0]
-                window_height = rect[3] - rect[1]
-                
-                return (
-                    int(x * window_width / 1920),
-                    int(y * window_height / 1080)
-                )
-        except:
-            pass
-        
-        screen = QGuiApplication.primaryScreen().availableGeometry()
-        return (
-            int(x * screen.width() / 1920),
-            int(y * screen.height() / 1080)
-        )
+        return self.coord_mapper.map(x, y)
+
+    def update_coordinate_points(self):
+        """Регистрирует точки проб и клика для предварительного пересчета"""
+        points = [getattr(self, name, None) for name in ('check_coords', 'check_coords2', 'click_coordinates')]
+        self.coord_mapper.set_points([point for point in points if point])
     
     def normalize_all_coordinates(self):
         """Нормализует координаты проверки цвета"""
@@ -1794,19 +2117,19 @@ class ButtonEditor(QMainWindow):
             self.check_coords = (270, 320)
 
     def update_game_resolution(self):
-        """Определяет текущее разрешение активного окна"""
+        """Обновляет разрешение активного окна по данным трекера окон"""
         try:
-            active_window = win32gui.GetForegroundWindow()
-            if active_window:
-                rect = win32gui.GetWindowRect(active_window)
-                window_width = rect[2] - rect[0]
-                window_height = rect[3] - rect[1]
+            window_size = self.window_tracker.size()
+            if window_size:
+                window_width, window_height = window_size
                 
                 if hasattr(self, 'last_window_resolution') and self.last_window_resolution != (window_width, window_height):
                     logging.info(f"Обнаружено изменение разрешения окна: {window_width}x{window_height}")
                     self.normalize_all_coordinates()
+                    self.update_coordinate_points()
                 
                 self.last_window_resolution = (window_width, window_height)
+                self.coord_mapper.set_size(window_size)
                 return True
             return False
         except Exception as e:
@@ -1848,6 +2171,34 @@ class ButtonEditor(QMainWindow):
             except Exception as e:
                 return
     
+    @property
+    def advanced_settings(self):
+        """Расширенные настройки кнопок вкладки Ответы"""
+        commands_tab = getattr(self, 'commands_tab', None)
+        return commands_tab.advanced_settings if commands_tab else {}
+
+    @property
+    def compiled_macros(self):
+        """Скомпилированные макросы кнопок вкладки Ответы"""
+        commands_tab = getattr(self, 'commands_tab', None)
+        return commands_tab.compiled_macros if commands_tab else {}
+
+    @property
+    def response_pools(self):
+        """Мешки ответов кнопок вкладки Ответы"""
+        commands_tab = getattr(self, 'commands_tab', None)
+        return commands_tab.response_pools if commands_tab else {}
+
+    def response_pool(self, name, settings):
+        """Мешок ответов кнопки вкладки Ответы (см. BasePanel.response_pool)"""
+        commands_tab = getattr(self, 'commands_tab', None)
+        return commands_tab.response_pool(name, settings) if commands_tab else None
+
+    def compiled_macro(self, name, settings):
+        """Макрос кнопки вкладки Ответы (см. BasePanel.compiled_macro)"""
+        commands_tab = getattr(self, 'commands_tab', None)
+        return commands_tab.compiled_macro(name, settings) if commands_tab else None
+
     @property
     def button_width(self):
         return self._current_button_width
@@ -1870,33 +2221,30 @@ class ButtonEditor(QMainWindow):
     def load_color_settings(self):
         """Загружает настройки цветов для двух точек"""
         try:
-            color_settings_path = os.path.join(self.settings_dir, "color_settings.json")
-            if os.path.exists(color_settings_path):
-                with open(color_settings_path, 'r') as f:
-                    settings = json.load(f)
-                    
-                    self.check_coords = tuple(settings.get('check_coords', (270, 320)))
-                    self.required_color = tuple(settings.get('required_color', (68, 68, 68)))
-                    
-                    check_coords2 = settings.get('check_coords2')
-                    required_color2 = settings.get('required_color2')
-                    
-                    if check_coords2 and required_color2:
-                        self.check_coords2 = tuple(check_coords2)
-                        self.required_color2 = tuple(required_color2)
-                        logging.info(f"✓ Вторая точка загружена: {self.check_coords2} - {self.required_color2}")
-                    else:
-                        self.check_coords2 = (300, 320)
-                        self.required_color2 = (68, 68, 68)
-                        logging.warning("⚠ Вторая точка не найдена в настройках, используем значения по умолчанию")
-                    
-                    self.color_tolerance = settings.get('tolerance', 10)
-                    
-                    logging.info(f"Загружены настройки двух точек:")
-                    logging.info(f"Точка 1: {self.check_coords} - {self.required_color}")
-                    logging.info(f"Точка 2: {self.check_coords2} - {self.required_color2}")
-                    logging.info(f"Допуск: {self.color_tolerance}")
-                    
+            settings = self.settings_store.get("color_settings.json")
+            if settings is not None:
+                self.check_coords = tuple(settings.get('check_coords', (270, 320)))
+                self.required_color = tuple(settings.get('required_color', (68, 68, 68)))
+                
+                check_coords2 = settings.get('check_coords2')
+                required_color2 = settings.get('required_color2')
+                
+                if check_coords2 and required_color2:
+                    self.check_coords2 = tuple(check_coords2)
+                    self.required_color2 = tuple(required_color2)
+                    logging.info(f"✓ Вторая точка загружена: {self.check_coords2} - {self.required_color2}")
+                else:
+                    self.check_coords2 = (300, 320)
+                    self.required_color2 = (68, 68, 68)
+                    logging.warning("⚠ Вторая точка не найдена в настройках, используем значения по умолчанию")
+                
+                self.color_tolerance = settings.get('tolerance', 10)
+                
+                logging.info(f"Загружены настройки двух точек:")
+                logging.info(f"Точка 1: {self.check_coords} - {self.required_color}")
+                logging.info(f"Точка 2: {self.check_coords2} - {self.required_color2}")
+                logging.info(f"Допуск: {self.color_tolerance}")
+                
             else:
                 self.check_coords = (270, 320)
                 self.required_color = (68, 68, 68)
@@ -1924,9 +2272,7 @@ class ButtonEditor(QMainWindow):
                 'tolerance': getattr(self, 'color_tolerance', 10)
             }
             
-            color_settings_path = os.path.join(self.settings_dir, "color_settings.json")
-            with open(color_settings_path, 'w') as f:
-                json.dump(settings, f, indent=2)
+            self.settings_store.set("color_settings.json", settings)
                 
             logging.info(f"Настройки цвета сохранены: {self.check_coords} - {self.required_color}")
             
@@ -2,7 +2,6 @@ from PyQt6.QtWidgets import (QWidget, QGridLayout, QPushButton, QScrollArea,
                            QVBoxLayout, QFrame, QMessageBox, QSizePolicy, QScrollBar)
 from PyQt6.QtCore import pyqtSignal, Qt, QPoint, QPropertyAnimation, QEasingCurve, QRect, QEvent
 from PyQt6.QtGui import QKeyEvent, QGuiApplication
-from PyQt6.QtCore import QFileSystemWatcher
 import os
 from PIL import Image
 import win32gui
@@ -10,23 +9,55 @@ import win32api
 import win32con
 import win32process
 import psutil
-from pathlib import Path
-import win32clipboard  # Добавлен импорт
 
 import time
-import pyautogui
-import random
 import win32gui
-import ctypes  # Для проверки раскладки
 
 import logging
 
+from . import text_injection
+from . import macro_engine
+from . import pointer_actions
+from .settings_store import get_settings_dir, get_settings_store
+from .file_watcher import DebouncedFileWatcher
+from . import button_diff
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
     filename='button_executor.log'
 )
 
+# Сколько найденных кнопок библиотеки ответов показывается в окне
+LIBRARY_PAGE_SIZE = 45
+
+def write_report_increment():
+    """Отмечает отправленный репорт для счетчика"""
+    try:
+        settings_dir = get_settings_dir()
+        os.makedirs(settings_dir, exist_ok=True)
+        
+        tmp_path = os.path.join(settings_dir, "report_counter.tmp")
+        with open(tmp_path, 'w') as f:
+            f.write('+1')
+        print(f"[DEBUG] Создан tmp файл: {tmp_path}")
+    except Exception as e:
+        logging.error(f"Ошибка при обновлении счетчика: {e}")
+
+def send_counted_response(sink, text, click_point, auto_enter, count_report, mode='auto', verifier=None):
+    """Задание потока ввода: отправка ответа и учет репорта"""
+    result = text_injection.send_text(sink, text, click_point, auto_enter, mode, verifier)
+    if count_report:
+        write_report_increment()
+    return result
+
+def run_counted_macro(sink, macro, mapper, count_report):
+    """Задание потока ввода: макрос кнопки и учет репорта"""
+    result = macro_engine.run_macro(sink, macro, mapper)
+    if count_report:
+        write_report_increment()
+    return result
+
 class ButtonExecutor(QWidget):
     button_clicked = pyqtSignal(str, str)
     
@@ -44,9 +75,20 @@ class ButtonExecutor(QWidget):
         self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
         self.setAttribute(Qt.WidgetAttribute.WA_ShowWithoutActivating)
         
-        self.watcher = QFileSystemWatcher()
-        self.watcher.fileChanged.connect(self.reload_buttons)
-        self.button_data = button_data
+        # С библиотекой ответов окно показывает страницу результатов поиска, а файл кнопок
+        # отслеживает редактор; без нее внешние правки файла применяются без пересоздания всех кнопок
+        self.library = getattr(parent, 'response_library', None)
+        self.library_query = getattr(parent, 'library_query', '')
+        self.library_page_size = LIBRARY_PAGE_SIZE
+        self.max_rows_per_column = 9
+        config_file = getattr(getattr(parent, 'commands_tab', None), 'config_file', None)
+        self.watcher = DebouncedFileWatcher(config_file, parent=self) if config_file and not self.library else None
+        if self.watcher:
+            self.watcher.changed.connect(self.reload_buttons)
+        if self.library:
+            button_data = self.query_library(self.library_query)
+        self.button_data = self.snapshot_buttons(button_data)
+        self.button_widgets = {}
         self.button_width = 120
         self.button_height = 20
         self._parent = parent
@@ -71,12 +113,10 @@ class ButtonExecutor(QWidget):
         self.original_pos = QPoint()
         
     def check_keyboard_layout(self):
-        """Проверяет текущую раскладку клавиатуры (0x409 - английская)"""
+        """Английская ли раскладка активного окна (по кэшу получателя ввода)"""
         try:
-            hkl = ctypes.windll.user32.GetKeyboardLayout(0)
-            lid = hkl & 0xFFFF
-            return lid == 0x409  # Английская раскладка
-        except:
+            return self._parent.injection_worker.sink.layout.is_english()
+        except Exception:
             return False
         
     def setup_ui(self):
@@ -193,189 +233,117 @@ class ButtonExecutor(QWidget):
             widget = self.buttons_layout.itemAt(i).widget()
             if widget:
                 widget.deleteLater()
+        self.button_widgets = {}
         
         # Создаем кнопки
         for name, data in self.button_data.items():
-            btn = QPushButton(name)
-            btn.setFixedSize(self.button_width, self.button_height)
-            btn.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: #3A3A3A;
-                    color: white;
-                    border: 1px solid #444;
-                    border-radius: 3px;
-                    padding: 5px;
-                    font-size: 12px;
-                    min-width: {self.button_width}px;
-                    max-width: {self.button_width}px;
-                    min-height: {self.button_height}px;
-                    max-height: {self.button_height}px;
-                }}
-                QPushButton:hover {{
-                    background-color: rgba(68, 68, 68, 220);
-                    border: 1px solid #555;
-                }}
-            """)
-            btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+            btn = self.make_button(name)
+            self.button_widgets[name] = btn
             row, col = data.get("position", (0, 0))
             self.buttons_layout.addWidget(btn, row, col)
-            # Исправленная строка - передаем description из данных кнопки
-            btn.clicked.connect(lambda checked, n=name, d=data["description"]: 
-                            self.send_text_to_cursor(n, d))
 
         self.update_container_size()
 
+    def make_button(self, name):
+        """Кнопка ответа; описание берется при нажатии, поэтому правка текста не требует новой кнопки"""
+        btn = QPushButton(name)
+        btn.button_name = name
+        btn.setFixedSize(self.button_width, self.button_height)
+        btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: #3A3A3A;
+                color: white;
+                border: 1px solid #444;
+                border-radius: 3px;
+                padding: 5px;
+                font-size: 12px;
+                min-width: {self.button_width}px;
+                max-width: {self.button_width}px;
+                min-height: {self.button_height}px;
+                max-height: {self.button_height}px;
+            }}
+            QPushButton:hover {{
+                background-color: rgba(68, 68, 68, 220);
+                border: 1px solid #555;
+            }}
+        """)
+        btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        btn.clicked.connect(lambda checked, b=btn: self.on_button_clicked(b.button_name))
+        return btn
+
+    def on_button_clicked(self, name):
+        """Отправляет текущее описание нажатой кнопки"""
+        data = self.button_data.get(name)
+        if data:
+            self.send_text_to_cursor(name, data["description"])
+
+    def button_settings(self, name):
+        """Расширенные настройки кнопки: из библиотеки ответов в момент нажатия или из редактора"""
+        if self.library:
+            try:
+                entry = self.library.get(name)
+            except Exception as e:
+                logging.error(f"Ошибка чтения кнопки {name} из библиотеки ответов: {e}")
+                entry = None
+            return entry['advanced'] if entry else None
+        return getattr(self._parent, 'advanced_settings', {}).get(name)
+
     def send_text_to_cursor(self, name, description):
-        self._parent.save_mouse_position()
+        """Ставит ответ в очередь отправки; ввод выполняет фоновый поток"""
         try:
             text_to_send = description
             count_report = False
+            auto_enter = False
+            mode = 'auto'
             
-            if hasattr(self._parent, 'advanced_settings') and name in self._parent.advanced_settings:
-                settings = self._parent.advanced_settings[name]
-                if settings['response_count'] > 1 and settings['responses']:
-                    valid_responses = [r for r in settings['responses'] if r.strip()]
-                    if valid_responses:
-                        text_to_send = random.choice(valid_responses)
+            settings = self.button_settings(name)
+            if settings:
+                if settings.get('response_count', 1) > 1 and settings.get('responses'):
+                    # Мешок собирается один раз: выбор без повторов подряд и без разбора списка
+                    pool = self._parent.response_pool(name, settings)
+                    if pool:
+                        text_to_send = pool.next()
                     count_report = settings.get('count_reports', False)
+                auto_enter = settings.get('auto_enter', False)
+                mode = settings.get('injection_mode', 'auto')
+
+            # Кнопка с макросом выполняет его вместо одного текста
+            macro = self._parent.compiled_macro(name, settings) if settings else None
+            if macro and macro.operations:
+                self._parent.injection_worker.submit(
+                    name, run_counted_macro, macro, self._parent.normalize_coordinates,
+                    settings.get('count_reports', False)
+                )
+                return
 
             if not text_to_send.strip():
                 return
 
-            # Проверяем раскладку клавиатуры
-            if not self.check_keyboard_layout():
-                logging.info("Раскладка клавиатуры не английская - переключаем")
-                win32api.keybd_event(win32con.VK_SHIFT, 0, 0, 0)
-                win32api.keybd_event(win32con.VK_SHIFT, 0, win32con.KEYEVENTF_KEYUP, 0)
-                time.sleep(0.01)
-
-            # Сохраняем текущий буфер обмена
-            try:
-                win32clipboard.OpenClipboard()
-                original_clipboard = win32clipboard.GetClipboardData()
-            except:
-                original_clipboard = ""
-            finally:
-                win32clipboard.CloseClipboard()
-
-            # Копируем текст в буфер обмена
-            try:
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardText(text_to_send, win32con.CF_UNICODETEXT)
-            finally:
-                win32clipboard.CloseClipboard()
-
-            # Кликаем по координатам (вместо поиска RAGE окна)
-            self._parent.mouse_click(1405, 1033)  # Клик по полю ввода
-            self._parent.restore_mouse_position()
-            
-            # Вставляем текст (Ctrl+V)
-            win32api.keybd_event(win32con.VK_CONTROL, 0, 0, 0)
-            win32api.keybd_event(ord('V'), 0, 0, 0)
-            time.sleep(0.01)
-            win32api.keybd_event(ord('V'), 0, win32con.KEYEVENTF_KEYUP, 0)
-            win32api.keybd_event(win32con.VK_CONTROL, 0, win32con.KEYEVENTF_KEYUP, 0)
-
-            # Проверяем, что текст вставился корректно
-            self._verify_inserted_text(text_to_send)
-
-            # Нажатие стрелки вправо
-            win32api.keybd_event(win32con.VK_RIGHT, 0, 0, 0)
-            time.sleep(0.01)
-            win32api.keybd_event(win32con.VK_RIGHT, 0, win32con.KEYEVENTF_KEYUP, 0)
-            
-            # Если нужно - отправляем Enter
-            if (hasattr(self._parent, 'advanced_settings') and 
-                name in self._parent.advanced_settings and
-                self._parent.advanced_settings[name]['auto_enter']):
-                time.sleep(0.01)
-                win32api.keybd_event(win32con.VK_RETURN, 0, 0, 0)
-                time.sleep(0.01)
-                win32api.keybd_event(win32con.VK_RETURN, 0, win32con.KEYEVENTF_KEYUP, 0)
-            
-            if count_report:
-                try:
-                    script_dir = Path(__file__).parent
-                    settings_dir = script_dir / "settings"
-                    settings_dir.mkdir(parents=True, exist_ok=True)
-                    
-                    tmp_path = settings_dir / "report_counter.tmp"
-                    with open(tmp_path, 'w') as f:
-                        f.write('+1')
-                    print(f"[DEBUG] Создан tmp файл: {tmp_path}")
-                except Exception as e:
-                    logging.error(f"Ошибка при обновлении счетчика: {e}")
-
-            # Восстанавливаем буфер обмена
-            try:
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardText(original_clipboard)
-            finally:
-                win32clipboard.CloseClipboard()
-            
+            # Координаты поля ввода считаются здесь, клик выполняет поток ввода
+            click_point = self._parent.normalize_coordinates(1405, 1033)
+            mode = text_injection.choose_injection_mode(text_to_send, mode)
+
+            # С автоотправкой проверка идет до Enter, иначе - отдельным заданием после отправки
+            verifier = self._parent.paste_verifier
+            placement = verifier.placement(mode, auto_enter)
+            injection_worker = self._parent.injection_worker
+            job_id = injection_worker.submit(
+                name, send_counted_response, text_to_send, click_point, auto_enter, count_report, mode,
+                verifier if placement == 'inline' else None
+            )
+            # Проверять нечего, если отправка не попала в очередь
+            if job_id is not None and placement == 'after':
+                # Окно игры сейчас активно: кнопки исполнителя фокус не забирают
+                injection_worker.submit('verify', verifier.verify_job, text_to_send,
+                                        injection_worker.sink.foreground_window())
         except Exception as e:
             logging.error(f"Ошибка при отправке текста: {e}")
-            try:
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardText(original_clipboard)
-            except:
-                pass
-            finally:
-                win32clipboard.CloseClipboard()
-
-    def _verify_inserted_text(self, expected_text):
-        """Проверяет, что текст вставился корректно"""
-        try:
-            # Получаем текст из поля ввода (через Ctrl+A, Ctrl+C)
-            win32api.keybd_event(win32con.VK_CONTROL, 0, 0, 0)
-            win32api.keybd_event(ord('A'), 0, 0, 0)
-            time.sleep(0.01)
-            win32api.keybd_event(ord('A'), 0, win32con.KEYEVENTF_KEYUP, 0)
-            win32api.keybd_event(win32con.VK_CONTROL, 0, win32con.KEYEVENTF_KEYUP, 0)
-            time.sleep(0.01)
-            
-            win32api.keybd_event(win32con.VK_CONTROL, 0, 0, 0)
-            win32api.keybd_event(ord('C'), 0, 0, 0)
-            time.sleep(0.01)
-            win32api.keybd_event(ord('C'), 0, win32con.KEYEVENTF_KEYUP, 0)
-            win32api.keybd_event(win32con.VK_CONTROL, 0, win32con.KEYEVENTF_KEYUP, 0)
-            time.sleep(0.1)
-            
-            # Получаем текст из буфера обмена
-            try:
-                win32clipboard.OpenClipboard()
-                inserted_text = win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT)
-            except TypeError:
-                # Если не удалось получить как Unicode, пробуем как текст
-                try:
-                    inserted_text = win32clipboard.GetClipboardData(win32con.CF_TEXT)
-                    if isinstance(inserted_text, bytes):
-                        inserted_text = inserted_text.decode('cp1251')
-                except:
-                    inserted_text = ""
-            finally:
-                win32clipboard.CloseClipboard()
-                
-            # Нормализуем строки для сравнения
-            expected_normalized = expected_text.strip().lower()
-            inserted_normalized = inserted_text.strip().lower()
-            
-            if inserted_normalized != expected_normalized:
-                logging.error(f"Текст не совпадает! Ожидалось: '{expected_text}', получено: '{inserted_text}'")
-                return False
-            return True
-        except Exception as e:
-            logging.error(f"Ошибка при проверке вставленного текста: {e}")
-            return False
 
     def click_at_normalized_coords(self, x, y):
         """Выполняет клик по нормализованным координатам."""
         try:
-            normalized_x, normalized_y = self.parent.normalize_coordinates(x, y)
-            pyautogui.click(normalized_x, normalized_y)
+            point = self._parent.normalize_coordinates(x, y)
+            self._parent.injection_worker.submit('click', pointer_actions.click_job, point, restore=False)
         except Exception as e:
             logging.error(f"Ошибка при клике: {e}")
 
@@ -404,16 +372,54 @@ class ButtonExecutor(QWidget):
         else:
             self.h_scroll.setRange(0, 0)
 
+    @staticmethod
+    def snapshot_buttons(button_data):
+        """Копии записей кнопок: редактор меняет свои записи на месте, а сравнивать нужно со старыми"""
+        return {name: dict(data) for name, data in button_data.items()}
+
     def update_buttons(self, button_data):
-        self.button_data = button_data
-        self.create_buttons()
-        self.update_container_size()
+        """Применяет новый набор кнопок, пересоздавая только добавленные; возвращает разницу
 
-    def reload_buttons(self):
-        parent = self._parent
-        if parent:
-            parent.load_buttons_from_file()
-            self.update_buttons(parent.button_data)
+        С библиотекой ответов вместо переданного набора заново выполняется текущий поиск.
+        """
+        if self.library:
+            return self.search_library(self.library_query)
+        return self.apply_buttons(button_data)
+
+    def query_library(self, query):
+        """Страница результатов поиска в библиотеке, разложенная по столбцам окна"""
+        try:
+            entries = self.library.search(query, self.library_page_size)
+        except Exception as e:
+            logging.error(f"Ошибка поиска в библиотеке ответов: {e}")
+            return {}
+        for index, entry in enumerate(entries.values()):
+            entry['position'] = (index % self.max_rows_per_column, index // self.max_rows_per_column)
+        return entries
+
+    def search_library(self, query):
+        """Показывает кнопки библиотеки, подходящие под запрос; пустой запрос - первые кнопки файла"""
+        self.library_query = query
+        return self.apply_buttons(self.query_library(query))
+
+    def apply_buttons(self, button_data):
+        """Приводит окно к набору кнопок через разницу со старым набором"""
+        diff = button_diff.diff_buttons(self.button_data, button_data)
+        self.button_data = self.snapshot_buttons(button_data)
+        button_diff.apply_grid_diff(self.buttons_layout, self.button_widgets, diff,
+                                    self.button_data, self.make_button)
+        if diff['added'] or diff['removed']:
+            self.update_container_size()
+        return diff
+
+    def reload_buttons(self, path):
+        """Перечитывает измененный файл кнопок"""
+        entries = button_diff.load_button_entries(path)
+        if entries is None:
+            return
+        diff = self.update_buttons(entries)
+        if not button_diff.is_empty(diff):
+            logging.info(f"Кнопки обновлены из файла: {diff}")
 
     def update_buttons_width(self, width):
         self.button_width = width
@@ -443,11 +449,10 @@ class ButtonExecutor(QWidget):
         self.update_container_size()
 
     def load_width_from_file(self):
-        width_file = "button_width.cfg"
-        if os.path.exists(width_file):
+        text = get_settings_store().get("button_width.cfg")
+        if text is not None:
             try:
-                with open(width_file, 'r') as f:
-                    self.button_width = int(f.read().strip())
+                self.button_width = int(text)
             except Exception as e:
                 logging.info(f"Ошибка загрузки ширины: {e}")
 
@@ -469,7 +474,8 @@ class ButtonExecutor(QWidget):
     def mouseMoveEvent(self, event):
         """Закрываем окно если пропал нужный цвет"""
         if hasattr(self, '_parent') and self._parent:
-            if not self._parent.check_screen_color():
+            # Берем последний результат фоновой проверки, без захвата экрана
+            if not self._parent.detection_worker.value('executor', True):
                 self.hide()
         super().mouseMoveEvent(event)
 
@@ -488,59 +494,7 @@ class ButtonExecutor(QWidget):
 
     def _send_single_response(self, text):
         """Отправляет один ответ в чат RAGE Multiplayer"""
-        try:
-            # Сохраняем текущий буфер обмена с win32clipboard
-            try:
-                win32clipboard.OpenClipboard()
-                original_clipboard = win32clipboard.GetClipboardData()
-            finally:
-                win32clipboard.CloseClipboard()
-            
-            # Копируем текст в буфер обмена
-            try:
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardText(text)
-            finally:
-                win32clipboard.CloseClipboard()
-            
-            # Даем время для обработки буфера обмена
-            time.sleep(0.2)
-            
-            # Активируем окно RAGE Multiplayer
-            try:
-                window = win32gui.FindWindow(None, "RAGE Multiplayer")
-                if window:
-                    win32gui.SetForegroundWindow(window)
-                    time.sleep(0.2)
-            except Exception as e:
-                logging.info(f"Ошибка активации окна: {e}")
-            
-            # Эмулируем вставку через Ctrl+V
-            win32api.keybd_event(win32con.VK_CONTROL, 0, 0, 0)
-            win32api.keybd_event(ord('V'), 0, 0, 0)
-            time.sleep(0.01)
-            win32api.keybd_event(ord('V'), 0, win32con.KEYEVENTF_KEYUP, 0)
-            win32api.keybd_event(win32con.VK_CONTROL, 0, win32con.KEYEVENTF_KEYUP, 0)
-            
-            # Восстанавливаем оригинальный буфер обмена
-            try:
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardText(original_clipboard)
-            finally:
-                win32clipboard.CloseClipboard()
-            
-        except Exception as e:
-            logging.info(f"Ошибка отправки текста: {e}")
-            try:
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardText(original_clipboard)
-            except:
-                pass
-            finally:
-                win32clipboard.CloseClipboard()
+        self._parent.injection_worker.submit('single_response', text_injection.send_to_window, text)
 
     def focusInEvent(self, event):
         # Игнорируем событие получения фокуса
@@ -0,0 +1,68 @@
+import zlib
+
+import numpy as np
+
+
+class ChangeGate:
+    """Повторно использует результат детектора, пока область кадра не изменилась"""
+
+    DEFAULT_SETTINGS = {
+        'enabled': True,
+        # Шаг выборки пикселей для отпечатка: 1 - каждый пиксель
+        'stride': 1
+    }
+
+    def __init__(self, settings=None):
+        self.settings = dict(self.DEFAULT_SETTINGS)
+        self._entries = {}
+        self.configure(settings or {})
+        self.reset_stats()
+
+    def configure(self, settings):
+        """Применяет настройки из chat_detection_settings.json (ключ change_gate)"""
+        for key in self.DEFAULT_SETTINGS:
+            if key in settings:
+                self.settings[key] = settings[key]
+        self.settings['stride'] = max(1, int(self.settings['stride']))
+        self.invalidate()
+
+    def reset_stats(self):
+        self.stats = {
+            'hits': 0,
+            'misses': 0
+        }
+
+    def fingerprint(self, pixels, key=()):
+        """Контрольная сумма области с шагом stride и параметров детектора"""
+        stride = self.settings['stride']
+        sample = np.ascontiguousarray(np.asarray(pixels)[::stride, ::stride])
+        checksum = zlib.crc32(repr((sample.shape, key)).encode())
+        return zlib.crc32(sample.tobytes(), checksum)
+
+    def run(self, name, pixels, compute, key=()):
+        """Возвращает прежний результат для неизменной области или вызывает compute()"""
+        if not self.settings['enabled']:
+            return compute()
+
+        fingerprint = self.fingerprint(pixels, key)
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == fingerprint:
+            self.stats['hits'] += 1
+            return entry[1]
+
+        self.stats['misses'] += 1
+        result = compute()
+        self._entries[name] = (fingerprint, result)
+        return result
+
+    def invalidate(self, name=None):
+        """Сбрасывает сохраненные результаты (все или одной пробы)"""
+        if name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(name, None)
+
+    def hit_rate(self):
+        """Доля тиков, на которых детектор был пропущен"""
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else 0.0
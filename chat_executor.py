@@ -2,7 +2,6 @@ from PyQt6.QtWidgets import (QWidget, QGridLayout, QPushButton, QScrollArea,
                            QVBoxLayout, QFrame, QMessageBox, QSizePolicy, QScrollBar)
 from PyQt6.QtCore import pyqtSignal, Qt, QPoint, QPropertyAnimation, QEasingCurve, QRect, QEvent, QTimer
 from PyQt6.QtGui import QGuiApplication, QShortcut, QKeySequence
-from PyQt6.QtCore import QFileSystemWatcher
 import os
 import numpy as np
 from PIL import Image
@@ -11,17 +10,24 @@ import win32api
 import win32con
 import win32process
 import psutil
-from pathlib import Path
-import win32clipboard
 from pynput import keyboard as pynput_keyboard
 import time
-import pyautogui
 import random
 import win32gui
 import ctypes
 
 import logging
-import json
+
+from .frame_sampler import FrameSampler
+from .detection_worker import DetectionWorker
+from .injection_worker import InjectionWorker
+from .send_queue import SendQueue
+from .zone_check import evaluate_zone
+from .change_gate import ChangeGate
+from .settings_store import get_settings_store
+from .file_watcher import DebouncedFileWatcher
+from . import button_diff
+from . import geometry_detector
 
 logging.basicConfig(
     level=logging.INFO,
@@ -46,9 +52,14 @@ class ChatExecutor(QWidget):
         self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
         self.setAttribute(Qt.WidgetAttribute.WA_ShowWithoutActivating)
         
-        self.watcher = QFileSystemWatcher()
-        self.watcher.fileChanged.connect(self.reload_buttons)
-        self.button_data = button_data
+        # Внешние правки файла чат-команд применяются к окну без пересоздания всех кнопок
+        config_file = getattr(getattr(parent, 'chat_commands_tab', None), 'config_file', None)
+        self.watcher = DebouncedFileWatcher(config_file, parent=self) if config_file else None
+        if self.watcher:
+            self.watcher.changed.connect(self.reload_buttons)
+        self.button_data = {name: dict(data) for name, data in button_data.items()}
+        self.button_widgets = {}
+        self.grid_entries = {}
         self.button_width = 120
         self.button_height = 30
         
@@ -66,18 +77,38 @@ class ChatExecutor(QWidget):
         self.zone_size = 15
         self.min_matches_required = 3
         self.check_step = 3
-        
+
+        # Фоновый поток и общий кадр берем у редактора, чтобы все пробы снимались одним захватом
+        self.detection_worker = getattr(parent, 'detection_worker', None)
+        self._owns_detection_worker = self.detection_worker is None
+        if self._owns_detection_worker:
+            self.detection_worker = DetectionWorker(FrameSampler())
+        self.frame_sampler = self.detection_worker.frame_sampler
+        self.screen_source = self.frame_sampler.source
+        # Ввод отправляет общий поток редактора, чтобы задания не пересекались
+        self.injection_worker = getattr(parent, 'injection_worker', None)
+        self._owns_injection_worker = self.injection_worker is None
+        if self._owns_injection_worker:
+            self.injection_worker = InjectionWorker()
+        self.send_queue = getattr(parent, 'send_queue', None) or SendQueue(self.injection_worker)
+        self.geometry_detector = geometry_detector.PyramidGeometryDetector()
+        self.change_gate = ChangeGate()
+
+        # Настройки чата берутся из общего хранилища и обновляются по его сигналу
+        self.settings_store = getattr(parent, 'settings_store', None) or get_settings_store()
+        self.settings_store.changed.connect(self.on_settings_changed)
         self.load_chat_detection_settings()
         
-        # Таймеры для проверки условий
-        self.check_timer = QTimer(self)
-        self.check_timer.timeout.connect(self.check_chat_conditions)
-        self.check_timer.setInterval(1500)
-        
-        self.cursor_check_timer = QTimer(self)
-        self.cursor_check_timer.timeout.connect(self.check_cursor_appearance)
-        self.cursor_check_timer.setInterval(300)
+        # Проверки выполняются в фоновом потоке и включаются горячей клавишей
+        self.detection_worker.add_check('chat', self.detect_chat_opened, 250, 1500, enabled=False)
+        self.detection_worker.add_check('chat_cursor', self.check_cursor_appearance, 100, 300,
+                                        enabled=False, publish=False)
+        self.detection_worker.state_changed.connect(self.on_detection_state_changed)
+        if self._owns_detection_worker:
+            self.detection_worker.start()
         
+        # Единственный источник видимости окна: его меняют проверка по Е/T, пока она
+        # включена, иначе точка чата из редактора; показывает и скрывает только update_visibility
         self.should_be_visible = False
         self._last_geometry_log = 0
         self._last_debug_log = 0
@@ -150,28 +181,25 @@ class ChatExecutor(QWidget):
         """Активирует проверку чата по горячей клавише Е/T"""
         if not self.checking_active:
             self.checking_active = True
-            self.check_timer.start()
-            self.cursor_check_timer.start()
+            # Первая проверка выполняется сразу после включения
+            self.detection_worker.set_check_enabled('chat_cursor', True)
+            self.detection_worker.set_check_enabled('chat', True)
             logging.info("🎯 АКТИВИРОВАНА ПРОВЕРКА ЧАТА (Е/T)")
             
             # Визуальная обратная связь
             self.flash_window()
-            
-            # Сразу делаем первую проверку
-            self.check_chat_conditions()
     
     def deactivate_chat_checking(self):
         """Деактивирует проверку чата по горячей клавише ESC/Enter"""
         if self.checking_active:
             self.checking_active = False
-            self.check_timer.stop()
-            self.cursor_check_timer.stop()
+            self.detection_worker.set_check_enabled('chat', False)
+            self.detection_worker.set_check_enabled('chat_cursor', False)
             logging.info("⏹️ ПРОВЕРКА ЧАТА ОСТАНОВЛЕНА (ESC/Enter)")
             
-            # Скрываем окно если оно видимо
-            if self.isVisible() and not self.mouse_over:
-                self.hide()
-                logging.info("📱 Окно чат-команд скрыто")
+            # Чат закрыт: окно скроется сразу или когда с него уйдет мышь
+            self.should_be_visible = False
+            self.update_visibility()
     
     def flash_window(self):
         """Мигание окна для визуальной обратной связи"""
@@ -186,16 +214,26 @@ class ChatExecutor(QWidget):
         except Exception as e:
             logging.error(f"Ошибка при мигании окна: {e}")
     
-    def check_chat_conditions(self):
-        """Проверяет условия для открытия чат-команд"""
-        if not self.checking_active:
+    def on_detection_state_changed(self, name, value):
+        """Реагирует на изменение состояния чата из фонового потока"""
+        if name != 'chat' or not self.checking_active:
             return
-            
+        
+        # Обновляем видимость только при изменении состояния
+        if value != self.should_be_visible:
+            self.should_be_visible = value
+            self.update_visibility()
+
+    def on_chat_point_changed(self, opened):
+        """Состояние точки чата из редактора; решает видимость, пока не включена проверка по Е/T"""
+        if self.checking_active:
+            return
+        self.should_be_visible = opened
+        self.update_visibility()
+
+    def detect_chat_opened(self):
+        """Выполняется в фоновом потоке: открыт ли чат"""
         try:
-            # Если мышь над окном - не скрываем
-            if self.mouse_over:
-                return
-                
             # Комбинированная проверка: курсор + геометрия + цвет
             cursor_detected = self.cursor_cache.get('cursor_visible', False)
             geometry_detected = self.detect_chat_by_geometry()
@@ -209,13 +247,11 @@ class ChatExecutor(QWidget):
                 logging.info(f"🔍 Проверка: курсор={cursor_detected}, геометрия={geometry_detected}, цвет={color_detected}")
                 self._last_check_log = time.time()
             
-            # Обновляем видимость только при изменении состояния
-            if chat_opened != self.should_be_visible:
-                self.should_be_visible = chat_opened
-                self.update_visibility()
+            return chat_opened
                 
         except Exception as e:
-            logging.error(f"❌ Ошибка в check_chat_conditions: {e}")
+            logging.error(f"❌ Ошибка в detect_chat_opened: {e}")
+            return False
     
     def check_cursor_appearance(self):
         """Проверка появления курсоров в области чата"""
@@ -301,7 +337,7 @@ class ChatExecutor(QWidget):
                 if cursor_type == 32512:  # IDC_ARROW
                     try:
                         cursor_pos = win32gui.GetCursorPos()
-                        pixel_color = pyautogui.pixel(cursor_pos[0], cursor_pos[1])
+                        pixel_color = self.screen_source.pixel(cursor_pos[0], cursor_pos[1])
                         brightness = sum(pixel_color) / 3
                         # Поле ввода обычно имеет светлый фон
                         return brightness > 150
@@ -318,25 +354,28 @@ class ChatExecutor(QWidget):
     def detect_chat_by_geometry(self):
         """Обнаруживает чат по геометрическим признакам"""
         try:
-            x, y = self.chat_detection_coords
-            search_width, search_height = 900, 300
-            
-            # Рассчитываем область поиска
-            left = max(0, x - search_width // 2)
-            top = max(0, y - search_height // 2)
-            
-            region = (left, top, search_width, search_height)
-            screenshot = pyautogui.screenshot(region=region)
-            
-            # Конвертируем в grayscale для упрощения анализа
-            grayscale = screenshot.convert('L')
-            
-            # Ищем прямоугольные области (поля ввода чата)
-            input_fields = self.find_input_fields(grayscale, search_width, search_height)
+            region = self.get_geometry_region()
+            left, top, search_width, search_height = region
+            screenshot = self.frame_sampler.region(*region)
+
+            # Ищем прямоугольные области (поля ввода чата), если область изменилась
+            input_fields = self.change_gate.run(
+                'chat_geometry',
+                screenshot,
+                lambda: self.find_input_fields(
+                    geometry_detector.to_gray_array(screenshot), search_width, search_height),
+                key=tuple(sorted(self.geometry_detector.settings.items()))
+            )
             
             # Логируем для отладки
             if hasattr(self, '_last_geometry_log') and time.time() - self._last_geometry_log > 5:
-                logging.info(f"🔍 Геометрия: найдено {input_fields} полей ввода")
+                summary = self.geometry_detector.summary()
+                logging.info(f"🔍 Геометрия: найдено {input_fields} полей ввода, "
+                             f"грубый уровень {summary['coarse_share']:.0%}, "
+                             f"полный {summary['full_share']:.0%}, "
+                             f"в среднем {summary['avg_ms']:.1f} мс за тик, "
+                             f"без изменений {self.change_gate.hit_rate():.0%} "
+                             f"({self.change_gate.stats['hits']}/{self.change_gate.stats['misses']})")
                 self._last_geometry_log = time.time()
             
             return input_fields >= 1
@@ -345,195 +384,54 @@ class ChatExecutor(QWidget):
             logging.error(f"❌ Ошибка обнаружения по геометрии: {e}")
             return False
 
+    def get_geometry_region(self):
+        """Возвращает область поиска чата по геометрии (left, top, width, height)"""
+        x, y = self.chat_detection_coords
+        search_width, search_height = 900, 300
+        return (max(0, x - search_width // 2), max(0, y - search_height // 2),
+                search_width, search_height)
+
+    def get_zone_region(self):
+        """Возвращает область цветовой зоны чата (left, top, width, height)"""
+        center_x, center_y = self.chat_detection_coords
+        half_size = self.zone_size // 2
+        return (max(0, center_x - half_size), max(0, center_y - half_size),
+                self.zone_size, self.zone_size)
+
+    def register_frame_probes(self):
+        """Регистрирует области чата в общем кадре"""
+        self.frame_sampler.set_probe('chat_geometry', self.get_geometry_region())
+        self.frame_sampler.set_probe('chat_zone', self.get_zone_region())
+
     def find_input_fields(self, image, width, height):
         """Находит прямоугольные поля ввода в изображении"""
-        pixels = list(image.getdata())
-        input_fields = 0
-        
-        # Ищем характерные паттерны полей ввода
-        horizontal_lines = self.detect_horizontal_lines(pixels, width, height)
-        vertical_lines = self.detect_vertical_lines(pixels, width, height)
-        rectangles = self.detect_rectangles(pixels, width, height)
-        
-        # Комбинируем результаты
-        if horizontal_lines >= 2 and vertical_lines >= 2:
-            input_fields += 1
-        if rectangles >= 1:
-            input_fields += 1
-        
-        return min(input_fields, 2)
-
-    def detect_horizontal_lines(self, pixels, width, height):
-        """Обнаруживает горизонтальные линии"""
-        lines_found = 0
-        line_threshold = width * 0.4
-        
-        for y in range(5, height - 5):
-            line_length = 0
-            max_line_length = 0
-            
-            for x in range(width):
-                idx = y * width + x
-                brightness = pixels[idx]
-                
-                if brightness < 50 or brightness > 200:
-                    line_length += 1
-                    max_line_length = max(max_line_length, line_length)
-                else:
-                    line_length = 0
-            
-            if max_line_length >= line_threshold:
-                lines_found += 1
-        
-        return lines_found
-
-    def detect_vertical_lines(self, pixels, width, height):
-        """Обнаруживает вертикальные линии"""
-        lines_found = 0
-        line_threshold = height * 0.3
-        
-        for x in range(5, width - 5):
-            line_length = 0
-            max_line_length = 0
-            
-            for y in range(height):
-                idx = y * width + x
-                brightness = pixels[idx]
-                
-                if brightness < 50 or brightness > 200:
-                    line_length += 1
-                    max_line_length = max(max_line_length, line_length)
-                else:
-                    line_length = 0
-            
-            if max_line_length >= line_threshold:
-                lines_found += 1
-        
-        return lines_found
-
-    def detect_rectangles(self, pixels, width, height):
-        """Обнаруживает прямоугольные области"""
-        rectangles = 0
-        
-        # Ищем углы прямоугольников
-        corners = self.find_corners(pixels, width, height)
-        
-        if corners >= 4:
-            rectangles += 1
-        
-        # Ищем области с резкими границами
-        bounded_areas = self.find_bounded_areas(pixels, width, height)
-        rectangles += bounded_areas
-        
-        return rectangles
-
-    def find_corners(self, pixels, width, height):
-        """Находит углы прямоугольников"""
-        corners = 0
-        
-        for y in range(1, height - 1):
-            for x in range(1, width - 1):
-                idx = y * width + x
-                current = pixels[idx]
-                
-                # Проверяем соседей
-                left = pixels[idx - 1]
-                right = pixels[idx + 1]
-                top = pixels[idx - width]
-                bottom = pixels[idx + width]
-                
-                horizontal_contrast = abs(left - right) > 50
-                vertical_contrast = abs(top - bottom) > 50
-                
-                if horizontal_contrast and vertical_contrast:
-                    corners += 1
-        
-        return corners
-
-    def find_bounded_areas(self, pixels, width, height):
-        """Находит области ограниченные контрастными границами"""
-        bounded_areas = 0
-        
-        for y in range(10, height - 10, 20):
-            for x in range(10, width - 10, 20):
-                if self.is_bounded_area(pixels, width, height, x, y):
-                    bounded_areas += 1
-        
-        return min(bounded_areas, 2)
-
-    def is_bounded_area(self, pixels, width, height, start_x, start_y):
-        """Проверяет является ли область ограниченной"""
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        
-        boundaries_found = 0
-        
-        for dx, dy in directions:
-            x, y = start_x, start_y
-            boundary_found = False
-            
-            for _ in range(30):
-                x += dx
-                y += dy
-                
-                if x < 0 or x >= width or y < 0 or y >= height:
-                    break
-                
-                idx = y * width + x
-                brightness = pixels[idx]
-                
-                start_idx = start_y * width + start_x
-                start_brightness = pixels[start_idx]
-                
-                if abs(brightness - start_brightness) > 80:
-                    boundary_found = True
-                    break
-            
-            if boundary_found:
-                boundaries_found += 1
-        
-        return boundaries_found >= 3
+        gray = geometry_detector.to_gray_array(image)
+        return self.geometry_detector.detect(gray.reshape(height, width))
 
     def check_chat_zone(self):
         """Проверяет чат по зоне с умной валидацией цвета"""
         try:
-            center_x, center_y = self.chat_detection_coords
-            
-            # Рассчитываем границы зоны
-            half_size = self.zone_size // 2
-            left = max(0, center_x - half_size)
-            top = max(0, center_y - half_size)
-            
-            matches_found = 0
-            total_checked = 0
-            confidence_scores = []
-            
-            # Проверяем точки в зоне
-            for x in range(left, left + self.zone_size, self.check_step):
-                for y in range(top, top + self.zone_size, self.check_step):
-                    try:
-                        screenshot = pyautogui.screenshot(region=(x, y, 1, 1))
-                        pixel_color = screenshot.getpixel((0, 0))
-                        
-                        color_match = self.is_color_similar(pixel_color, self.chat_detection_color)
-                        
-                        if color_match:
-                            matches_found += 1
-                            confidence = self.calculate_color_confidence(pixel_color, self.chat_detection_color)
-                            confidence_scores.append(confidence)
-                        
-                        total_checked += 1
-                        
-                    except Exception:
-                        continue
-            
-            # Динамическое определение порога
-            if confidence_scores:
-                avg_confidence = sum(confidence_scores) / len(confidence_scores)
-                dynamic_threshold = max(1, int(self.min_matches_required * (1 - avg_confidence / 100)))
-            else:
-                dynamic_threshold = self.min_matches_required
-            
-            result = matches_found >= dynamic_threshold
+            left, top, zone_width, zone_height = self.get_zone_region()
+
+            # Вся зона берется из общего кадра одним срезом
+            zone = self.frame_sampler.region(left, top, zone_width, zone_height)
+
+            # Совпадения, уверенность и динамический порог считаются векторно
+            zone_params = (
+                tuple(self.chat_detection_color),
+                self.chat_color_tolerance,
+                self.min_matches_required,
+                self.check_step
+            )
+            zone_result = self.change_gate.run(
+                'chat_zone',
+                zone,
+                lambda: evaluate_zone(zone, *zone_params),
+                key=zone_params
+            )
+            matches_found = zone_result['matches']
+            total_checked = zone_result['checked']
+            result = zone_result['result']
             
             # Логируем для отладки
             if hasattr(self, '_last_debug_log') and time.time() - self._last_debug_log > 2:
@@ -590,74 +488,30 @@ class ChatExecutor(QWidget):
         self.chat_detection_coords = coords
         self.chat_detection_color = color
         self.chat_color_tolerance = tolerance
+        self.register_frame_probes()
         logging.info(f"Обновлены настройки чата: {coords} - {color}")
 
     def send_chat_command(self, name, command):
-        """Отправляет чат команду в игру"""
-        try:
-            # Сохраняем текущий буфер обмена
-            try:
-                win32clipboard.OpenClipboard()
-                original_clipboard = win32clipboard.GetClipboardData()
-            except:
-                original_clipboard = ""
-            finally:
-                win32clipboard.CloseClipboard()
-
-            # Копируем команду в буфер обмена
-            try:
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardText(command, win32con.CF_UNICODETEXT)
-            finally:
-                win32clipboard.CloseClipboard()
-
-            # Активируем игровое окно и вставляем команду
-            time.sleep(0.1)
-            
-            # Вставляем текст (Ctrl+V)
-            win32api.keybd_event(win32con.VK_CONTROL, 0, 0, 0)
-            win32api.keybd_event(ord('V'), 0, 0, 0)
-            time.sleep(0.01)
-            win32api.keybd_event(ord('V'), 0, win32con.KEYEVENTF_KEYUP, 0)
-            win32api.keybd_event(win32con.VK_CONTROL, 0, win32con.KEYEVENTF_KEYUP, 0)
-            
-            # Отправляем команду (Enter)
-            time.sleep(0.05)
-            win32api.keybd_event(win32con.VK_RETURN, 0, 0, 0)
-            time.sleep(0.01)
-            win32api.keybd_event(win32con.VK_RETURN, 0, win32con.KEYEVENTF_KEYUP, 0)
-
-            # Восстанавливаем буфер обмена
-            try:
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardText(original_clipboard)
-            finally:
-                win32clipboard.CloseClipboard()
-            
-            logging.info(f"Отправлена команда: {command}")
-            
-        except Exception as e:
-            logging.error(f"Ошибка при отправке команды: {e}")
-            try:
-                win32clipboard.OpenClipboard()
-                win32clipboard.EmptyClipboard()
-                win32clipboard.SetClipboardText(original_clipboard)
-            except:
-                pass
-            finally:
-                win32clipboard.CloseClipboard()
+        """Ставит чат-команду в очередь отправки; повтор и лимит чата учитывает очередь"""
+        self.send_queue.submit(command, name=name)
 
     def update_buttons(self, button_data):
-        self.button_data = button_data
-        self.create_buttons()
-
-    def reload_buttons(self):
-        if self._parent:
-            if hasattr(self._parent, 'load_chat_commands'):
-                self._parent.load_chat_commands()
-                self.update_buttons(self._parent.chat_button_data)
+        """Применяет новый набор команд, пересоздавая только добавленные кнопки; возвращает разницу"""
+        self.button_data = {name: dict(data) for name, data in button_data.items()}
+        entries = self.layout_entries()
+        diff = button_diff.diff_buttons(self.grid_entries, entries)
+        button_diff.apply_grid_diff(self.buttons_layout, self.button_widgets, diff, entries, self.make_button)
+        self.grid_entries = entries
+        return diff
+
+    def reload_buttons(self, path):
+        """Перечитывает измененный файл чат-команд"""
+        entries = button_diff.load_button_entries(path)
+        if entries is None:
+            return
+        diff = self.update_buttons(entries)
+        if not button_diff.is_empty(diff):
+            logging.info(f"Чат-команды обновлены из файла: {diff}")
 
     def enterEvent(self, event):
         """Мышь вошла в область виджета"""
@@ -667,6 +521,8 @@ class ChatExecutor(QWidget):
     def leaveEvent(self, event):
         """Мышь покинула область виджета"""
         self.mouse_over = False
+        # Скрытие, отложенное, пока мышь была над окном, применяется сейчас
+        self.update_visibility()
         super().leaveEvent(event)
 
     def debug_current_color(self):
@@ -674,7 +530,7 @@ class ChatExecutor(QWidget):
         try:
             x, y = self.chat_detection_coords
             
-            screenshot = pyautogui.screenshot(region=(x-1, y-1, 3, 3))
+            screenshot = self.screen_source.grab_image((x-1, y-1, 3, 3))
             center_color = screenshot.getpixel((1, 1))
             
             logging.info("🎨 ТЕКУЩИЙ ЦВЕТ ДЛЯ ОТЛАДКИ:")
@@ -715,7 +571,7 @@ class ChatExecutor(QWidget):
             
             if in_chat_area and cursor_info:
                 try:
-                    pixel_color = pyautogui.pixel(cursor_pos[0], cursor_pos[1])
+                    pixel_color = self.screen_source.pixel(cursor_pos[0], cursor_pos[1])
                     brightness = sum(pixel_color) / 3
                     logging.info(f"🎨 Цвет под курсором: {pixel_color}, яркость: {brightness:.1f}")
                 except:
@@ -735,14 +591,8 @@ class ChatExecutor(QWidget):
             
             self.debug_current_color()
             
-            if chat_opened:
-                if self.isHidden():
-                    self.show()
-                    logging.info("📱 Окно чат-команд ПОКАЗАНО")
-            else:
-                if self.isVisible() and not self.mouse_over:
-                    self.hide()
-                    logging.info("📱 Окно чат-команд СКРЫТО")
+            self.should_be_visible = chat_opened
+            self.update_visibility()
                     
         except Exception as e:
             logging.error(f"❌ Ошибка принудительной проверки: {e}")
@@ -750,8 +600,13 @@ class ChatExecutor(QWidget):
     def closeEvent(self, event):
         """Обработка закрытия окна"""
         self.mouse_over = False
-        self.check_timer.stop()
-        self.cursor_check_timer.stop()
+        self.detection_worker.state_changed.disconnect(self.on_detection_state_changed)
+        self.detection_worker.remove_check('chat')
+        self.detection_worker.remove_check('chat_cursor')
+        if self._owns_detection_worker:
+            self.detection_worker.stop()
+        if self._owns_injection_worker:
+            self.injection_worker.stop()
         
         if self._parent and hasattr(self._parent, 'chat_executor_window'):
             self._parent.chat_executor_window = None
@@ -791,72 +646,83 @@ class ChatExecutor(QWidget):
             screen.top() + top_margin
         )
 
+    def layout_entries(self):
+        """Записи видимых кнопок с позициями в сетке: команды идут по строкам, не больше max_rows строк"""
+        entries = {}
+        columns = len(self.button_data) // self.max_rows + 1
+        for index, (name, data) in enumerate(self.button_data.items()):
+            row, col = divmod(index, columns)
+            if row >= self.max_rows:
+                break
+            entries[name] = dict(data, position=(row, col))
+        return entries
+
     def create_buttons(self):
         # Очищаем layout
         for i in reversed(range(self.buttons_layout.count())): 
             widget = self.buttons_layout.itemAt(i).widget()
             if widget:
                 widget.deleteLater()
-        
-        sorted_buttons = list(self.button_data.items())
-        row = 0
-        col = 0
-        
-        for name, data in sorted_buttons:
-            btn = QPushButton(name)
-            btn.setFixedSize(self.button_width, self.button_height)
-            btn.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: #2A4B7C;
-                    color: white;
-                    border: 1px solid #3A5B8C;
-                    border-radius: 3px;
-                    padding: 5px;
-                    font-size: 11px;
-                    min-width: {self.button_width}px;
-                    max-width: {self.button_width}px;
-                    min-height: {self.button_height}px;
-                    max-height: {self.button_height}px;
-                }}
-                QPushButton:hover {{
-                    background-color: #3A5B9C;
-                    border: 1px solid #4A6BAC;
-                }}
-            """)
-            btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
-            
-            self.buttons_layout.addWidget(btn, row, col)
-            btn.clicked.connect(lambda checked, n=name, d=data["description"]: 
-                              self.send_chat_command(n, d))
-            
-            col += 1
-            if col >= len(sorted_buttons) // self.max_rows + 1:
-                col = 0
-                row += 1
-                if row >= self.max_rows:
-                    break
+        self.button_widgets = {}
+        self.grid_entries = self.layout_entries()
+        
+        for name, data in self.grid_entries.items():
+            btn = self.make_button(name)
+            self.button_widgets[name] = btn
+            self.buttons_layout.addWidget(btn, *data['position'])
+
+    def make_button(self, name):
+        """Кнопка команды; команда берется при нажатии, поэтому правка текста не требует новой кнопки"""
+        btn = QPushButton(name)
+        btn.button_name = name
+        btn.setFixedSize(self.button_width, self.button_height)
+        btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: #2A4B7C;
+                color: white;
+                border: 1px solid #3A5B8C;
+                border-radius: 3px;
+                padding: 5px;
+                font-size: 11px;
+                min-width: {self.button_width}px;
+                max-width: {self.button_width}px;
+                min-height: {self.button_height}px;
+                max-height: {self.button_height}px;
+            }}
+            QPushButton:hover {{
+                background-color: #3A5B9C;
+                border: 1px solid #4A6BAC;
+            }}
+        """)
+        btn.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        btn.clicked.connect(lambda checked, b=btn: self.on_button_clicked(b.button_name))
+        return btn
+
+    def on_button_clicked(self, name):
+        """Отправляет текущую команду нажатой кнопки"""
+        data = self.button_data.get(name)
+        if data:
+            self.send_chat_command(name, data["description"])
+
+    def on_settings_changed(self, name, value):
+        """Применяет изменения настроек чата из хранилища"""
+        if name == "chat_detection_settings.json":
+            self.load_chat_detection_settings()
 
     def load_chat_detection_settings(self):
-        """Загружает настройки обнаружения чата из файла"""
+        """Загружает настройки обнаружения чата из хранилища настроек"""
         try:
-            if hasattr(self, '_parent') and self._parent and hasattr(self._parent, 'settings_dir'):
-                settings_dir = self._parent.settings_dir
-            else:
-                base_path = Path(__file__).parent.parent
-                settings_dir = base_path / "scripts" / "settings"
+            settings = self.settings_store.get("chat_detection_settings.json")
             
-            chat_settings_path = settings_dir / "chat_detection_settings.json"
-            
-            if chat_settings_path.exists():
-                with open(chat_settings_path, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                    
+            if settings is not None:
                 self.chat_detection_coords = tuple(settings.get('chat_check_coords', (100, 100)))
                 self.chat_detection_color = tuple(settings.get('chat_required_color', (68, 80, 95)))
                 self.chat_color_tolerance = settings.get('chat_tolerance', 10)
                 self.zone_size = settings.get('zone_size', 15)
                 self.min_matches_required = settings.get('min_matches_required', 3)
                 self.check_step = settings.get('check_step', 3)
+                self.geometry_detector.configure(settings.get('geometry_pyramid', {}))
+                self.change_gate.configure(settings.get('change_gate', {}))
                 
                 logging.info(f"✅ Настройки чата загружены: {self.chat_detection_coords}")
             else:
@@ -866,7 +732,9 @@ class ChatExecutor(QWidget):
         except Exception as e:
             logging.error(f"❌ Ошибка загрузки настроек чата: {e}")
             self.set_default_chat_settings()
-    
+
+        self.register_frame_probes()
+
     def set_default_chat_settings(self):
         """Устанавливает настройки по умолчанию"""
         self.chat_detection_coords = (100, 100)
@@ -0,0 +1,266 @@
+import time
+import ctypes
+import logging
+from ctypes import wintypes
+
+
+CF_TEXT = 1
+CF_UNICODETEXT = 13
+GMEM_MOVEABLE = 0x0002
+
+# GDI-объекты и отрисовка владельцем хранятся не в глобальной памяти - их не копируем.
+# CF_BITMAP Windows синтезирует обратно из CF_DIB
+SKIP_FORMATS = {2, 3, 9, 14, 0x80, 0x82, 0x83, 0x8E}
+
+
+class ClipboardBackend:
+    """Буфер обмена: снимок всех форматов, восстановление и текст"""
+
+    def snapshot(self):
+        """Возвращает {формат: bytes} для всех копируемых форматов"""
+        raise NotImplementedError
+
+    def restore(self, formats):
+        """Заменяет содержимое буфера снимком"""
+        raise NotImplementedError
+
+    def get_text(self):
+        raise NotImplementedError
+
+    def set_text(self, text):
+        self.restore({CF_UNICODETEXT: (text + '\0').encode('utf-16-le')})
+
+    def sequence(self):
+        """Номер изменения буфера или None"""
+        return None
+
+
+class Win32ClipboardBackend(ClipboardBackend):
+    """Буфер обмена Windows через user32/kernel32, все форматы из глобальной памяти"""
+
+    def __init__(self, open_attempts=5, open_delay=0.01):
+        self.open_attempts = open_attempts
+        self.open_delay = open_delay
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self._setup_prototypes()
+
+    def _setup_prototypes(self):
+        user32, kernel32 = self.user32, self.kernel32
+        user32.OpenClipboard.argtypes = [wintypes.HWND]
+        user32.EnumClipboardFormats.argtypes = [wintypes.UINT]
+        user32.EnumClipboardFormats.restype = wintypes.UINT
+        user32.GetClipboardData.argtypes = [wintypes.UINT]
+        user32.GetClipboardData.restype = wintypes.HANDLE
+        user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
+        user32.SetClipboardData.restype = wintypes.HANDLE
+        user32.GetClipboardSequenceNumber.restype = wintypes.DWORD
+        kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+        kernel32.GlobalLock.restype = wintypes.LPVOID
+        kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+        kernel32.GlobalSize.argtypes = [wintypes.HGLOBAL]
+        kernel32.GlobalSize.restype = ctypes.c_size_t
+        kernel32.GlobalAlloc.argtypes = [wintypes.UINT, ctypes.c_size_t]
+        kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
+        kernel32.GlobalFree.argtypes = [wintypes.HGLOBAL]
+
+    def _open(self):
+        """Открывает буфер; если его держит другое приложение - несколько попыток"""
+        for _ in range(self.open_attempts):
+            if self.user32.OpenClipboard(None):
+                return
+            time.sleep(self.open_delay)
+        raise OSError("Буфер обмена занят другим приложением")
+
+    def snapshot(self):
+        self._open()
+        try:
+            formats = {}
+            fmt = self.user32.EnumClipboardFormats(0)
+            while fmt:
+                if fmt not in SKIP_FORMATS:
+                    data = self._read(fmt)
+                    if data is not None:
+                        formats[fmt] = data
+                fmt = self.user32.EnumClipboardFormats(fmt)
+            return formats
+        finally:
+            self.user32.CloseClipboard()
+
+    def _read(self, fmt):
+        handle = self.user32.GetClipboardData(fmt)
+        if not handle:
+            return None
+        pointer = self.kernel32.GlobalLock(handle)
+        if not pointer:
+            return None
+        try:
+            return ctypes.string_at(pointer, self.kernel32.GlobalSize(handle))
+        finally:
+            self.kernel32.GlobalUnlock(handle)
+
+    def restore(self, formats):
+        self._open()
+        try:
+            self.user32.EmptyClipboard()
+            for fmt, data in formats.items():
+                handle = self.kernel32.GlobalAlloc(GMEM_MOVEABLE, max(1, len(data)))
+                pointer = self.kernel32.GlobalLock(handle)
+                ctypes.memmove(pointer, data, len(data))
+                self.kernel32.GlobalUnlock(handle)
+                # После успешной передачи памятью владеет система
+                if not self.user32.SetClipboardData(fmt, handle):
+                    self.kernel32.GlobalFree(handle)
+        finally:
+            self.user32.CloseClipboard()
+
+    def get_text(self):
+        self._open()
+        try:
+            handle = self.user32.GetClipboardData(CF_UNICODETEXT)
+            if not handle:
+                return ""
+            pointer = self.kernel32.GlobalLock(handle)
+            if not pointer:
+                return ""
+            try:
+                return ctypes.wstring_at(pointer)
+            finally:
+                self.kernel32.GlobalUnlock(handle)
+        finally:
+            self.user32.CloseClipboard()
+
+    def sequence(self):
+        return self.user32.GetClipboardSequenceNumber()
+
+
+class MemoryClipboard(ClipboardBackend):
+    """Буфер обмена в памяти для проверки без Windows"""
+
+    def __init__(self, formats=None, text=None):
+        self.formats = dict(formats or {})
+        if text is not None:
+            self.formats[CF_UNICODETEXT] = (text + '\0').encode('utf-16-le')
+        self._sequence = 0
+
+    def snapshot(self):
+        return dict(self.formats)
+
+    def restore(self, formats):
+        self.formats = dict(formats)
+        self._sequence += 1
+
+    def get_text(self):
+        data = self.formats.get(CF_UNICODETEXT)
+        return data.decode('utf-16-le').rstrip('\0') if data else ""
+
+    def sequence(self):
+        return self._sequence
+
+
+class ClipboardSession:
+    """Сессия буфера обмена на серию отправок
+
+    Первая запись делает снимок всех форматов, следующие его не трогают.
+    Буфер восстанавливается один раз, когда записей нет restore_delay секунд.
+    Если за это время буфер изменил кто-то другой, снимок отбрасывается,
+    чтобы не затереть то, что скопировал пользователь.
+    """
+
+    def __init__(self, backend, restore_delay=1.5, clock=time.monotonic):
+        self.backend = backend
+        self.restore_delay = restore_delay
+        self.clock = clock
+
+        self.active = False
+        self._snapshot = None
+        self._last_use = 0.0
+        self._started = 0.0
+        self._owned_sequence = None
+
+        self.stats = {
+            'sessions': 0,
+            'sends': 0,
+            'restored': 0,
+            'dropped': 0,
+            'snapshot_ms': 0.0,
+            'restore_ms': 0.0,
+            'held_ms': 0.0
+        }
+
+    def set_text(self, text):
+        """Кладет текст в буфер, при первой записи сохраняя прежнее содержимое"""
+        if not self.active:
+            started = time.perf_counter()
+            try:
+                self._snapshot = self.backend.snapshot()
+            except Exception as e:
+                logging.error(f"Ошибка снимка буфера обмена: {e}")
+                self._snapshot = None
+            self.stats['snapshot_ms'] += (time.perf_counter() - started) * 1000
+            self.stats['sessions'] += 1
+            self.active = True
+            self._started = self.clock()
+
+        self.backend.set_text(text)
+        self.stats['sends'] += 1
+        self.touch()
+
+    def get_text(self):
+        return self.backend.get_text()
+
+    def touch(self):
+        """Отмечает, что текущее содержимое буфера положили мы"""
+        self._last_use = self.clock()
+        self._owned_sequence = self.backend.sequence()
+
+    def time_until_restore(self):
+        """Секунды до восстановления или None, если сессии нет"""
+        if not self.active:
+            return None
+        return max(0.0, self._last_use + self.restore_delay - self.clock())
+
+    def restore_if_idle(self):
+        """Восстанавливает буфер, если отправок не было restore_delay секунд"""
+        if self.active and self.clock() - self._last_use >= self.restore_delay:
+            self.restore()
+
+    def restore(self):
+        """Завершает сессию и возвращает сохраненное содержимое буфера"""
+        if not self.active:
+            return
+        self.active = False
+        self.stats['held_ms'] += (self.clock() - self._started) * 1000
+        snapshot, self._snapshot = self._snapshot, None
+        if snapshot is None:
+            return
+
+        sequence = self.backend.sequence()
+        if sequence is not None and sequence != self._owned_sequence:
+            logging.info("Буфер обмена изменен пользователем - прежнее содержимое не восстанавливаем")
+            self.stats['dropped'] += 1
+            return
+
+        started = time.perf_counter()
+        try:
+            self.backend.restore(snapshot)
+            self.stats['restored'] += 1
+        except Exception as e:
+            logging.error(f"Ошибка восстановления буфера обмена: {e}")
+        self.stats['restore_ms'] += (time.perf_counter() - started) * 1000
+
+    def metrics(self):
+        """Счетчики сессий: число, отправки на сессию, время снимка и восстановления"""
+        sessions = self.stats['sessions']
+        return dict(self.stats,
+                    sends_per_session=self.stats['sends'] / sessions if sessions else 0.0,
+                    active=self.active)
+
+
+def load_restore_delay(app_settings, default=1.5):
+    """clipboard_restore_delay (секунды) из настроек app_settings.json"""
+    try:
+        return float(app_settings.get('clipboard_restore_delay', default))
+    except Exception as e:
+        logging.error(f"Ошибка чтения задержки восстановления буфера: {e}")
+    return default
@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+
+from PyQt6.QtCore import QCoreApplication
+
+
+class PendingWrite:
+    """Отложенная запись одного файла: последнее содержимое и время первого запроса"""
+
+    def __init__(self, path, render, encoding, requested):
+        self.path = path
+        self.render = render
+        self.encoding = encoding
+        self.first = requested
+        self.last = requested
+        self.forced = False
+
+
+class ConfigWriter:
+    """Фоновая запись файлов настроек
+
+    Запросы записи одного файла в пределах delay секунд схлопываются: пишется
+    только последнее содержимое, но не позже max_delay секунд после первого
+    запроса, чтобы непрерывное движение слайдера все равно сохранялось.
+    JSON сериализуется сразу в вызывающем потоке: данные редактора меняются
+    на месте, и в файл должен попасть снимок на момент запроса. Запись идет
+    в фоновом потоке. Файл пишется во временный
+    рядом и подменяется через os.replace, поэтому сбой посреди записи не
+    портит прежний файл. При выходе из приложения отложенные записи сбрасываются.
+    """
+
+    def __init__(self, delay=0.25, max_delay=1.0, clock=time.monotonic):
+        self.delay = delay
+        self.max_delay = max_delay
+        self.clock = clock
+
+        self._pending = {}
+        self._writing = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.stats = {
+            'requested': 0,
+            'coalesced': 0,
+            'written': 0,
+            'failed': 0,
+            'write_ms_total': 0.0,
+            'write_ms_max': 0.0,
+            'latency_ms_total': 0.0,
+            'latency_ms_max': 0.0
+        }
+        self.files = {}
+
+        app = QCoreApplication.instance()
+        if app:
+            app.aboutToQuit.connect(self.stop)
+
+    def write_json(self, path, data, **dump_kwargs):
+        """Ставит запись data в JSON; последующие изменения data на месте в файл не попадают"""
+        try:
+            text = json.dumps(data, **dump_kwargs)
+        except Exception as e:
+            with self._condition:
+                self.stats['requested'] += 1
+                self.stats['failed'] += 1
+            logging.error(f"Ошибка сериализации {path}: {e}")
+            return
+        self._submit(path, lambda: text, 'utf-8')
+
+    def write_text(self, path, text, encoding='utf-8'):
+        """Ставит запись текста"""
+        self._submit(path, lambda: text, encoding)
+
+    def _submit(self, path, render, encoding):
+        now = self.clock()
+        with self._condition:
+            self.stats['requested'] += 1
+            if self._stopped:
+                # Поток уже остановлен при выходе - пишем сразу
+                pending = PendingWrite(path, render, encoding, now)
+            else:
+                pending = self._pending.get(path)
+                if pending:
+                    pending.render, pending.encoding, pending.last = render, encoding, now
+                    self.stats['coalesced'] += 1
+                else:
+                    self._pending[path] = PendingWrite(path, render, encoding, now)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="ConfigWriter", daemon=True)
+                    self._thread.start()
+                self._condition.notify()
+                return
+        self._write(pending)
+
+    def _due(self, pending):
+        if pending.forced:
+            return float('-inf')
+        return min(pending.last + self.delay, pending.first + self.max_delay)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    now = self.clock()
+                    ready = [p for p in self._pending.values() if self._stopped or self._due(p) <= now]
+                    if ready:
+                        break
+                    if self._stopped:
+                        self._thread = None
+                        self._condition.notify_all()
+                        return
+                    timeout = min(self._due(p) for p in self._pending.values()) - now \
+                        if self._pending else None
+                    self._condition.wait(timeout)
+                for pending in ready:
+                    del self._pending[pending.path]
+                self._writing += len(ready)
+
+            for pending in ready:
+                self._write(pending)
+
+            with self._condition:
+                self._writing -= len(ready)
+                self._condition.notify_all()
+
+    def _write(self, pending):
+        started = time.perf_counter()
+        try:
+            text = pending.render()
+            directory = os.path.dirname(pending.path) or '.'
+            fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(pending.path) + '.',
+                                             suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding=pending.encoding) as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._replace(temp_path, pending.path)
+            except Exception:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                raise
+        except Exception as e:
+            with self._condition:
+                self.stats['failed'] += 1
+            logging.error(f"Ошибка записи {pending.path}: {e}")
+            return
+
+        finished = time.perf_counter()
+        write_ms = (finished - started) * 1000
+        latency_ms = (self.clock() - pending.first) * 1000
+        with self._condition:
+            self.stats['written'] += 1
+            self.stats['write_ms_total'] += write_ms
+            self.stats['write_ms_max'] = max(self.stats['write_ms_max'], write_ms)
+            self.stats['latency_ms_total'] += latency_ms
+            self.stats['latency_ms_max'] = max(self.stats['latency_ms_max'], latency_ms)
+            name = os.path.basename(pending.path)
+            self.files[name] = self.files.get(name, 0) + 1
+
+    def _replace(self, source, target, attempts=5):
+        # На Windows файл может быть ненадолго занят антивирусом или индексатором
+        for attempt in range(attempts):
+            try:
+                os.replace(source, target)
+                return
+            except PermissionError:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.02 * (attempt + 1))
+
+    def pending(self):
+        """Число файлов, ожидающих записи"""
+        with self._condition:
+            return len(self._pending)
+
+    def flush(self, timeout=5.0):
+        """Пишет все отложенные файлы сейчас и ждет окончания; True - все записано"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            for pending in self._pending.values():
+                pending.forced = True
+            self._condition.notify_all()
+            while self._pending or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None:
+                    return not self._pending and not self._writing
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=5.0):
+        """Сбрасывает отложенные записи и останавливает поток"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+    def metrics(self):
+        """Счетчики записей, среднее и максимальное время записи и задержки от запроса, мс"""
+        with self._condition:
+            written = self.stats['written']
+            return dict(self.stats,
+                        pending=len(self._pending),
+                        write_ms_avg=self.stats['write_ms_total'] / written if written else 0.0,
+                        latency_ms_avg=self.stats['latency_ms_total'] / written if written else 0.0,
+                        files=dict(self.files))
@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+
+class CoordinateMapper:
+    """Пересчет точек из базового разрешения 1920x1080 в пиксели текущего окна
+
+    Для каждого размера окна точки считаются один раз; несколько последних
+    размеров хранятся в LRU, поэтому переключение оконный/полноэкранный режим
+    не требует пересчета.
+    """
+
+    BASE_SIZE = (1920, 1080)
+
+    def __init__(self, max_resolutions=4):
+        self.max_resolutions = max_resolutions
+        self.size = None
+        self._points = set()
+        self._mapped = {}
+        self._resolutions = OrderedDict()
+        # Размер меняется в GUI-потоке, а точки читает фоновый поток проверок
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'misses': 0,
+            'resolution_hits': 0,
+            'resolution_builds': 0
+        }
+
+    def set_points(self, points):
+        """Регистрирует точки (x, y), которые нужно держать посчитанными"""
+        with self._lock:
+            new_points = {tuple(int(v) for v in point) for point in points} - self._points
+            self._points |= new_points
+            # Добавляем новые точки во все сохраненные разрешения
+            for size, mapped in self._resolutions.items():
+                for point in new_points:
+                    mapped[point] = self._scale(point, size)
+
+    def set_size(self, size):
+        """Переключает текущий размер окна; пересчет только для новых размеров"""
+        size = tuple(size)
+        with self._lock:
+            if size == self.size:
+                return
+            self.size = size
+
+            mapped = self._resolutions.get(size)
+            if mapped is not None:
+                self._resolutions.move_to_end(size)
+                self.stats['resolution_hits'] += 1
+            else:
+                mapped = {point: self._scale(point, size) for point in self._points}
+                self._resolutions[size] = mapped
+                self.stats['resolution_builds'] += 1
+                while len(self._resolutions) > self.max_resolutions:
+                    self._resolutions.popitem(last=False)
+            self._mapped = mapped
+
+    def map(self, x, y):
+        """Возвращает пиксельные координаты точки для текущего размера окна"""
+        point = (int(x), int(y))
+        mapped = self._mapped.get(point)
+        if mapped is not None:
+            return mapped
+
+        with self._lock:
+            self.stats['misses'] += 1
+            if self.size is None:
+                return point
+            # Незарегистрированная точка запоминается для текущего размера
+            mapped = self._scale(point, self.size)
+            self._mapped[point] = mapped
+            return mapped
+
+    def _scale(self, point, size):
+        return (
+            int(point[0] * size[0] / self.BASE_SIZE[0]),
+            int(point[1] * size[1] / self.BASE_SIZE[1])
+        )
@@ -0,0 +1,170 @@
+import time
+import logging
+import threading
+
+from PyQt6.QtCore import QCoreApplication, QThread, Qt, pyqtSignal
+
+try:
+    from .frame_sampler import FrameSampler
+    from .scheduler import AdaptiveScheduler
+except ImportError:
+    # Запуск как отдельного скрипта (printet.py)
+    from frame_sampler import FrameSampler
+    from scheduler import AdaptiveScheduler
+
+
+class DetectionWorker(QThread):
+    """Фоновый поток захвата и анализа экрана
+
+    Проверки регистрируются в адаптивном планировщике (интервалы в мс)
+    и выполняются в рабочем потоке.
+    В GUI-поток уходят только изменения состояния через state_changed(name, value);
+    если GUI занят, несколько изменений схлопываются и доставляется последнее.
+    """
+
+    state_changed = pyqtSignal(str, object)
+    _results_ready = pyqtSignal()
+
+    def __init__(self, frame_sampler=None, parent=None):
+        super().__init__(parent)
+        self.frame_sampler = frame_sampler or FrameSampler()
+
+        self.scheduler = AdaptiveScheduler()
+        self._condition = threading.Condition()
+        self._input_listeners = []
+        self._latest = {}
+        self._notify_pending = False
+        self._stopping = False
+
+        # Объект потока живет в GUI-потоке, поэтому доставка идет через очередь событий
+        self._results_ready.connect(self._deliver, Qt.ConnectionType.QueuedConnection)
+
+        # Поток должен завершиться раньше, чем приложение уничтожит объекты
+        app = QCoreApplication.instance()
+        if app:
+            app.aboutToQuit.connect(self.stop)
+
+    def add_check(self, name, func, interval, max_interval=None, enabled=True, publish=True):
+        """Регистрирует проверку func() с интервалом от interval до max_interval мс"""
+        with self._condition:
+            self.scheduler.add(name, func, interval, max_interval, enabled, publish)
+            self._condition.notify()
+
+    def remove_check(self, name):
+        """Удаляет проверку"""
+        with self._condition:
+            self.scheduler.remove(name)
+            self._latest.pop(name, None)
+
+    def set_check_enabled(self, name, enabled):
+        """Включает или приостанавливает проверку"""
+        with self._condition:
+            self.scheduler.set_enabled(name, enabled)
+            self._condition.notify()
+
+    def request_check(self, name):
+        """Просит выполнить проверку вне очереди"""
+        self.boost(name)
+
+    def boost(self, *names):
+        """Действие пользователя: проверки (или все) сразу и на быстром интервале"""
+        with self._condition:
+            self.scheduler.boost(names or None)
+            self._condition.notify()
+
+    def value(self, name, default=None):
+        """Последний результат проверки (для чтения из GUI без захвата экрана)"""
+        with self._condition:
+            check = self.scheduler.checks.get(name)
+            if check and check.has_value:
+                return check.value
+            return default
+
+    def stats(self):
+        """Счетчики планировщика по каждой проверке"""
+        with self._condition:
+            return self.scheduler.stats()
+
+    def watch_user_input(self, click_checks=None, key_checks=None):
+        """Ускоряет проверки по глобальным кликам мыши и нажатиям клавиш
+
+        click_checks и key_checks - имена проверок, на которые влияет событие
+        (None - все, пустой список - событие не отслеживается).
+        """
+        try:
+            from pynput import keyboard as pynput_keyboard
+            from pynput import mouse as pynput_mouse
+        except ImportError as e:
+            logging.warning(f"Отслеживание ввода недоступно: {e}")
+            return
+
+        def on_click(x, y, button, pressed):
+            if pressed:
+                self.boost(*(click_checks or ()))
+
+        self._input_listeners = []
+        if click_checks is None or click_checks:
+            self._input_listeners.append(pynput_mouse.Listener(on_click=on_click))
+        if key_checks is None or key_checks:
+            self._input_listeners.append(
+                pynput_keyboard.Listener(on_press=lambda key: self.boost(*(key_checks or ()))))
+        for listener in self._input_listeners:
+            listener.daemon = True
+            listener.start()
+
+    def stop(self):
+        """Останавливает поток и ждет его завершения"""
+        for listener in self._input_listeners:
+            listener.stop()
+        self._input_listeners = []
+
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                if self._stopping:
+                    break
+
+                due = self.scheduler.due()
+                if not due:
+                    next_due = self.scheduler.next_due()
+                    timeout = None if next_due is None else max(0, next_due - self.scheduler.clock())
+                    self._condition.wait(timeout)
+                    continue
+
+            for check in due:
+                self._run_check(check)
+
+    def _run_check(self, check):
+        started = time.perf_counter()
+        try:
+            value = check.func()
+        except Exception as e:
+            logging.error(f"Ошибка фоновой проверки {check.name}: {e}")
+            return
+
+        with self._condition:
+            changed = self.scheduler.record(check, value, time.perf_counter() - started)
+            if not changed or not check.publish or self.scheduler.checks.get(check.name) is not check:
+                return
+
+            self._latest[check.name] = value
+            if self._notify_pending:
+                return
+            self._notify_pending = True
+
+        self._results_ready.emit()
+
+    def _deliver(self):
+        """Выполняется в GUI-потоке: отдает последние значения подписчикам"""
+        with self._condition:
+            latest = self._latest
+            self._latest = {}
+            self._notify_pending = False
+
+        for name, value in latest.items():
+            self.state_changed.emit(name, value)
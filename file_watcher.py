@@ -0,0 +1,71 @@
+import os
+import logging
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+
+class DebouncedFileWatcher(QObject):
+    """Отслеживание изменений одного файла с задержкой
+
+    Редакторы и os.replace дают несколько событий на одно сохранение, поэтому
+    changed(path) приходит один раз через delay_ms после последнего события
+    и только если размер или время изменения файла действительно другие.
+    Папка файла тоже отслеживается: после замены файла через переименование
+    наблюдение за самим файлом теряется, и оно ставится заново.
+    """
+
+    changed = pyqtSignal(str)
+
+    def __init__(self, path, delay_ms=200, parent=None):
+        super().__init__(parent)
+        self.path = os.path.abspath(path)
+        self.directory = os.path.dirname(self.path)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._on_event)
+        self.watcher.directoryChanged.connect(self._on_event)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self._emit_if_changed)
+
+        self._signature = self._stat()
+        self.stats = {
+            'events': 0,
+            'reloads': 0
+        }
+        self._watch()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _watch(self):
+        if os.path.isdir(self.directory) and self.directory not in self.watcher.directories():
+            self.watcher.addPath(self.directory)
+        if os.path.exists(self.path) and self.path not in self.watcher.files():
+            self.watcher.addPath(self.path)
+
+    def _on_event(self, path):
+        self.stats['events'] += 1
+        self.timer.start()
+
+    def _emit_if_changed(self):
+        self._watch()
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return
+        self._signature = signature
+        self.stats['reloads'] += 1
+        logging.info(f"Файл изменен: {self.path}")
+        self.changed.emit(self.path)
+
+    def stop(self):
+        """Прекращает отслеживание"""
+        self.timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
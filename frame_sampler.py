@@ -0,0 +1,124 @@
+import time
+import logging
+import threading
+
+import numpy as np
+from PIL import Image
+
+try:
+    from .screen_source import create_screen_source
+except ImportError:
+    # Запуск как отдельного скрипта (printet.py)
+    from screen_source import create_screen_source
+
+
+class FrameSampler:
+    """Общий кадр для всех цветовых проб: один захват экрана на тик"""
+
+    def __init__(self, source=None, max_age=0.05):
+        self.source = source or create_screen_source()
+        self.max_age = max_age
+
+        self.probes = {}
+        self._bbox = None
+        # Пробы меняются из GUI-потока, а кадр снимает фоновый поток
+        self._lock = threading.RLock()
+
+        self.frame = None
+        self.frame_region = None
+        self.frame_time = 0
+
+        self.stats = {
+            'captures': 0,
+            'direct_captures': 0,
+            'reads': 0
+        }
+
+    def set_probe(self, name, region):
+        """Регистрирует область пробы (left, top, width, height)"""
+        left, top, width, height = (int(v) for v in region)
+        region = (max(0, left), max(0, top), max(1, width), max(1, height))
+
+        with self._lock:
+            if self.probes.get(name) != region:
+                self.probes[name] = region
+                self._bbox = None
+
+    def set_point_probe(self, name, x, y, radius=2):
+        """Регистрирует пробу-точку с окрестностью radius"""
+        self.set_probe(name, (x - radius, y - radius, radius * 2 + 1, radius * 2 + 1))
+
+    def remove_probe(self, name):
+        """Удаляет пробу"""
+        with self._lock:
+            if self.probes.pop(name, None) is not None:
+                self._bbox = None
+
+    def bounding_box(self):
+        """Возвращает общую область всех проб (left, top, width, height)"""
+        with self._lock:
+            if self._bbox is None and self.probes:
+                left = min(r[0] for r in self.probes.values())
+                top = min(r[1] for r in self.probes.values())
+                right = max(r[0] + r[2] for r in self.probes.values())
+                bottom = max(r[1] + r[3] for r in self.probes.values())
+                self._bbox = (left, top, right - left, bottom - top)
+            return self._bbox
+
+    def begin_tick(self):
+        """Делает новый снимок общей области проб"""
+        with self._lock:
+            bbox = self.bounding_box()
+            if not bbox:
+                self.frame = None
+                self.frame_region = None
+                return None
+
+            self.source.begin_tick()
+            self.frame = self.source.grab(bbox)
+            self.frame_region = bbox
+            self.frame_time = time.time()
+            self.stats['captures'] += 1
+            return self.frame
+
+    def _contains(self, left, top, width, height):
+        if self.frame_region is None:
+            return False
+        f_left, f_top, f_width, f_height = self.frame_region
+        return (f_left <= left and f_top <= top and
+                left + width <= f_left + f_width and
+                top + height <= f_top + f_height)
+
+    def _is_stale(self):
+        return (self.frame is None or
+                self.frame_region != self.bounding_box() or
+                time.time() - self.frame_time > self.max_age)
+
+    def region(self, left, top, width, height):
+        """Возвращает область экрана из общего кадра как массив RGB"""
+        left, top = max(0, int(left)), max(0, int(top))
+        width, height = int(width), int(height)
+
+        with self._lock:
+            self.stats['reads'] += 1
+
+            if self._is_stale():
+                self.begin_tick()
+
+            if not self._contains(left, top, width, height):
+                # Область вне зарегистрированных проб - снимаем отдельно
+                self.stats['direct_captures'] += 1
+                logging.debug(f"Область {(left, top, width, height)} вне общего кадра {self.frame_region}")
+                return self.source.grab((left, top, width, height))
+
+            f_left, f_top = self.frame_region[:2]
+            return self.frame[top - f_top:top - f_top + height, left - f_left:left - f_left + width]
+
+    def region_image(self, left, top, width, height):
+        """Возвращает область экрана из общего кадра как PIL Image"""
+        return Image.fromarray(np.ascontiguousarray(self.region(left, top, width, height)))
+
+    def pixel(self, x, y):
+        """Возвращает цвет пикселя (r, g, b) из общего кадра"""
+        r, g, b = self.region(x, y, 1, 1)[0, 0]
+        return (int(r), int(g), int(b))
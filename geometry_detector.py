@@ -0,0 +1,232 @@
+import time
+
+import numpy as np
+
+
+# Пиксель считается частью линии, если он очень темный или очень светлый
+DARK_THRESHOLD = 50
+BRIGHT_THRESHOLD = 200
+CORNER_CONTRAST = 50
+BOUNDARY_CONTRAST = 80
+
+
+def to_gray_array(image):
+    """Переводит изображение (PIL или массив RGB/L) в массив яркости int16"""
+    if hasattr(image, 'convert'):
+        image = image.convert('L')
+    gray = np.asarray(image)
+    if gray.ndim == 3:
+        # Та же формула, что у PIL convert('L')
+        gray = gray.astype(np.int32)
+        gray = (gray[..., 0] * 19595 + gray[..., 1] * 38470 + gray[..., 2] * 7471 + 0x8000) >> 16
+    return gray.astype(np.int16)
+
+
+def line_mask(gray):
+    """Маска пикселей, которые могут принадлежать линии"""
+    return (gray < DARK_THRESHOLD) | (gray > BRIGHT_THRESHOLD)
+
+
+def max_run_lengths(mask):
+    """Длина самой длинной непрерывной серии True в каждой строке маски"""
+    width = mask.shape[1]
+    if width == 0:
+        return np.zeros(mask.shape[0], dtype=np.int64)
+    index = np.arange(1, width + 1, dtype=np.int32)
+    # Позиция последнего разрыва слева от каждого пикселя
+    last_break = np.maximum.accumulate(np.where(mask, 0, index), axis=1)
+    return (index - last_break).max(axis=1)
+
+
+def detect_horizontal_lines(gray, margin=5):
+    """Считает строки с горизонтальной линией не короче 40% ширины"""
+    height, width = gray.shape
+    rows = line_mask(gray[margin:height - margin])
+    return int(np.count_nonzero(max_run_lengths(rows) >= width * 0.4))
+
+
+def detect_vertical_lines(gray, margin=5):
+    """Считает столбцы с вертикальной линией не короче 30% высоты"""
+    height, width = gray.shape
+    columns = line_mask(gray[:, margin:width - margin]).T
+    return int(np.count_nonzero(max_run_lengths(columns) >= height * 0.3))
+
+
+def find_corners(gray):
+    """Считает пиксели с резким перепадом яркости и по горизонтали, и по вертикали"""
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return 0
+    horizontal_contrast = np.abs(gray[1:-1, :-2] - gray[1:-1, 2:]) > CORNER_CONTRAST
+    vertical_contrast = np.abs(gray[:-2, 1:-1] - gray[2:, 1:-1]) > CORNER_CONTRAST
+    return int(np.count_nonzero(horizontal_contrast & vertical_contrast))
+
+
+def find_bounded_areas(gray, step=20, margin=10, reach=30, limit=2):
+    """Считает точки сетки, ограниченные контрастной границей минимум с трех сторон"""
+    height, width = gray.shape
+    ys = np.arange(margin, height - margin, step)
+    xs = np.arange(margin, width - margin, step)
+    if not len(ys) or not len(xs):
+        return 0
+
+    start = gray[np.ix_(ys, xs)][..., None]
+    offsets = np.arange(1, reach + 1)
+    boundaries = np.zeros((len(ys), len(xs)), dtype=np.int8)
+
+    for sign in (-1, 1):
+        # Лучи по горизонтали
+        ray_x = xs[None, :, None] + sign * offsets[None, None, :]
+        inside = (ray_x >= 0) & (ray_x < width)
+        values = gray[ys[:, None, None], np.clip(ray_x, 0, width - 1)]
+        boundaries += ((np.abs(values - start) > BOUNDARY_CONTRAST) & inside).any(axis=2)
+
+        # Лучи по вертикали
+        ray_y = ys[:, None, None] + sign * offsets[None, None, :]
+        inside = (ray_y >= 0) & (ray_y < height)
+        values = gray[np.clip(ray_y, 0, height - 1), xs[None, :, None]]
+        boundaries += ((np.abs(values - start) > BOUNDARY_CONTRAST) & inside).any(axis=2)
+
+    return min(int(np.count_nonzero(boundaries >= 3)), limit)
+
+
+def detect_rectangles(gray):
+    """Оценивает количество прямоугольных областей"""
+    rectangles = 1 if find_corners(gray) >= 4 else 0
+    return rectangles + find_bounded_areas(gray)
+
+
+def find_input_fields(gray):
+    """Находит прямоугольные поля ввода (0-2) по массиву яркости"""
+    input_fields = 0
+
+    if detect_horizontal_lines(gray) >= 2 and detect_vertical_lines(gray) >= 2:
+        input_fields += 1
+    if detect_rectangles(gray) >= 1:
+        input_fields += 1
+
+    return min(input_fields, 2)
+
+
+def downsample(gray, factor):
+    """Уменьшает массив яркости в factor раз, сохраняя самые контрастные пиксели
+
+    Из каждого блока factor x factor берется пиксель, наиболее удаленный от
+    средней яркости: тонкие темные и светлые линии не размываются усреднением.
+    """
+    if factor <= 1:
+        return gray
+    height = gray.shape[0] // factor * factor
+    width = gray.shape[1] // factor * factor
+    gray = gray[:height, :width]
+
+    # Минимум и максимум блока: сначала по строкам, затем по столбцам
+    darkest = gray[::factor].copy()
+    brightest = darkest.copy()
+    for offset in range(1, factor):
+        np.minimum(darkest, gray[offset::factor], out=darkest)
+        np.maximum(brightest, gray[offset::factor], out=brightest)
+    block_min = darkest[:, ::factor].copy()
+    block_max = brightest[:, ::factor].copy()
+    for offset in range(1, factor):
+        np.minimum(block_min, darkest[:, offset::factor], out=block_min)
+        np.maximum(block_max, brightest[:, offset::factor], out=block_max)
+
+    return np.where(128 - block_min > block_max - 128, block_min, block_max)
+
+
+def find_input_fields_scaled(gray, factor=1):
+    """find_input_fields для уменьшенного изображения: отступы и шаги сетки делятся на factor"""
+    if factor <= 1:
+        return find_input_fields(gray)
+
+    input_fields = 0
+    margin = max(1, 5 // factor)
+    if (detect_horizontal_lines(gray, margin) >= 2 and
+            detect_vertical_lines(gray, margin) >= 2):
+        input_fields += 1
+
+    rectangles = 1 if find_corners(gray) >= 4 else 0
+    rectangles += find_bounded_areas(
+        gray,
+        step=max(1, 20 // factor),
+        margin=max(1, 10 // factor),
+        reach=max(1, 30 // factor)
+    )
+    if rectangles >= 1:
+        input_fields += 1
+
+    return min(input_fields, 2)
+
+
+class PyramidGeometryDetector:
+    """Поиск полей ввода от грубого уровня к полному с ранним выходом
+
+    По умолчанию выключен и всегда ищет на полном разрешении: грубый уровень
+    может решить иначе, чем полный, а выигрыш на кадре чата в пределах шума.
+    Включается ключом geometry_pyramid: {"enabled": true} - только после
+    проверки `python -m scripts.benchmarks pyramid` на своих скриншотах.
+    """
+
+    DEFAULT_SETTINGS = {
+        'enabled': False,
+        'downsample': 4,
+        # Грубый результат >= accept_score - чат точно есть,
+        # <= reject_score - точно нет, иначе проверяем полное разрешение
+        'accept_score': 2,
+        'reject_score': 0
+    }
+
+    def __init__(self, settings=None):
+        self.settings = dict(self.DEFAULT_SETTINGS)
+        self.configure(settings or {})
+        self.reset_stats()
+
+    def configure(self, settings):
+        """Применяет настройки из chat_detection_settings.json (ключ geometry_pyramid)"""
+        for key in self.DEFAULT_SETTINGS:
+            if key in settings:
+                self.settings[key] = settings[key]
+        self.settings['downsample'] = max(1, int(self.settings['downsample']))
+
+    def reset_stats(self):
+        self.stats = {
+            'coarse_decided': 0,
+            'full_decided': 0,
+            'coarse_ms': 0.0,
+            'full_ms': 0.0
+        }
+
+    def detect(self, gray):
+        """Возвращает количество полей ввода (0-2) для массива яркости"""
+        if not self.settings['enabled'] or self.settings['downsample'] <= 1:
+            return self._detect_full(gray)
+
+        factor = self.settings['downsample']
+        started = time.perf_counter()
+        coarse_score = find_input_fields_scaled(downsample(gray, factor), factor)
+        self.stats['coarse_ms'] += (time.perf_counter() - started) * 1000
+
+        if coarse_score >= self.settings['accept_score'] or coarse_score <= self.settings['reject_score']:
+            self.stats['coarse_decided'] += 1
+            return coarse_score
+
+        return self._detect_full(gray)
+
+    def _detect_full(self, gray):
+        started = time.perf_counter()
+        result = find_input_fields(gray)
+        self.stats['full_ms'] += (time.perf_counter() - started) * 1000
+        self.stats['full_decided'] += 1
+        return result
+
+    def summary(self):
+        """Доля решений на каждом уровне и средняя стоимость тика в мс"""
+        ticks = self.stats['coarse_decided'] + self.stats['full_decided']
+        if not ticks:
+            return {'ticks': 0, 'coarse_share': 0.0, 'full_share': 0.0, 'avg_ms': 0.0}
+        return {
+            'ticks': ticks,
+            'coarse_share': self.stats['coarse_decided'] / ticks,
+            'full_share': self.stats['full_decided'] / ticks,
+            'avg_ms': (self.stats['coarse_ms'] + self.stats['full_ms']) / ticks
+        }
@@ -1,13 +1,11 @@
 
-import json
-import os
-from pathlib import Path
 from PyQt6.QtCore import QObject, pyqtSignal
 from PyQt6.QtGui import QKeySequence
 from pynput import keyboard as pynput_keyboard
 import threading
 import time
-import sys
+
+from .settings_store import get_settings_store
 
 class HotkeyManager(QObject):
     hotkey_triggered = pyqtSignal(str)
@@ -17,7 +15,7 @@ class HotkeyManager(QObject):
         self.hotkeys = {}
         self.listener = None
         self.running = False
-        self.settings_file = self.get_settings_path()
+        self.settings_store = get_settings_store()
         self.load_hotkeys()
 
     @property
@@ -46,23 +44,6 @@ class HotkeyManager(QObject):
             'scroll_lock': '<scroll_lock>',
         }
     
-    def get_settings_path(self):
-        """Возвращает путь к файлу настроек горячих клавиш"""
-        try:
-            if getattr(sys, 'frozen', False):
-                # Если приложение собрано в exe
-                base_path = Path(sys.executable).parent
-            else:
-                # Если запуск из исходного кода
-                base_path = Path(__file__).parent.parent
-            
-            settings_dir = base_path / "scripts" / "settings"
-            settings_dir.mkdir(parents=True, exist_ok=True)
-            return settings_dir / "hotkey_settings.json"
-        except Exception as e:
-            print(f"Ошибка получения пути настроек: {e}")
-            return Path("hotkey_settings.json")  # fallback
-    
     def load_hotkeys(self):
         """Загружает горячие клавиши из файла"""
         default_hotkeys = {
@@ -72,9 +53,9 @@ class HotkeyManager(QObject):
         }
         
         try:
-            if self.settings_file.exists():
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    self.hotkeys = json.load(f)
+            hotkeys = self.settings_store.get("hotkey_settings.json")
+            if hotkeys is not None:
+                self.hotkeys = hotkeys
             else:
                 self.hotkeys = default_hotkeys
                 self.save_hotkeys()
@@ -85,8 +66,7 @@ class HotkeyManager(QObject):
     def save_hotkeys(self):
         """Сохраняет горячие клавиши в файл"""
         try:
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(self.hotkeys, f, indent=2, ensure_ascii=False)
+            self.settings_store.set("hotkey_settings.json", self.hotkeys)
         except Exception as e:
             print(f"Ошибка сохранения горячих клавиш: {e}")
     
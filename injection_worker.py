@@ -0,0 +1,506 @@
+import sys
+import time
+import queue
+import ctypes
+import logging
+import threading
+from ctypes import wintypes
+from collections import deque
+
+from PyQt6.QtCore import QCoreApplication, QThread, pyqtSignal
+
+from . import input_plan
+from .input_plan import InputPlan
+from .clipboard_session import ClipboardSession, Win32ClipboardBackend, MemoryClipboard
+from .pointer_actions import PointerEngine
+from .layout_tracker import LayoutTracker, Win32LayoutBackend, FakeLayoutBackend, ENGLISH_HKL, RUSSIAN_HKL
+
+
+# GetAncestor: окно верхнего уровня
+GA_ROOT = 2
+
+
+class InputSink:
+    """Получатель ввода: клавиатура, буфер обмена, мышь, раскладка и активное окно"""
+
+    clipboard_session = None
+    pointer = None
+    layout = None
+
+    def key_down(self, vk):
+        raise NotImplementedError
+
+    def key_up(self, vk):
+        raise NotImplementedError
+
+    def unicode_key(self, unit, up=False):
+        """Символ Unicode (единица UTF-16) без привязки к раскладке"""
+        raise NotImplementedError
+
+    def send_inputs(self, events):
+        """Отправляет пакет событий плана подряд"""
+        for action, value in events:
+            if action == 'down':
+                self.key_down(value)
+            elif action == 'up':
+                self.key_up(value)
+            elif action == 'mouse_move':
+                self.mouse_move(*value)
+            elif action in ('mouse_down', 'mouse_up'):
+                self.mouse_button(value, up=action == 'mouse_up')
+            else:
+                self.unicode_key(value, up=action == 'unicode_up')
+
+    def mouse_move(self, x, y):
+        raise NotImplementedError
+
+    def mouse_button(self, button, up=False):
+        raise NotImplementedError
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def clipboard_sequence(self):
+        """Номер изменения буфера обмена или None, если он неизвестен"""
+        return self.clipboard_session.backend.sequence()
+
+    def get_clipboard(self):
+        """Текст из буфера обмена или пустая строка"""
+        return self.clipboard_session.get_text()
+
+    def set_clipboard(self, text):
+        """Кладет текст в буфер; прежнее содержимое вернет сессия после серии отправок"""
+        self.clipboard_session.set_text(text)
+
+    def cursor_pos(self):
+        raise NotImplementedError
+
+    def move_to(self, x, y):
+        raise NotImplementedError
+
+    def click(self, x, y, button='left'):
+        raise NotImplementedError
+
+    def post_click(self, x, y, button='left'):
+        """Клик сообщением окну игры под точкой без движения курсора
+
+        False - под точкой не окно игры. Обработало ли окно сообщение, узнать нельзя.
+        """
+        return False
+
+    def activate_window(self, title):
+        """Делает окно с заголовком title активным; True - окно найдено"""
+        return False
+
+    def foreground_window(self):
+        """Активное окно или None, если оно неизвестно"""
+        return self.layout.backend.get_foreground() if self.layout else None
+
+    def input_since_send(self):
+        """True - после последнего отправленного пакета был чужой ввод (пользователь мог изменить поле)"""
+        return False
+
+
+class Win32InputSink(InputSink):
+    """Ввод через SendInput и буфер обмена Windows"""
+
+    # Свой ввод система учитывает в GetLastInputInfo с небольшой задержкой
+    INPUT_SLACK_MS = 50
+
+    def __init__(self, restore_delay=1.5, pointer_mode='sendinput'):
+        import win32api
+        import win32con
+        import win32gui
+        self.win32api = win32api
+        self.win32con = win32con
+        self.win32gui = win32gui
+        self.clipboard_session = ClipboardSession(Win32ClipboardBackend(), restore_delay)
+        self.pointer = PointerEngine(self, pointer_mode)
+        self.layout = LayoutTracker(Win32LayoutBackend(), restore_delay)
+
+        self.user32 = ctypes.windll.user32
+        self.user32.SendInput.argtypes = [wintypes.UINT, ctypes.c_void_p, ctypes.c_int]
+        self.user32.SendInput.restype = wintypes.UINT
+        self.user32.GetAncestor.argtypes = [wintypes.HWND, wintypes.UINT]
+        self.user32.GetAncestor.restype = wintypes.HWND
+        self._input_size = ctypes.sizeof(input_plan.INPUT)
+        self._sent_tick = 0
+
+    def key_down(self, vk):
+        self.win32api.keybd_event(vk, 0, 0, 0)
+        self._sent_tick = self.win32api.GetTickCount()
+
+    def key_up(self, vk):
+        self.win32api.keybd_event(vk, 0, self.win32con.KEYEVENTF_KEYUP, 0)
+        self._sent_tick = self.win32api.GetTickCount()
+
+    def unicode_key(self, unit, up=False):
+        self.send_inputs([('unicode_up' if up else 'unicode_down', unit)])
+
+    def send_inputs(self, events):
+        """Весь пакет одним SendInput: другой ввод не вклинится между событиями"""
+        inputs = input_plan.build_inputs(events, self.virtual_screen())
+        sent = self.user32.SendInput(len(inputs), inputs, self._input_size)
+        self._sent_tick = self.win32api.GetTickCount()
+        if sent != len(inputs):
+            raise OSError(f"SendInput отправил {sent} событий из {len(inputs)}")
+
+    def virtual_screen(self):
+        """(left, top, width, height) рабочего стола всех мониторов"""
+        metrics = self.user32.GetSystemMetrics
+        return (metrics(self.win32con.SM_XVIRTUALSCREEN), metrics(self.win32con.SM_YVIRTUALSCREEN),
+                metrics(self.win32con.SM_CXVIRTUALSCREEN), metrics(self.win32con.SM_CYVIRTUALSCREEN))
+
+    def cursor_pos(self):
+        return tuple(self.win32api.GetCursorPos())
+
+    def move_to(self, x, y):
+        self.send_inputs([('mouse_move', (x, y))])
+
+    def click(self, x, y, button='left'):
+        input_plan.execute(InputPlan().click(x, y, button), self)
+
+    def post_click(self, x, y, button='left'):
+        window = self.win32gui.WindowFromPoint((x, y))
+        if not window:
+            return False
+        # Сообщение уходит только окну игры, а не оверлею или чужому окну поверх нее
+        game = self.layout.hwnd or self.foreground_window()
+        if self.user32.GetAncestor(window, GA_ROOT) != game:
+            return False
+        messages = {
+            'left': (self.win32con.WM_LBUTTONDOWN, self.win32con.WM_LBUTTONUP, self.win32con.MK_LBUTTON),
+            'right': (self.win32con.WM_RBUTTONDOWN, self.win32con.WM_RBUTTONUP, self.win32con.MK_RBUTTON),
+            'middle': (self.win32con.WM_MBUTTONDOWN, self.win32con.WM_MBUTTONUP, self.win32con.MK_MBUTTON),
+        }
+        down, up, flag = messages[button]
+        client_x, client_y = self.win32gui.ScreenToClient(window, (x, y))
+        lparam = (client_y & 0xFFFF) << 16 | (client_x & 0xFFFF)
+        self.win32gui.PostMessage(window, down, flag, lparam)
+        self.win32gui.PostMessage(window, up, 0, lparam)
+        return True
+
+    def activate_window(self, title):
+        window = self.win32gui.FindWindow(None, title)
+        if not window:
+            return False
+        self.win32gui.SetForegroundWindow(window)
+        return True
+
+    def input_since_send(self):
+        # Разница тиков со знаком: счетчик переполняется раз в 49 дней
+        elapsed = (self.win32api.GetLastInputInfo() - self._sent_tick + 2 ** 31) % 2 ** 32 - 2 ** 31
+        return elapsed > self.INPUT_SLACK_MS
+
+
+class RecordingInputSink(InputSink):
+    """Записывает ввод вместо отправки и имитирует поле ввода чата
+
+    Ctrl+V вставляет буфер в поле (заменяя выделение после Ctrl+A),
+    символы Unicode набираются в поле, Ctrl+C копирует выделенный текст,
+    Enter отправляет поле в sent, раскладка окна в момент Ctrl+V пишется в paste_layouts. Клики (x, y, кнопка, способ) записываются в clicks;
+    post_clicks=False имитирует точку не над окном игры.
+    user_type() имитирует набор пользователя в поле мимо получателя.
+    """
+
+    VK_CONTROL = 0x11
+    VK_RETURN = 0x0D
+
+    def __init__(self, clipboard="", english_layout=True, real_sleep=False, restore_delay=0.0,
+                 copy_delay=0.0, lost_pastes=0, pointer_mode='sendinput', post_clicks=True):
+        self.events = []
+        self.clipboard_session = ClipboardSession(MemoryClipboard(text=clipboard), restore_delay)
+        self.pointer = PointerEngine(self, pointer_mode)
+        self.post_clicks = post_clicks
+        self.clicks = []
+        self.layout = LayoutTracker(FakeLayoutBackend(ENGLISH_HKL if english_layout else RUSSIAN_HKL),
+                                    restore_delay)
+        self.paste_layouts = []
+        self.real_sleep = real_sleep
+        self.cursor = (0, 0)
+        self.field = ""
+        self.selected = False
+        self.sent = []
+        self.batches = 0
+        self.clipboard_reads = 0
+        # Окно кладет скопированное в буфер не сразу; первые lost_pastes вставок теряются
+        self.copy_delay = copy_delay
+        self.lost_pastes = lost_pastes
+        self._pending_copy = None
+        self._high_surrogate = None
+        self._pressed = set()
+        self._user_input = False
+
+    def key_down(self, vk):
+        self.events.append(('down', vk))
+        self._pressed.add(vk)
+        ctrl = self.VK_CONTROL in self._pressed
+
+        if ctrl and vk == ord('V'):
+            backend = self.layout.backend
+            self.paste_layouts.append(backend.layouts.get(backend.foreground))
+            if self.lost_pastes:
+                self.lost_pastes -= 1
+                return
+            self.field = self.clipboard if self.selected else self.field + self.clipboard
+            self.selected = False
+        elif ctrl and vk == ord('A'):
+            self.selected = True
+        elif ctrl and vk == ord('C'):
+            if self.selected:
+                self._pending_copy = (time.perf_counter() + self.copy_delay, self.field)
+                self._apply_pending_copy()
+        elif vk == self.VK_RETURN:
+            self.sent.append(self.field)
+            self.field = ""
+            self.selected = False
+        elif vk != self.VK_CONTROL:
+            self.selected = False
+
+    def key_up(self, vk):
+        self.events.append(('up', vk))
+        self._pressed.discard(vk)
+
+    def unicode_key(self, unit, up=False):
+        self.events.append(('unicode_up' if up else 'unicode_down', unit))
+        if up:
+            return
+        if 0xD800 <= unit < 0xDC00:
+            self._high_surrogate = unit
+            return
+        if self._high_surrogate is not None:
+            char = (self._high_surrogate.to_bytes(2, 'little') + unit.to_bytes(2, 'little')).decode('utf-16-le')
+            self._high_surrogate = None
+        else:
+            char = chr(unit)
+        self.field = char if self.selected else self.field + char
+        self.selected = False
+
+    def send_inputs(self, events):
+        self.batches += 1
+        self._user_input = False
+        super().send_inputs(events)
+
+    def user_type(self, text):
+        self.field = text if self.selected else self.field + text
+        self.selected = False
+        self._user_input = True
+
+    def input_since_send(self):
+        return self._user_input
+
+    def mouse_move(self, x, y):
+        self.events.append(('move', x, y))
+        self.cursor = (x, y)
+
+    def mouse_button(self, button, up=False):
+        self.events.append(('mouse_up' if up else 'mouse_down', button))
+        if not up:
+            self.clicks.append(self.cursor + (button, 'sendinput'))
+
+    def sleep(self, seconds):
+        self.events.append(('sleep', seconds))
+        if self.real_sleep:
+            time.sleep(seconds)
+
+    def _apply_pending_copy(self):
+        if self._pending_copy and time.perf_counter() >= self._pending_copy[0]:
+            self.clipboard_session.backend.set_text(self._pending_copy[1])
+            self._pending_copy = None
+
+    @property
+    def clipboard(self):
+        """Текущий текст буфера обмена"""
+        self._apply_pending_copy()
+        return self.clipboard_session.backend.get_text()
+
+    def clipboard_sequence(self):
+        self._apply_pending_copy()
+        return super().clipboard_sequence()
+
+    def get_clipboard(self):
+        self.clipboard_reads += 1
+        self._apply_pending_copy()
+        return super().get_clipboard()
+
+    def set_clipboard(self, text):
+        self.events.append(('clipboard', text))
+        super().set_clipboard(text)
+
+    def cursor_pos(self):
+        return self.cursor
+
+    def move_to(self, x, y):
+        self.events.append(('move', x, y))
+        self.cursor = (x, y)
+
+    def click(self, x, y, button='left'):
+        self.events.append(('click', x, y, button))
+        self.cursor = (x, y)
+        self.clicks.append((x, y, button, 'click'))
+
+    def post_click(self, x, y, button='left'):
+        if not self.post_clicks:
+            return False
+        self.events.append(('post_click', x, y, button))
+        self.clicks.append((x, y, button, 'post'))
+        return True
+
+    def activate_window(self, title):
+        self.events.append(('activate', title))
+        return True
+
+    def keys(self):
+        """Только нажатия и отпускания клавиш"""
+        return [event for event in self.events if event[0] in ('down', 'up', 'unicode_down', 'unicode_up')]
+
+
+def create_input_sink(restore_delay=1.5, pointer_mode='sendinput'):
+    """Win32InputSink на Windows, иначе записывающий получатель (для проверок и бенчмарков)
+
+    На Windows ошибка создания пробрасывается: записывающий получатель молча
+    "отправлял" бы ответы в память.
+    """
+    if sys.platform == 'win32':
+        try:
+            return Win32InputSink(restore_delay, pointer_mode)
+        except Exception as e:
+            logging.error(f"Ошибка создания получателя ввода: {e}")
+            raise
+    return RecordingInputSink(pointer_mode=pointer_mode)
+
+
+class InjectionJob:
+    """Задание на ввод: функция func(sink, *args) и время прохождения очереди"""
+
+    def __init__(self, job_id, name, func, args, kwargs):
+        self.job_id = job_id
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.queued = time.perf_counter()
+        self.started = 0.0
+        self.queue_ms = 0.0
+        self.run_ms = 0.0
+
+
+class InjectionWorker(QThread):
+    """Фоновый поток отправки ввода
+
+    Задания выполняются по очереди через получатель ввода sink.
+    Очередь ограничена: если она заполнена, новое задание отклоняется.
+    Результат приходит сигналом job_finished(id, name, result),
+    ошибка - сигналом job_failed(id, name, error).
+    Буфер обмена сессии получателя и раскладка пользователя возвращаются,
+    когда очередь простаивает.
+    """
+
+    job_finished = pyqtSignal(int, str, object)
+    job_failed = pyqtSignal(int, str, str)
+
+    def __init__(self, sink=None, max_jobs=8, history=50, parent=None):
+        super().__init__(parent)
+        self.sink = sink or create_input_sink()
+        self._queue = queue.Queue(maxsize=max_jobs)
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.history = deque(maxlen=history)
+
+        app = QCoreApplication.instance()
+        if app:
+            app.aboutToQuit.connect(self.stop)
+
+    def submit(self, name, func, *args, **kwargs):
+        """Ставит func(sink, *args, **kwargs) в очередь; возвращает id задания или None"""
+        with self._lock:
+            job = InjectionJob(self._next_id, name, func, args, kwargs)
+            self._next_id += 1
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            logging.warning(f"Очередь ввода заполнена, задание {name} отклонено")
+            return None
+
+        if not self.isRunning():
+            self.start()
+        return job.job_id
+
+    def pending(self):
+        """Число заданий, ожидающих выполнения"""
+        return self._queue.qsize()
+
+    def stats(self):
+        """Времена последних заданий: ожидание в очереди и выполнение, мс"""
+        with self._lock:
+            return [{
+                'id': job.job_id,
+                'name': job.name,
+                'queue_ms': job.queue_ms,
+                'run_ms': job.run_ms
+            } for job in self.history]
+
+    def clipboard_stats(self):
+        """Счетчики сессий буфера обмена получателя"""
+        session = self.sink.clipboard_session
+        return session.metrics() if session else {}
+
+    def stop(self):
+        """Останавливает поток после текущего задания и ждет его завершения"""
+        if not self.isRunning():
+            return
+        # Необработанные задания отбрасываем, чтобы не печатать в закрытое приложение
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._queue.put(None)
+        self.wait()
+
+    def run(self):
+        # Сессия буфера и раскладка возвращают состояние пользователя после простоя
+        restorers = [r for r in (self.sink.clipboard_session, self.sink.layout) if r]
+        while True:
+            delays = [d for d in (r.time_until_restore() for r in restorers) if d is not None]
+            try:
+                job = self._queue.get(timeout=min(delays) if delays else None)
+            except queue.Empty:
+                self._restore_idle(restorers)
+                continue
+            if job is None:
+                break
+            self._run_job(job)
+
+        # При выходе возвращаем все, не дожидаясь задержки
+        self._restore_idle(restorers, force=True)
+
+    def _restore_idle(self, restorers, force=False):
+        for restorer in restorers:
+            try:
+                if force:
+                    restorer.restore()
+                else:
+                    restorer.restore_if_idle()
+            except Exception as e:
+                logging.error(f"Ошибка восстановления состояния пользователя: {e}")
+
+    def _run_job(self, job):
+        job.started = time.perf_counter()
+        job.queue_ms = (job.started - job.queued) * 1000
+        try:
+            result = job.func(self.sink, *job.args, **job.kwargs)
+        except Exception as e:
+            job.run_ms = (time.perf_counter() - job.started) * 1000
+            self._record(job)
+            logging.error(f"Ошибка задания ввода {job.name}: {e}")
+            self.job_failed.emit(job.job_id, job.name, str(e))
+            return
+
+        job.run_ms = (time.perf_counter() - job.started) * 1000
+        self._record(job)
+        self.job_finished.emit(job.job_id, job.name, result)
+
+    def _record(self, job):
+        with self._lock:
+            self.history.append(job)
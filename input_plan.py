@@ -0,0 +1,238 @@
+import ctypes
+from ctypes import wintypes
+
+
+INPUT_MOUSE = 0
+INPUT_KEYBOARD = 1
+KEYEVENTF_EXTENDEDKEY = 0x0001
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+
+MOUSEEVENTF_MOVE = 0x0001
+MOUSEEVENTF_ABSOLUTE = 0x8000
+MOUSEEVENTF_VIRTUALDESK = 0x4000
+# Флаги нажатия и отпускания по кнопкам мыши
+MOUSE_BUTTONS = {
+    'left': (0x0002, 0x0004),
+    'right': (0x0008, 0x0010),
+    'middle': (0x0020, 0x0040),
+}
+
+VK_RETURN = 0x0D
+VK_SHIFT = 0x10
+VK_CONTROL = 0x11
+VK_RIGHT = 0x27
+
+# Окно читает буфер при обработке Ctrl+V: Enter и смена буфера - только после паузы
+PASTE_SETTLE_MS = 30
+
+# Стрелки, Insert/Delete, Home/End, PageUp/PageDown без этого флага уходят как цифровой блок
+EXTENDED_KEYS = set(range(0x21, 0x29)) | {0x2D, 0x2E}
+
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [
+        ('wVk', wintypes.WORD),
+        ('wScan', wintypes.WORD),
+        ('dwFlags', wintypes.DWORD),
+        ('time', wintypes.DWORD),
+        ('dwExtraInfo', ctypes.c_size_t),
+    ]
+
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ('dx', wintypes.LONG),
+        ('dy', wintypes.LONG),
+        ('mouseData', wintypes.DWORD),
+        ('dwFlags', wintypes.DWORD),
+        ('time', wintypes.DWORD),
+        ('dwExtraInfo', ctypes.c_size_t),
+    ]
+
+
+class _INPUTUNION(ctypes.Union):
+    # Мышь - самый большой вариант, без нее размер INPUT не совпадет с системным
+    _fields_ = [('mi', MOUSEINPUT), ('ki', KEYBDINPUT)]
+
+
+class INPUT(ctypes.Structure):
+    _anonymous_ = ('u',)
+    _fields_ = [('type', wintypes.DWORD), ('u', _INPUTUNION)]
+
+
+class InputPlan:
+    """Последовательность клавиш и пауз для одной операции ввода
+
+    Клавиши и движения мыши между паузами отправляются одним вызовом SendInput.
+    План сериализуется в список [действие, значение] для записи и проверки.
+    """
+
+    def __init__(self, steps=None):
+        # После JSON координаты мыши приходят списком
+        self.steps = [(action, tuple(value) if isinstance(value, list) else value)
+                      for action, value in steps or []]
+
+    def down(self, vk):
+        self.steps.append(('down', vk))
+        return self
+
+    def up(self, vk):
+        self.steps.append(('up', vk))
+        return self
+
+    def tap(self, vk):
+        """Нажатие и отпускание клавиши"""
+        return self.down(vk).up(vk)
+
+    def chord(self, modifier, vk):
+        """Сочетание клавиш, например Ctrl+V"""
+        return self.down(modifier).tap(vk).up(modifier)
+
+    def text(self, text):
+        """Набор текста символами Unicode, без буфера обмена и независимо от раскладки"""
+        # SendInput принимает единицы UTF-16: символы вне BMP уходят парой суррогатов
+        encoded = text.encode('utf-16-le')
+        for i in range(0, len(encoded), 2):
+            unit = int.from_bytes(encoded[i:i + 2], 'little')
+            self.steps.append(('unicode_down', unit))
+            self.steps.append(('unicode_up', unit))
+        return self
+
+    def move(self, x, y):
+        """Курсор в точку экрана (пиксели)"""
+        self.steps.append(('mouse_move', (int(x), int(y))))
+        return self
+
+    def mouse_down(self, button='left'):
+        self.steps.append(('mouse_down', button))
+        return self
+
+    def mouse_up(self, button='left'):
+        self.steps.append(('mouse_up', button))
+        return self
+
+    def click(self, x, y, button='left'):
+        """Перемещение в точку и клик"""
+        return self.move(x, y).mouse_down(button).mouse_up(button)
+
+    def wait(self, ms):
+        """Пауза там, где окну нужно время на обработку"""
+        self.steps.append(('wait', ms))
+        return self
+
+    def extend(self, plan):
+        self.steps.extend(plan.steps)
+        return self
+
+    def batches(self):
+        """Разбивает план на пакеты событий и паузы: [('send', events) | ('wait', ms)]"""
+        result = []
+        events = []
+        for step in self.steps:
+            if step[0] == 'wait':
+                if events:
+                    result.append(('send', events))
+                    events = []
+                result.append(step)
+            else:
+                events.append(step)
+        if events:
+            result.append(('send', events))
+        return result
+
+    def to_list(self):
+        return [list(step) for step in self.steps]
+
+    @classmethod
+    def from_list(cls, steps):
+        return cls(steps)
+
+    def __eq__(self, other):
+        return isinstance(other, InputPlan) and self.steps == other.steps
+
+    def __repr__(self):
+        return f"InputPlan({self.to_list()})"
+
+
+def absolute_coords(x, y, screen):
+    """Пиксели экрана в координаты 0..65535 для MOUSEEVENTF_ABSOLUTE
+
+    screen - (left, top, width, height) виртуального рабочего стола.
+    """
+    left, top, width, height = screen
+    return (round((x - left) * 65535 / max(1, width - 1)),
+            round((y - top) * 65535 / max(1, height - 1)))
+
+
+def build_inputs(events, screen=None):
+    """Массив INPUT для SendInput из событий плана
+
+    Для движений мыши нужен screen - (left, top, width, height) виртуального рабочего стола.
+    """
+    inputs = (INPUT * len(events))()
+    for item, (action, value) in zip(inputs, events):
+        if action.startswith('mouse_'):
+            item.type = INPUT_MOUSE
+            if action == 'mouse_move':
+                if screen is None:
+                    raise ValueError("Для движения мыши нужен размер рабочего стола")
+                dx, dy = absolute_coords(value[0], value[1], screen)
+                item.mi = MOUSEINPUT(dx=dx, dy=dy, mouseData=0, time=0, dwExtraInfo=0,
+                                     dwFlags=MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK)
+            else:
+                down, up = MOUSE_BUTTONS[value]
+                item.mi = MOUSEINPUT(dx=0, dy=0, mouseData=0, time=0, dwExtraInfo=0,
+                                     dwFlags=up if action == 'mouse_up' else down)
+            continue
+
+        flags = KEYEVENTF_KEYUP if action in ('up', 'unicode_up') else 0
+        item.type = INPUT_KEYBOARD
+        if action in ('unicode_down', 'unicode_up'):
+            item.ki = KEYBDINPUT(wVk=0, wScan=value, dwFlags=flags | KEYEVENTF_UNICODE,
+                                 time=0, dwExtraInfo=0)
+            continue
+        if value in EXTENDED_KEYS:
+            flags |= KEYEVENTF_EXTENDEDKEY
+        item.ki = KEYBDINPUT(wVk=value, wScan=0, dwFlags=flags, time=0, dwExtraInfo=0)
+    return inputs
+
+
+def execute(plan, sink):
+    """Выполняет план: каждый пакет одним вызовом sink.send_inputs"""
+    for action, value in plan.batches():
+        if action == 'wait':
+            sink.sleep(value / 1000)
+        else:
+            sink.send_inputs(value)
+
+
+def paste_plan():
+    """Ctrl+V"""
+    return InputPlan().chord(VK_CONTROL, ord('V'))
+
+
+def command_plan():
+    """Ctrl+V, пауза, пока окно читает буфер, и Enter"""
+    return paste_plan().wait(PASTE_SETTLE_MS).tap(VK_RETURN)
+
+
+def select_copy_plan():
+    """Ctrl+A, Ctrl+C - копирует содержимое поля для проверки"""
+    return InputPlan().chord(VK_CONTROL, ord('A')).chord(VK_CONTROL, ord('C'))
+
+
+def type_plan(text, auto_enter=False):
+    """Набор текста и Enter при автоотправке"""
+    plan = InputPlan().text(text)
+    if auto_enter:
+        plan.tap(VK_RETURN)
+    return plan
+
+
+def finish_plan(auto_enter=False):
+    """Стрелка вправо (снимает выделение) и Enter при автоотправке"""
+    plan = InputPlan().tap(VK_RIGHT)
+    if auto_enter:
+        plan.tap(VK_RETURN)
+    return plan
@@ -0,0 +1,210 @@
+import sys
+import time
+import ctypes
+import logging
+import threading
+from ctypes import wintypes
+
+
+WM_INPUTLANGCHANGEREQUEST = 0x0050
+
+# Сколько секунд после запроса смены раскладки окно может еще отдавать прежнюю
+SWITCH_GRACE = 1.0
+
+ENGLISH_LANGID = 0x0409
+ENGLISH_HKL = 0x04090409
+RUSSIAN_HKL = 0x04190419
+
+
+class LayoutBackend:
+    """Раскладка клавиатуры окон"""
+
+    def get_foreground(self):
+        raise NotImplementedError
+
+    def get_layout(self, hwnd):
+        """HKL раскладки потока, которому принадлежит окно hwnd"""
+        raise NotImplementedError
+
+    def request_layout(self, hwnd, hkl):
+        """Просит окно hwnd переключиться на раскладку hkl"""
+        raise NotImplementedError
+
+    def load_layout(self, langid):
+        """HKL раскладки для языка langid"""
+        return langid << 16 | langid
+
+
+class Win32LayoutBackend(LayoutBackend):
+    """GetKeyboardLayout потока окна и WM_INPUTLANGCHANGEREQUEST
+
+    Запрос смены раскладки ставится в очередь сообщений окна, а она разбирается
+    раньше ввода - нажатия после запроса уже идут в новой раскладке.
+    """
+
+    def __init__(self):
+        self.user32 = ctypes.windll.user32
+        self.user32.GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.c_void_p]
+        self.user32.GetWindowThreadProcessId.restype = wintypes.DWORD
+        self.user32.GetKeyboardLayout.argtypes = [wintypes.DWORD]
+        self.user32.GetKeyboardLayout.restype = wintypes.HKL
+        self.user32.PostMessageW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+        self.user32.LoadKeyboardLayoutW.argtypes = [wintypes.LPCWSTR, wintypes.UINT]
+        self.user32.LoadKeyboardLayoutW.restype = wintypes.HKL
+        self.user32.GetForegroundWindow.restype = wintypes.HWND
+
+    def get_foreground(self):
+        return self.user32.GetForegroundWindow() or 0
+
+    def get_layout(self, hwnd):
+        thread_id = self.user32.GetWindowThreadProcessId(hwnd, None)
+        return (self.user32.GetKeyboardLayout(thread_id) or 0) & 0xFFFFFFFF
+
+    def request_layout(self, hwnd, hkl):
+        if not self.user32.PostMessageW(hwnd, WM_INPUTLANGCHANGEREQUEST, 0, hkl):
+            raise OSError("Окно не приняло запрос смены раскладки")
+
+    def load_layout(self, langid):
+        hkl = self.user32.LoadKeyboardLayoutW(f"{langid:08X}", 0)
+        return (hkl or 0) & 0xFFFFFFFF or super().load_layout(langid)
+
+
+class FakeLayoutBackend(LayoutBackend):
+    """Раскладка в памяти для проверки без Windows: запросы применяются сразу"""
+
+    def __init__(self, layout=ENGLISH_HKL, hwnd=1):
+        self.layouts = {hwnd: layout}
+        self.foreground = hwnd
+        self.queries = 0
+        self.requests = []
+
+    def get_foreground(self):
+        return self.foreground
+
+    def get_layout(self, hwnd):
+        self.queries += 1
+        return self.layouts.get(hwnd, ENGLISH_HKL)
+
+    def request_layout(self, hwnd, hkl):
+        self.requests.append((hwnd, hkl))
+        self.layouts[hwnd] = hkl
+
+
+class LayoutTracker:
+    """Кэш раскладки активного окна
+
+    refresh обновляет кэш запросом к системе: при смене активного окна
+    и по редкому таймеру. Отправка читает кэш без системных вызовов и переключает
+    раскладку явным запросом окну, только если она не английская.
+    Раскладка пользователя возвращается один раз, когда отправок нет
+    restore_delay секунд; если пользователь сам сменил раскладку за это время,
+    ее не трогаем. Запрос смены обрабатывается окном не сразу, поэтому
+    прежняя раскладка в течение SWITCH_GRACE секунд после запроса считается
+    еще не примененным переключением, а не выбором пользователя.
+    """
+
+    def __init__(self, backend, restore_delay=0.5, clock=time.monotonic):
+        self.backend = backend
+        self.restore_delay = restore_delay
+        self.clock = clock
+        self.hwnd = 0
+        self.layout = None
+        self._english = None
+        self._user_layout = None
+        self._requested = 0.0
+        self._last_use = 0.0
+        self._lock = threading.Lock()
+        self.stats = {
+            'queries': 0,
+            'checks': 0,
+            'switches': 0,
+            'restores': 0
+        }
+
+    def set_window(self, hwnd):
+        """Активное окно сменилось; раскладку прежнего окна больше не возвращаем"""
+        if hwnd != self.hwnd:
+            self.restore()
+        self.hwnd = hwnd
+        self.refresh()
+
+    def refresh(self):
+        """Перечитывает раскладку активного окна"""
+        try:
+            hwnd = self.hwnd or self.backend.get_foreground()
+            if not hwnd:
+                return
+            layout = self.backend.get_layout(hwnd)
+            with self._lock:
+                self.hwnd = hwnd
+                self.stats['queries'] += 1
+                if self._user_layout is not None and layout != self._english:
+                    if layout == self._user_layout and self.clock() - self._requested < SWITCH_GRACE:
+                        # Окно еще не обработало запрос - в кэше остается английская
+                        return
+                    # Пользователь переключил раскладку сам, пока мы держали английскую
+                    self._user_layout = None
+                self.layout = layout
+        except Exception as e:
+            logging.error(f"Ошибка чтения раскладки клавиатуры: {e}")
+
+    def is_english(self):
+        """Английская ли раскладка по кэшу; неизвестная считается английской"""
+        if self.layout is None:
+            self.refresh()
+        self.stats['checks'] += 1
+        return self.layout is None or (self.layout & 0xFFFF) == ENGLISH_LANGID
+
+    def switch_to_english(self):
+        """Переключает окно на английскую раскладку, если нужно; True - переключили"""
+        english = self.is_english()
+        self._last_use = self.clock()
+        if english:
+            return False
+        if self._english is None:
+            self._english = self.backend.load_layout(ENGLISH_LANGID)
+        with self._lock:
+            previous, hwnd = self.layout, self.hwnd
+        self.backend.request_layout(hwnd, self._english)
+        with self._lock:
+            if self._user_layout is None:
+                self._user_layout = previous
+            self.layout = self._english
+            self._requested = self.clock()
+            self.stats['switches'] += 1
+        return True
+
+    def time_until_restore(self):
+        """Секунды до возврата раскладки или None, если возвращать нечего"""
+        if self._user_layout is None:
+            return None
+        return max(0.0, self._last_use + self.restore_delay - self.clock())
+
+    def restore_if_idle(self):
+        """Возвращает раскладку, если отправок не было restore_delay секунд"""
+        if self._user_layout is not None and self.clock() - self._last_use >= self.restore_delay:
+            self.restore()
+
+    def restore(self):
+        """Возвращает окну раскладку пользователя"""
+        with self._lock:
+            layout, self._user_layout = self._user_layout, None
+        if layout is None:
+            return
+        try:
+            self.backend.request_layout(self.hwnd, layout)
+            with self._lock:
+                self.layout = layout
+                self.stats['restores'] += 1
+        except Exception as e:
+            logging.error(f"Ошибка возврата раскладки клавиатуры: {e}")
+
+
+def create_layout_backend():
+    """Win32LayoutBackend на Windows, иначе раскладка в памяти"""
+    if sys.platform == 'win32':
+        try:
+            return Win32LayoutBackend()
+        except Exception as e:
+            logging.error(f"Ошибка создания источника раскладки: {e}")
+    return FakeLayoutBackend()
@@ -0,0 +1,188 @@
+import logging
+
+from . import input_plan
+from . import text_injection
+from .input_plan import InputPlan, VK_CONTROL, VK_SHIFT, VK_RETURN, PASTE_SETTLE_MS
+
+
+# Типы шагов макроса и их подписи в редакторе
+STEP_TYPES = {
+    'text': "Текст",
+    'command': "Команда",
+    'keys': "Клавиши",
+    'click': "Клик",
+    'delay': "Пауза",
+}
+
+# Поле ввода ответа, по которому кликает отправка текста (в координатах 1920x1080)
+INPUT_FIELD_POINT = (1405, 1033)
+
+KEY_NAMES = {
+    'ctrl': VK_CONTROL,
+    'shift': VK_SHIFT,
+    'alt': 0x12,
+    'enter': VK_RETURN,
+    'tab': 0x09,
+    'esc': 0x1B,
+    'space': 0x20,
+    'backspace': 0x08,
+    'delete': 0x2E,
+    'home': 0x24,
+    'end': 0x23,
+    'left': 0x25,
+    'up': 0x26,
+    'right': 0x27,
+    'down': 0x28,
+}
+KEY_NAMES.update({f'f{i}': 0x6F + i for i in range(1, 13)})
+
+
+def parse_key(name):
+    """Код клавиши по имени: ctrl, enter, f5, буква или цифра"""
+    name = name.strip().lower()
+    if name in KEY_NAMES:
+        return KEY_NAMES[name]
+    if len(name) == 1 and name.isascii() and name.isalnum():
+        return ord(name.upper())
+    raise ValueError(f"Неизвестная клавиша: {name}")
+
+
+def chord_plan(chord):
+    """План для сочетания вида 'ctrl+shift+v': модификаторы держатся, последняя клавиша нажимается"""
+    keys = [parse_key(name) for name in chord.split('+')]
+    plan = InputPlan()
+    for vk in keys[:-1]:
+        plan.down(vk)
+    plan.tap(keys[-1])
+    for vk in reversed(keys[:-1]):
+        plan.up(vk)
+    return plan
+
+
+def parse_step(kind, value, enter=False):
+    """Шаг макроса из значений редактора; ValueError при неверном значении"""
+    value = value.strip()
+    if kind == 'text':
+        if not value:
+            raise ValueError("Пустой текст")
+        return {'type': 'text', 'text': value, 'enter': bool(enter)}
+    if kind == 'command':
+        if not value:
+            raise ValueError("Пустая команда")
+        return {'type': 'command', 'text': value}
+    if kind == 'keys':
+        chord_plan(value)
+        return {'type': 'keys', 'keys': value.lower()}
+    if kind == 'click':
+        x, y = (int(part) for part in value.replace(';', ',').split(','))
+        return {'type': 'click', 'x': x, 'y': y}
+    if kind == 'delay':
+        return {'type': 'delay', 'ms': max(0, int(value))}
+    raise ValueError(f"Неизвестный тип шага: {kind}")
+
+
+def describe_step(step):
+    """Строка шага для списка в редакторе"""
+    kind = step.get('type')
+    title = STEP_TYPES.get(kind, kind)
+    if kind == 'text':
+        return f"{title}: {step['text']}{' + Enter' if step.get('enter') else ''}"
+    if kind == 'command':
+        return f"{title}: {step['text']}"
+    if kind == 'keys':
+        return f"{title}: {step['keys']}"
+    if kind == 'click':
+        return f"{title}: {step['x']}, {step['y']}"
+    if kind == 'delay':
+        return f"{title}: {step['ms']} мс"
+    return str(step)
+
+
+class CompiledMacro:
+    """Макрос, готовый к выполнению
+
+    Операции: ('clipboard', текст), ('click', x, y) в координатах 1920x1080
+    и ('plan', InputPlan). Соседние нажатия, набор текста и паузы собраны
+    в один план, который уходит пакетами SendInput.
+    """
+
+    def __init__(self, name, steps):
+        self.name = name
+        self.steps = list(steps)
+        self.operations = []
+        self._plan = None
+
+    def add_plan(self, plan):
+        if self._plan is None:
+            self._plan = InputPlan()
+            self.operations.append(('plan', self._plan))
+        self._plan.extend(plan)
+
+    def add(self, operation):
+        self._plan = None
+        self.operations.append(operation)
+
+
+def compile_macro(name, steps):
+    """Компилирует шаги кнопки в операции; неверные шаги пропускаются с записью в лог"""
+    macro = CompiledMacro(name, steps)
+    for step in steps:
+        try:
+            kind = step.get('type')
+            if kind in ('text', 'command'):
+                if kind == 'text':
+                    macro.add(('click',) + INPUT_FIELD_POINT)
+                text = step['text']
+                if text_injection.choose_injection_mode(text) == 'type':
+                    macro.add_plan(InputPlan().text(text))
+                else:
+                    # Окно читает буфер при обработке Ctrl+V: Enter и следующий текст - после паузы
+                    macro.add(('clipboard', text))
+                    macro.add_plan(input_plan.paste_plan().wait(PASTE_SETTLE_MS))
+                if kind == 'command' or step.get('enter'):
+                    macro.add_plan(InputPlan().tap(VK_RETURN))
+            elif kind == 'keys':
+                macro.add_plan(chord_plan(step['keys']))
+            elif kind == 'click':
+                macro.add(('click', int(step['x']), int(step['y'])))
+            elif kind == 'delay':
+                macro.add_plan(InputPlan().wait(int(step['ms'])))
+            else:
+                raise ValueError(f"Неизвестный тип шага: {kind}")
+        except Exception as e:
+            logging.error(f"Ошибка шага макроса {name}: {step} - {e}")
+    return macro
+
+
+def compile_macros(advanced_settings):
+    """Компилирует макросы всех кнопок с непустым списком шагов"""
+    return {name: compile_macro(name, settings['macro'])
+            for name, settings in advanced_settings.items()
+            if settings.get('macro')}
+
+
+def run_macro(sink, macro, mapper=None):
+    """Задание потока ввода: выполняет скомпилированный макрос
+
+    mapper(x, y) переводит координаты клика в пиксели текущего окна.
+    """
+    cursor = sink.cursor_pos()
+    moved = False
+    for operation in macro.operations:
+        kind = operation[0]
+        if kind == 'plan':
+            input_plan.execute(operation[1], sink)
+        elif kind == 'clipboard':
+            # Как в send_response: раскладка из кэша, переключение только перед вставкой
+            if sink.layout and sink.layout.switch_to_english():
+                logging.info("Раскладка клавиатуры не английская - переключаем")
+            sink.set_clipboard(operation[1])
+        elif kind == 'click':
+            point = mapper(*operation[1:]) if mapper else operation[1:]
+            if sink.pointer.click(point, restore=False) == 'sendinput':
+                moved = True
+
+    # Курсор возвращается на место один раз, как после обычной отправки
+    if moved:
+        sink.move_to(*cursor)
+    return {'macro': macro.name, 'steps': len(macro.steps)}
@@ -1,25 +1,22 @@
 import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QPushButton, QLabel, QHBoxLayout, QDialog, 
-                            QFileDialog, QMessageBox, QScrollArea)
-from PyQt6.QtCore import Qt, QPoint, pyqtSignal
+                            QFileDialog, QMessageBox, QScrollArea,
+                            QTableWidget, QTableWidgetItem)
+from PyQt6.QtCore import Qt, QPoint, pyqtSignal, QTimer
 from PyQt6.QtGui import QPixmap, QImage, QPainter, QPen, QColor, QWheelEvent
 from PyQt6.QtGui import QGuiApplication
 from PIL import Image
 import numpy as np
-import json
-import os
-from pathlib import Path
 import ctypes
-import pyautogui
 from pynput import keyboard as pynput_keyboard
 from pynput import mouse as pynput_mouse
 
 import logging
-from scripts.win_event_listener import WinEventListener
 from scripts.button_editor import ButtonEditor  # Добавьте в начало файла
 
 from scripts.hotkey_manager import HotkeyManager
+from scripts.settings_store import get_settings_store
 from scripts.hotkey_dialog import HotkeyDialog
 from scripts.notification_manager import NotificationManager
 
@@ -623,16 +620,7 @@ class ScreenshotAnalyzerDialog(QDialog):
                 'tolerance': 15  # Увеличиваем допуск для надежности
             }
             
-            if hasattr(self, 'editor') and self.editor:
-                settings_dir = self.editor.settings_dir
-            else:
-                settings_dir = os.path.join(os.path.dirname(sys.executable), "scripts", "settings")
-            
-            os.makedirs(settings_dir, exist_ok=True)
-            color_settings_path = os.path.join(settings_dir, "color_settings.json")
-            
-            with open(color_settings_path, 'w') as f:
-                json.dump(settings, f, indent=2)
+            get_settings_store().set("color_settings.json", settings)
                 
             logging.info(f"Настройки двух точек сохранены:")
             logging.info(f"Точка 1: {coords1} - {color1}")
@@ -650,15 +638,6 @@ class ScreenshotAnalyzerDialog(QDialog):
 
     def save_color_settings(self):
         try:
-        # Используем тот же метод определения пути
-            if hasattr(self, 'editor') and self.editor:
-                settings_dir = self.editor.settings_dir
-            else:
-                settings_dir = os.path.join(os.path.dirname(sys.executable), "scripts", "settings")
-            
-            os.makedirs(settings_dir, exist_ok=True)
-            color_settings_path = os.path.join(settings_dir, "color_settings.json")
-            
             settings = {
                 'check_coords': self.editor.check_coords,
                 'required_color': self.editor.required_color,
@@ -666,8 +645,7 @@ class ScreenshotAnalyzerDialog(QDialog):
                 'zone_color': self.editor.zone_color,
             }
             
-            with open(color_settings_path, 'w') as f:
-                json.dump(settings, f)
+            get_settings_store().set("color_settings.json", settings)
         except Exception as e:
             logging.info(f"Ошибка сохранения настроек цвета: {e}")
 
@@ -684,24 +662,6 @@ class ScreenshotAnalyzerDialog(QDialog):
 
     
 
-    def get_settings_path(self):
-        """Возвращает путь к app_settings.json в scripts/settings"""
-        try:
-            # Получаем правильный путь к папке scripts
-            if getattr(sys, 'frozen', False):
-                # Если приложение собрано в exe
-                base_dir = Path(sys.executable).parent
-            else:
-                # Если запуск из исходного кода
-                base_dir = Path(__file__).parent
-            
-            settings_dir = base_dir / "scripts" / "settings"
-            settings_dir.mkdir(parents=True, exist_ok=True)
-            return settings_dir / "app_settings.json"
-        except Exception as e:
-            logging.error(f"Ошибка получения пути настроек: {e}")
-            return Path("app_settings.json")  # fallback
-
 
 
     def check_chat_settings(self):
@@ -715,7 +675,7 @@ class ScreenshotAnalyzerDialog(QDialog):
             # Проверяем текущий цвет в указанных координатах
             try:
                 x, y = self.editor.chat_detection_coords
-                current_color = pyautogui.pixel(x, y)
+                current_color = self.editor.screen_source.pixel(x, y)
                 logging.info(f"Текущий цвет на экране: {current_color}")
                 
                 # Проверяем совпадение
@@ -844,6 +804,48 @@ class HelpDialog(QDialog):
         layout.addWidget(QLabel("Здесь будет справочная информация"))
         self.setLayout(layout)
 
+class SchedulerStatsDialog(QDialog):
+    """Окно отладки: интервалы и счетчики тиков каждой фоновой проверки"""
+
+    COLUMNS = [
+        ('name', "Проверка"),
+        ('enabled', "Вкл"),
+        ('interval_ms', "Интервал, мс"),
+        ('min_ms', "Мин, мс"),
+        ('max_ms', "Макс, мс"),
+        ('ticks', "Тиков"),
+        ('changes', "Изменений"),
+        ('avg_ms', "Среднее, мс"),
+        ('busy_ms', "Всего, мс")
+    ]
+
+    def __init__(self, detection_worker, parent=None):
+        super().__init__(parent)
+        self.detection_worker = detection_worker
+        self.setWindowTitle("Планировщик проверок")
+        self.resize(760, 260)
+
+        layout = QVBoxLayout()
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for _, title in self.COLUMNS])
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+        # Обновляется только пока окно открыто
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        rows = self.detection_worker.stats()
+        self.table.setRowCount(len(rows))
+        for row, stats in enumerate(rows):
+            for column, (key, _) in enumerate(self.COLUMNS):
+                value = stats[key]
+                text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                self.table.setItem(row, column, QTableWidgetItem(text))
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -908,6 +910,7 @@ class MainWindow(QMainWindow):
             #("⚙️ Настройка функций", self.open_function_settings),
             ("⚙️ Настройка горячих клавиш", self.open_hotkey_settings),
             ("🖼️ Анализатор скриншотов", self.open_screenshot_analyzer),
+            ("📊 Планировщик проверок", self.open_scheduler_stats),
             ("❓ Помощь", self.show_help),
             ("🚪 Выход", self.close)
         ]
@@ -1108,6 +1111,14 @@ class MainWindow(QMainWindow):
             logging.error(f"Ошибка открытия настроек горячих клавиш: {e}")
             QMessageBox.warning(self, "Ошибка", f"Не удалось открыть настройки горячих клавиш: {str(e)}")
 
+    def open_scheduler_stats(self):
+        """Открывает окно отладки фоновых проверок"""
+        try:
+            dialog = SchedulerStatsDialog(self.editor.detection_worker, self)
+            dialog.exec()
+        except Exception as e:
+            logging.error(f"Ошибка открытия окна планировщика: {e}")
+
     def on_hotkey_changed(self, action, key_sequence):
         """Обрабатывает изменение горячей клавиши"""
         try:
@@ -1328,11 +1339,8 @@ class MainWindow(QMainWindow):
     def load_settings(self):
         """Загружает настройки из файла"""
         try:
-            settings_path = self.get_settings_path()
-            if settings_path.exists():
-                with open(settings_path, 'r') as f:
-                    settings = json.load(f)
-                
+            settings = get_settings_store().get("app_settings.json")
+            if settings is not None:
                 # Загружаем состояние исполнителя
                 self.executor_enabled = settings.get('executor_enabled', False)
                 
@@ -1349,6 +1357,10 @@ class MainWindow(QMainWindow):
                         self.executor_btn.setText("🎮 Запустить исполнитель")
                         self.statusBar().showMessage("Автоматический исполнитель ВЫКЛЮЧЕН")
                 
+                # Источник захвата экрана: auto, gdi, pyautogui или file
+                self.screen_backend = settings.get('screen_backend', 'auto')
+                self.screen_replay = settings.get('screen_replay')
+                
                 # Загружаем основные настройки
                 self.click_coordinates = tuple(settings.get('click_coordinates', (22, 330)))
                 self.check_coords = tuple(settings.get('check_coords', (22, 330)))
@@ -1400,31 +1412,21 @@ class MainWindow(QMainWindow):
                     'zone_size': self.chat_zone_size,
                     'min_matches': self.chat_min_matches,
                     'check_step': self.chat_check_step
-                }
+                },
+                'screen_backend': getattr(self, 'screen_backend', 'auto'),
+                'screen_replay': getattr(self, 'screen_replay', None)
             }
             
-            settings_path = self.get_settings_path()
-            logging.info(f"Сохранение настроек в: {settings_path}")
-            
-            with open(settings_path, 'w') as f:
-                json.dump(settings, f, indent=2)
+            # Ключи, которые окно не знает (pointer_mode, chat_rate_limit и др.), сохраняются
+            store = get_settings_store()
+            logging.info(f"Сохранение настроек в: {store.path('app_settings.json')}")
+            store.update("app_settings.json", settings)
                 
             logging.info(f"Настройки сохранены, executor_enabled: {self.executor_enabled}")
             
         except Exception as e:
             logging.error(f"Ошибка сохранения настроек: {e}")
 
-    def get_settings_path(self):
-        """Возвращает путь к app_settings.json в scripts/settings"""
-        try:
-            script_dir = Path(__file__).parent / "scripts"
-            settings_dir = script_dir / "settings"
-            settings_dir.mkdir(parents=True, exist_ok=True)
-            return settings_dir / "app_settings.json"
-        except Exception as e:
-            logging.error(f"Ошибка получения пути настроек: {e}")
-            return Path("app_settings.json")  # fallback
-
 def closeEvent(self, event):
     """Обработка закрытия приложения"""
     try:
@@ -0,0 +1,145 @@
+import logging
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from . import input_plan
+from . import text_injection
+from .input_plan import InputPlan, VK_CONTROL, VK_RIGHT
+
+
+class VerificationPolicy:
+    """Какие вставки проверять: off - никакие, sampled - каждую every-ю, always - все
+
+    Вставку с автоотправкой можно проверить только до Enter, то есть на пути
+    отправки; поэтому такие вставки проверяются, только если включен inline.
+    """
+
+    MODES = ('off', 'sampled', 'always')
+
+    def __init__(self, mode='sampled', every=10, retry=True, inline=False):
+        self.mode = mode if mode in self.MODES else 'sampled'
+        self.every = max(1, int(every))
+        self.retry = retry
+        self.inline = bool(inline)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def should_verify(self):
+        """Решает для очередной вставки, проверять ли ее"""
+        if self.mode == 'off':
+            return False
+        if self.mode == 'always':
+            return True
+        with self._lock:
+            self._count += 1
+            return self._count % self.every == 0
+
+
+class PasteVerifier(QObject):
+    """Проверка вставленного текста по политике
+
+    Без автоотправки проверка идет отдельным заданием после отправки и не задерживает ее;
+    с автоотправкой - перед Enter, пока текст еще в поле, и только если policy.inline.
+    Несовпадение приходит сигналом mismatch(ожидалось, получено) и учитывается в stats;
+    при retry вставка перед Enter повторяется и проверяется еще раз. Проверка после
+    отправки только сообщает о несовпадении: поле к этому времени может принадлежать
+    пользователю, поэтому она пропускается (skipped), если активно другое окно
+    или после отправки был чужой ввод.
+    """
+
+    mismatch = pyqtSignal(str, str)
+
+    def __init__(self, policy=None, parent=None):
+        super().__init__(parent)
+        self.policy = policy or VerificationPolicy()
+        self.stats = {
+            'checked': 0,
+            'passed': 0,
+            'failed': 0,
+            'retried': 0,
+            'recovered': 0,
+            'skipped': 0
+        }
+
+    def placement(self, mode, auto_enter):
+        """Где проверять очередную отправку: None, 'inline' (до Enter) или 'after' (отдельным заданием)
+
+        Набор символами буфер не использует, поэтому проверяются только вставки.
+        После Enter поле уже пустое, так что автоотправка без inline не проверяется.
+        """
+        if mode != 'paste' or (auto_enter and not self.policy.inline):
+            return None
+        if not self.policy.should_verify():
+            return None
+        return 'inline' if auto_enter else 'after'
+
+    def check(self, sink, expected, before=None, retry=None):
+        """Копирует поле ввода и сравнивает с ожидаемым; выполняется в потоке ввода
+
+        retry=None - повтор вставки по политике.
+        """
+        if retry is None:
+            retry = self.policy.retry
+        try:
+            inserted = text_injection.read_field_text(sink, before)
+            matched = text_injection.texts_match(expected, inserted)
+
+            if not matched and retry:
+                self.stats['retried'] += 1
+                # Выделяем все поле и вставляем ответ заново
+                sink.set_clipboard(expected)
+                repaste = InputPlan().chord(VK_CONTROL, ord('A')).chord(VK_CONTROL, ord('V'))
+                inserted = text_injection.read_field_text(sink, repaste)
+                matched = text_injection.texts_match(expected, inserted)
+                if matched:
+                    self.stats['recovered'] += 1
+        except Exception as e:
+            logging.error(f"Ошибка при проверке вставленного текста: {e}")
+            return False
+
+        self.stats['checked'] += 1
+        if matched:
+            self.stats['passed'] += 1
+            return True
+
+        self.stats['failed'] += 1
+        logging.error(f"Текст не совпадает! Ожидалось: '{expected}', получено: '{inserted}' "
+                      f"(ошибок {self.stats['failed']} из {self.stats['checked']})")
+        self.mismatch.emit(expected, inserted)
+        return False
+
+    def verify_job(self, sink, expected, hwnd=None):
+        """Задание потока ввода: проверка уже отправленной вставки в окне hwnd
+
+        Пропускается, если активно другое окно или пользователь уже вводил
+        что-то после отправки; несовпадение только сообщается, без повтора.
+        """
+        if hwnd and sink.foreground_window() != hwnd:
+            self.stats['skipped'] += 1
+            logging.info("Проверка вставки пропущена: активно другое окно")
+            return {'verified': None, 'skipped': 'foreground'}
+        if sink.input_since_send():
+            self.stats['skipped'] += 1
+            logging.info("Проверка вставки пропущена: после отправки был ввод пользователя")
+            return {'verified': None, 'skipped': 'input'}
+
+        verified = self.check(sink, expected, retry=False)
+        # Снимаем выделение после Ctrl+A
+        input_plan.execute(InputPlan().tap(VK_RIGHT), sink)
+        return {'verified': verified}
+
+
+def load_verification_policy(app_settings):
+    """paste_verification, paste_verification_every, paste_verification_retry
+    и paste_verification_inline из настроек app_settings.json"""
+    try:
+        return VerificationPolicy(
+            app_settings.get('paste_verification', 'sampled'),
+            app_settings.get('paste_verification_every', 10),
+            app_settings.get('paste_verification_retry', True),
+            app_settings.get('paste_verification_inline', False)
+        )
+    except Exception as e:
+        logging.error(f"Ошибка чтения настроек проверки вставки: {e}")
+    return VerificationPolicy()
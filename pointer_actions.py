@@ -0,0 +1,82 @@
+import time
+import logging
+import threading
+
+from . import input_plan
+from .input_plan import InputPlan
+
+
+# Способы клика: пакет SendInput с возвратом курсора или сообщение окну без движения курсора
+POINTER_MODES = ('sendinput', 'post')
+
+
+def click_plan(target, restore=None, button='left'):
+    """Перемещение в target, клик и возврат в restore одним пакетом SendInput"""
+    plan = InputPlan().click(target[0], target[1], button)
+    if restore is not None:
+        plan.move(*restore)
+    return plan
+
+
+class PointerEngine:
+    """Клики получателя ввода
+
+    По умолчанию клик идет пакетом SendInput: перемещение, нажатие, отпускание
+    и возврат курсора без промежуточных пауз.
+
+    Режим post включается только явно (pointer_mode: post в app_settings.json):
+    клик уходит сообщением окну игры под точкой, и курсор не двигается. Многие
+    окна DirectX и CEF присланные сообщения мыши не обрабатывают, а узнать об этом
+    нельзя - такой клик молча теряется, поэтому режим стоит включать, только
+    проверив его на своем клиенте. SendInput используется, лишь если под точкой
+    не окно игры (оверлей, чужое окно).
+    """
+
+    def __init__(self, sink, mode='sendinput'):
+        self.sink = sink
+        self.mode = mode if mode in POINTER_MODES else 'sendinput'
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def click(self, target, button='left', restore=True):
+        """Клик в точке экрана target; возвращает способ: 'post' или 'sendinput'"""
+        started = time.perf_counter()
+        method = None
+        if self.mode == 'post':
+            try:
+                if self.sink.post_click(target[0], target[1], button):
+                    method = 'post'
+            except Exception as e:
+                logging.error(f"Ошибка отправки клика окну: {e}")
+
+        if method is None:
+            cursor = self.sink.cursor_pos() if restore else None
+            input_plan.execute(click_plan(target, cursor, button), self.sink)
+            method = 'sendinput'
+
+        self._record(method, (time.perf_counter() - started) * 1000)
+        return method
+
+    def _record(self, method, elapsed_ms):
+        with self._lock:
+            stats = self.stats.setdefault(method, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    def metrics(self):
+        """Число кликов, среднее и максимальное время по способам, мс"""
+        with self._lock:
+            return {method: dict(stats, avg_ms=stats['total_ms'] / stats['count'])
+                    for method, stats in self.stats.items()}
+
+
+def click_job(sink, target, button='left', restore=True):
+    """Задание потока ввода: клик в точке экрана"""
+    return {'method': sink.pointer.click(target, button, restore)}
+
+
+def load_pointer_mode(app_settings, default='sendinput'):
+    """pointer_mode (sendinput или post) из настроек app_settings.json"""
+    mode = app_settings.get('pointer_mode', default)
+    return mode if mode in POINTER_MODES else default
@@ -5,10 +5,21 @@ from pathlib import Path
 from PyQt6.QtWidgets import QWidget, QLabel, QApplication
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QGuiApplication
-import pyautogui
+
+try:
+    from .frame_sampler import FrameSampler
+    from .screen_source import create_screen_source
+    from .detection_worker import DetectionWorker
+    from .settings_store import get_settings_dir, get_settings_store
+except ImportError:
+    # Запуск как отдельного скрипта
+    from frame_sampler import FrameSampler
+    from screen_source import create_screen_source
+    from detection_worker import DetectionWorker
+    from settings_store import get_settings_dir, get_settings_store
 
 class ReportLabel(QWidget):
-    def __init__(self):
+    def __init__(self, detection_worker=None):
         super().__init__()
         self.setWindowFlags(
             Qt.WindowType.WindowStaysOnTopHint |
@@ -39,15 +50,24 @@ class ReportLabel(QWidget):
         self.check_coords = (45, 380)
         self.target_color = (51, 59, 71)
         self.color_tolerance = 10
-        
-        # Таймеры
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.check_conditions)
-        self.timer.start(500)
 
-        self.counter_timer = QTimer(self)
-        self.counter_timer.timeout.connect(self.check_counter)
-        self.counter_timer.start(300)
+        # Проба метки снимается через общий кадр в фоновом потоке
+        self.detection_worker = detection_worker or DetectionWorker(FrameSampler(
+            create_screen_source(settings=get_settings_store().section('app_settings.json'))))
+        self.frame_sampler = self.detection_worker.frame_sampler
+        self.frame_sampler.set_point_probe('report_label', *self.check_coords)
+        self.detection_worker.add_check('report_label', self.check_conditions, 100, 500)
+
+        # Команды счетчика читаются из файла в том же потоке
+        self.processed_reports = 0
+        self.applied_reports = 0
+        self.detection_worker.add_check('report_counter', self.check_counter, 150, 300)
+
+        self.detection_worker.state_changed.connect(self.on_detection_state_changed)
+        if detection_worker is None:
+            # Жалобы приходят от игроков, клавиатура на них не влияет
+            self.detection_worker.watch_user_input(key_checks=())
+            self.detection_worker.start()
 
         # Для двойного клика
         self.last_click_time = 0
@@ -63,9 +83,7 @@ class ReportLabel(QWidget):
 
     def get_data_path(self, filename):
         """Возвращает полный путь к файлу данных в папке scripts/settings"""
-        # ИСПРАВЛЕННЫЙ ПУТЬ - убираем лишнюю папку scripts
-        base_path = Path(__file__).parent.parent  # Переходим на уровень выше
-        settings_dir = base_path / "scripts" / "settings"
+        settings_dir = Path(get_settings_dir())
         settings_dir.mkdir(parents=True, exist_ok=True)
         
         return settings_dir / filename
@@ -109,10 +127,7 @@ class ReportLabel(QWidget):
                     with open(path, 'r+') as f:
                         content = f.read().strip()
                         if content == '+1':
-                            self.report_count += 1
-                            self.update_label()
-                            self.save_counter()
-                            print(f"[DEBUG] Счетчик увеличен: {self.report_count}")
+                            self.processed_reports += 1
                         
                         # Очищаем файл только если он содержит +1
                         if content:
@@ -120,9 +135,9 @@ class ReportLabel(QWidget):
                             f.truncate()
                 except PermissionError:
                     print("[WARNING] Файл занят, пропускаем итерацию")
-                    return
         except Exception as e:
             print(f"[ERROR] Ошибка обработки счетчика: {str(e)}")
+        return self.processed_reports
 
     def update_label(self):
         """Обновляет текст метки"""
@@ -144,14 +159,24 @@ class ReportLabel(QWidget):
         )
 
     def check_conditions(self):
+        """Выполняется в фоновом потоке: нужно ли показывать метку"""
         try:
             x, y = self.check_coords
-            pixel = pyautogui.pixel(x, y)
-            color_match = all(abs(p - t) <= self.color_tolerance 
-                           for p, t in zip(pixel, self.target_color))
-            self.setVisible(color_match)
+            pixel = self.frame_sampler.pixel(x, y)
+            return all(abs(p - t) <= self.color_tolerance 
+                       for p, t in zip(pixel, self.target_color))
         except:
-            self.setVisible(False)
+            return False
+
+    def on_detection_state_changed(self, name, value):
+        if name == 'report_label':
+            self.setVisible(value)
+        elif name == 'report_counter' and value > self.applied_reports:
+            self.report_count += value - self.applied_reports
+            self.applied_reports = value
+            self.update_label()
+            self.save_counter()
+            print(f"[DEBUG] Счетчик увеличен: {self.report_count}")
 
 if __name__ == "__main__":
     app = QApplication([])
@@ -0,0 +1,250 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from .button_diff import parse_button_entries
+
+
+# Файл библиотеки в папке настроек, если в app_settings.json задано "response_library": true
+LIBRARY_FILE = "response_library.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buttons (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT NOT NULL DEFAULT '',
+    responses TEXT NOT NULL DEFAULT '',
+    row INTEGER NOT NULL DEFAULT 0,
+    col INTEGER NOT NULL DEFAULT 0,
+    width INTEGER,
+    height INTEGER,
+    advanced TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS buttons_fts USING fts5(
+    name, description, responses,
+    content='buttons', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS buttons_ai AFTER INSERT ON buttons BEGIN
+    INSERT INTO buttons_fts(rowid, name, description, responses)
+    VALUES (new.id, new.name, new.description, new.responses);
+END;
+CREATE TRIGGER IF NOT EXISTS buttons_ad AFTER DELETE ON buttons BEGIN
+    INSERT INTO buttons_fts(buttons_fts, rowid, name, description, responses)
+    VALUES ('delete', old.id, old.name, old.description, old.responses);
+END;
+CREATE TRIGGER IF NOT EXISTS buttons_au AFTER UPDATE ON buttons BEGIN
+    INSERT INTO buttons_fts(buttons_fts, rowid, name, description, responses)
+    VALUES ('delete', old.id, old.name, old.description, old.responses);
+    INSERT INTO buttons_fts(rowid, name, description, responses)
+    VALUES (new.id, new.name, new.description, new.responses);
+END;
+"""
+
+
+class ResponseLibrary:
+    """Библиотека ответов кнопок в SQLite
+
+    Кнопки хранятся в порядке файла кнопок (id - номер в файле), полнотекстовый индекс FTS5 строится
+    по имени, описанию и вариантам ответа. Поиск идет по префиксам слов и
+    возвращает не больше limit записей в порядке файла: индекс отдает строки
+    по возрастанию id и останавливается на limit, поэтому время поиска почти
+    не растет с размером библиотеки. Если SQLite собран без FTS5, поиск идет через LIKE.
+    Записи возвращаются в формате button_diff.parse_button_entries. Импорт
+    переписывает только строки, которые отличаются от файла, поэтому правка
+    одной кнопки не перестраивает индекс целиком.
+    """
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.connection.executescript(SCHEMA)
+        self.fts = self._create_index()
+        self.stats = {
+            'imports': 0,
+            'rows_written': 0,
+            'searches': 0,
+            'search_ms_total': 0.0,
+            'search_ms_max': 0.0
+        }
+
+    def _create_index(self):
+        try:
+            self.connection.executescript(FTS_SCHEMA)
+            return True
+        except sqlite3.OperationalError as e:
+            logging.warning(f"FTS5 недоступен, поиск ответов идет через LIKE: {e}")
+            return False
+
+    def count(self):
+        """Число кнопок в библиотеке"""
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM buttons").fetchone()[0]
+
+    def import_items(self, items):
+        """Заменяет содержимое библиотеки списком кнопок в формате button_config.json
+
+        Строки сравниваются по номеру в файле: удаляются лишние и изменившиеся,
+        изменившиеся и новые вставляются заново. Имена в файле уникальны,
+        поэтому удаление перед вставкой не нарушает UNIQUE(name).
+        """
+        entries = parse_button_entries(items)
+        rows = [(index + 1, name, entry['description'], _responses_text(entry['advanced']),
+                 entry['position'][0], entry['position'][1], entry['width'], entry['height'],
+                 json.dumps(entry['advanced'], ensure_ascii=False) if entry['advanced'] else None)
+                for index, (name, entry) in enumerate(entries.items())]
+        with self._lock, self.connection:
+            stored = {row[0]: row for row in self.connection.execute(
+                "SELECT id, name, description, responses, row, col, width, height, advanced FROM buttons")}
+            changed = [row for row in rows if stored.get(row[0]) != row]
+            stale = [(row[0],) for row in changed if row[0] in stored]
+            stale += [(button_id,) for button_id in stored if button_id > len(rows)]
+            self.connection.executemany("DELETE FROM buttons WHERE id = ?", stale)
+            self.connection.executemany(
+                "INSERT INTO buttons (id, name, description, responses, row, col, width, height, advanced) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", changed)
+            self.stats['imports'] += 1
+            self.stats['rows_written'] += len(stale) + len(changed)
+        return len(rows)
+
+    def import_json(self, path):
+        """Импорт из файла кнопок; возвращает число кнопок"""
+        # Подпись до чтения: файл, сохраненный во время импорта, не сочтется уже импортированным
+        signature = _file_signature(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            count = self.import_items(json.load(f))
+        self._set_meta('source', signature)
+        return count
+
+    def sync_json(self, path):
+        """Импортирует файл кнопок, только если он изменился с прошлого импорта; True - импортирован"""
+        if self._get_meta('source') == _file_signature(path):
+            return False
+        self.import_json(path)
+        return True
+
+    def export_items(self):
+        """Кнопки библиотеки списком в формате button_config.json"""
+        items = []
+        for name, entry in self._select("SELECT * FROM buttons ORDER BY id").items():
+            item = {
+                'name': name,
+                'description': entry['description'],
+                'position': list(entry['position']),
+                'width': entry['width'],
+                'height': entry['height'],
+            }
+            if entry['advanced']:
+                item['advanced'] = entry['advanced']
+            items.append(item)
+        return items
+
+    def export_json(self, path):
+        """Экспорт в файл кнопок; возвращает число кнопок"""
+        items = self.export_items()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, indent=2, ensure_ascii=False)
+        return len(items)
+
+    def get(self, name):
+        """Запись кнопки по имени или None"""
+        return self._select("SELECT * FROM buttons WHERE name = ?", (name,)).get(name)
+
+    def page(self, offset=0, limit=50):
+        """Записи кнопок по порядку файла"""
+        return self._select("SELECT * FROM buttons ORDER BY id LIMIT ? OFFSET ?", (limit, offset))
+
+    def search(self, query, limit=50):
+        """Кнопки, где все слова запроса встречаются как начала слов; пустой запрос - первая страница"""
+        words = re.findall(r'\w+', query.lower())
+        if not words:
+            return self.page(0, limit)
+
+        started = time.perf_counter()
+        if self.fts:
+            match = ' '.join(f'"{word}"*' for word in words)
+            entries = self._select(
+                "SELECT * FROM buttons WHERE id IN ("
+                "SELECT rowid FROM buttons_fts WHERE buttons_fts MATCH ? ORDER BY rowid LIMIT ?"
+                ") ORDER BY id", (match, limit))
+        else:
+            condition = ' AND '.join("(name || ' ' || description || ' ' || responses) LIKE ?" for _ in words)
+            entries = self._select(f"SELECT * FROM buttons WHERE {condition} ORDER BY id LIMIT ?",
+                                   [f"%{word}%" for word in words] + [limit])
+
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.stats['searches'] += 1
+            self.stats['search_ms_total'] += elapsed
+            self.stats['search_ms_max'] = max(self.stats['search_ms_max'], elapsed)
+        return entries
+
+    def metrics(self):
+        """Число кнопок, импортов и поисков, среднее и максимальное время поиска, мс"""
+        count = self.count()
+        with self._lock:
+            searches = self.stats['searches']
+            return dict(self.stats,
+                        buttons=count,
+                        fts=self.fts,
+                        search_ms_avg=self.stats['search_ms_total'] / searches if searches else 0.0)
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def _select(self, sql, params=()):
+        with self._lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        return {name: {
+            'description': description,
+            'position': (row, col),
+            'width': width,
+            'height': height,
+            'advanced': json.loads(advanced) if advanced else None
+        } for _, name, description, _, row, col, width, height, advanced in rows}
+
+    def _get_meta(self, key):
+        with self._lock:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        with self._lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def _responses_text(advanced):
+    if not advanced:
+        return ''
+    return '\n'.join(response for response in advanced.get('responses', []) if isinstance(response, str))
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def create_response_library(app_settings, settings_dir):
+    """Библиотека ответов, если она включена в app_settings.json (response_library: true или путь)"""
+    setting = app_settings.get('response_library', False)
+    if not setting:
+        return None
+    path = setting if isinstance(setting, str) else os.path.join(settings_dir, LIBRARY_FILE)
+    try:
+        return ResponseLibrary(path)
+    except Exception as e:
+        logging.error(f"Ошибка открытия библиотеки ответов {path}: {e}")
+        return None
@@ -0,0 +1,86 @@
+import random
+
+
+# Верхняя граница числа ответов кнопки в расширенных настройках
+MAX_RESPONSES = 500
+
+
+class ResponsePool:
+    """Варианты ответа кнопки с выбором по перемешанному мешку
+
+    Ответы очищаются от пробелов по краям, пустые отбрасываются, повторы
+    объединяются (их веса складываются). В мешок каждый ответ кладется
+    столько раз, каков его вес, и ответы берутся с конца, пока он не опустеет.
+    Так ни один ответ не повторяется раньше, чем выйдут остальные. Копии
+    одного ответа раскладываются через одну, поэтому подряд он не выпадает,
+    пока его вес не больше половины мешка.
+    """
+
+    def __init__(self, responses, weights=None, rng=None):
+        self.rng = rng or random.Random()
+        self.responses = []
+        self.weights = []
+        index = {}
+        weights = list(weights or [])
+        for i, response in enumerate(responses):
+            text = response.strip()
+            if not text:
+                continue
+            weight = max(1, int(weights[i])) if i < len(weights) else 1
+            if text in index:
+                self.weights[index[text]] += weight
+            else:
+                index[text] = len(self.responses)
+                self.responses.append(text)
+                self.weights.append(weight)
+
+        self._bag = []
+        self._last = None
+
+    def __len__(self):
+        return len(self.responses)
+
+    def next(self):
+        """Следующий ответ; None, если ответов нет"""
+        if not self.responses:
+            return None
+        if not self._bag:
+            self._refill()
+        self._last = self._bag.pop()
+        return self.responses[self._last]
+
+    def _refill(self):
+        # Случайный порядок ответов, самые частые первыми
+        order = list(range(len(self.responses)))
+        self.rng.shuffle(order)
+        order.sort(key=lambda i: self.weights[i], reverse=True)
+
+        # Копии по порядку занимают сначала четные места, затем нечетные
+        size = sum(self.weights)
+        slots = list(range(0, size, 2)) + list(range(1, size, 2))
+        bag = [0] * size
+        copies = (i for i in order for _ in range(self.weights[i]))
+        for slot, i in zip(slots, copies):
+            bag[slot] = i
+
+        # Первым берется последний элемент: он не должен совпасть с прошлым ответом
+        if size > 1 and bag[-1] == self._last:
+            for other in range(size - 2, -1, -1):
+                if bag[other] != self._last and (other == 0 or bag[other - 1] != self._last) \
+                        and (other + 1 == size - 1 or bag[other + 1] != self._last) \
+                        and (other == size - 2 or bag[other] != bag[-2]):
+                    bag[-1], bag[other] = bag[other], bag[-1]
+                    break
+        self._bag = bag
+
+
+def compile_pools(advanced_settings):
+    """Мешки ответов для кнопок с несколькими ответами"""
+    return {name: compile_pool(settings)
+            for name, settings in advanced_settings.items()
+            if settings.get('response_count', 1) > 1}
+
+
+def compile_pool(settings):
+    """Мешок ответов из настроек кнопки (responses и необязательные weights)"""
+    return ResponsePool(settings.get('responses', []), settings.get('weights'))
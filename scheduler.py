@@ -0,0 +1,124 @@
+import time
+
+
+class ScheduledCheck:
+    """Проверка в планировщике: текущий интервал, последний результат и счетчики"""
+
+    def __init__(self, name, func, min_interval, max_interval, enabled=True, publish=True):
+        self.name = name
+        self.func = func
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = min_interval
+        self.enabled = enabled
+        self.publish = publish
+        self.next_due = 0.0
+        self.started = 0.0
+        self.hold_until = 0.0
+
+        self.value = None
+        self.has_value = False
+
+        self.stats = {
+            'ticks': 0,
+            'changes': 0,
+            'busy_ms': 0.0,
+            'last_ms': 0.0
+        }
+
+
+class AdaptiveScheduler:
+    """Планировщик проверок с адаптивным интервалом
+
+    Пока результат проверки не меняется, интервал растет в backoff раз
+    до max_interval. При изменении результата или действии пользователя
+    интервал сбрасывается до min_interval и держится там boost_hold мс.
+    Интервалы задаются в мс. max_interval не должен превышать интервал
+    прежнего фиксированного таймера, иначе в простое переход замечается позже.
+    """
+
+    def __init__(self, backoff=2.0, boost_hold=1000, clock=time.monotonic):
+        self.backoff = backoff
+        self.boost_hold = boost_hold / 1000
+        self.clock = clock
+        self.checks = {}
+
+    def add(self, name, func, min_interval, max_interval=None, enabled=True, publish=True):
+        """Регистрирует проверку; без max_interval интервал фиксированный"""
+        check = ScheduledCheck(name, func, min_interval / 1000,
+                               (max_interval or min_interval) / 1000, enabled, publish)
+        check.next_due = self.clock()
+        self.checks[name] = check
+        return check
+
+    def remove(self, name):
+        return self.checks.pop(name, None)
+
+    def set_enabled(self, name, enabled):
+        """Включает проверку (сразу на быстром интервале) или приостанавливает ее"""
+        check = self.checks.get(name)
+        if check:
+            check.enabled = enabled
+            check.has_value = False
+            self._snap(check)
+
+    def boost(self, names=None):
+        """Сбрасывает интервал до минимального и ставит проверку в очередь сейчас"""
+        for name in (self.checks if names is None else names):
+            check = self.checks.get(name)
+            if check:
+                self._snap(check)
+
+    def _snap(self, check):
+        check.interval = check.min_interval
+        check.next_due = self.clock()
+        # После действия пользователя переход вероятен - не замедляемся сразу
+        check.hold_until = check.next_due + self.boost_hold
+
+    def due(self):
+        """Возвращает проверки, время которых пришло, и планирует следующий запуск"""
+        now = self.clock()
+        due = [c for c in self.checks.values() if c.enabled and c.next_due <= now]
+        for check in due:
+            check.started = now
+            check.next_due = now + check.interval
+        return due
+
+    def next_due(self):
+        """Ближайшее время запуска среди включенных проверок или None"""
+        return min((c.next_due for c in self.checks.values() if c.enabled), default=None)
+
+    def record(self, check, value, elapsed):
+        """Учитывает результат проверки и подстраивает интервал; True - результат изменился"""
+        changed = not check.has_value or value != check.value
+        # boost во время выполнения уже передвинул next_due - его не трогаем
+        untouched = check.next_due == check.started + check.interval
+        check.value = value
+        check.has_value = True
+
+        check.stats['ticks'] += 1
+        check.stats['busy_ms'] += elapsed * 1000
+        check.stats['last_ms'] = elapsed * 1000
+
+        if changed:
+            check.stats['changes'] += 1
+            check.interval = check.min_interval
+        elif self.clock() >= check.hold_until:
+            check.interval = min(check.interval * self.backoff, check.max_interval)
+        if untouched:
+            check.next_due = check.started + check.interval
+        return changed
+
+    def stats(self):
+        """Счетчики по каждой проверке для окна отладки"""
+        return [{
+            'name': check.name,
+            'enabled': check.enabled,
+            'interval_ms': round(check.interval * 1000),
+            'min_ms': round(check.min_interval * 1000),
+            'max_ms': round(check.max_interval * 1000),
+            'ticks': check.stats['ticks'],
+            'changes': check.stats['changes'],
+            'avg_ms': check.stats['busy_ms'] / check.stats['ticks'] if check.stats['ticks'] else 0.0,
+            'busy_ms': check.stats['busy_ms']
+        } for check in self.checks.values()]
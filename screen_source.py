@@ -0,0 +1,261 @@
+import os
+import sys
+import ctypes
+import logging
+import threading
+from ctypes import wintypes
+
+import numpy as np
+from PIL import Image
+
+
+class ScreenSource:
+    """Базовый источник изображения экрана"""
+
+    name = 'base'
+
+    def grab(self, region):
+        """Возвращает область экрана (left, top, width, height) как массив RGB"""
+        raise NotImplementedError
+
+    def grab_image(self, region):
+        """Возвращает область экрана как PIL Image"""
+        return Image.fromarray(np.ascontiguousarray(self.grab(region)))
+
+    def pixel(self, x, y):
+        """Возвращает цвет пикселя (r, g, b)"""
+        r, g, b = self.grab((x, y, 1, 1))[0, 0]
+        return (int(r), int(g), int(b))
+
+    def begin_tick(self):
+        """Вызывается перед снимком очередного тика проверок"""
+        pass
+
+    def close(self):
+        """Освобождает ресурсы источника"""
+        pass
+
+
+class PyAutoGuiScreenSource(ScreenSource):
+    """Захват через pyautogui.screenshot"""
+
+    name = 'pyautogui'
+
+    def grab(self, region):
+        import pyautogui
+        screenshot = pyautogui.screenshot(region=tuple(int(v) for v in region))
+        return np.asarray(screenshot.convert('RGB'))
+
+
+class BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ('biSize', wintypes.DWORD),
+        ('biWidth', wintypes.LONG),
+        ('biHeight', wintypes.LONG),
+        ('biPlanes', wintypes.WORD),
+        ('biBitCount', wintypes.WORD),
+        ('biCompression', wintypes.DWORD),
+        ('biSizeImage', wintypes.DWORD),
+        ('biXPelsPerMeter', wintypes.LONG),
+        ('biYPelsPerMeter', wintypes.LONG),
+        ('biClrUsed', wintypes.DWORD),
+        ('biClrImportant', wintypes.DWORD),
+    ]
+
+
+class GdiScreenSource(ScreenSource):
+    """Захват через GDI: контекст экрана и совместимый битмап живут между захватами"""
+
+    name = 'gdi'
+
+    SRCCOPY = 0x00CC0020
+    DIB_RGB_COLORS = 0
+    BI_RGB = 0
+
+    def __init__(self):
+        self.user32 = ctypes.windll.user32
+        self.gdi32 = ctypes.windll.gdi32
+        self._setup_prototypes()
+
+        self._screen_dc = self.user32.GetDC(None)
+        self._memory_dc = self.gdi32.CreateCompatibleDC(self._screen_dc)
+        self._bitmap = None
+        self._previous_bitmap = None
+        self._size = (0, 0)
+        self._buffer = None
+        self._info = BITMAPINFOHEADER()
+        # Контексты общие, поэтому захваты из разных потоков идут по очереди
+        self._lock = threading.Lock()
+
+    def _setup_prototypes(self):
+        """Задает типы аргументов, чтобы дескрипторы не обрезались на x64"""
+        user32, gdi32 = self.user32, self.gdi32
+        user32.GetDC.argtypes = [wintypes.HWND]
+        user32.GetDC.restype = wintypes.HDC
+        user32.ReleaseDC.argtypes = [wintypes.HWND, wintypes.HDC]
+        gdi32.CreateCompatibleDC.argtypes = [wintypes.HDC]
+        gdi32.CreateCompatibleDC.restype = wintypes.HDC
+        gdi32.CreateCompatibleBitmap.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int]
+        gdi32.CreateCompatibleBitmap.restype = wintypes.HBITMAP
+        gdi32.SelectObject.argtypes = [wintypes.HDC, wintypes.HGDIOBJ]
+        gdi32.SelectObject.restype = wintypes.HGDIOBJ
+        gdi32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+        gdi32.DeleteDC.argtypes = [wintypes.HDC]
+        gdi32.BitBlt.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                 wintypes.HDC, ctypes.c_int, ctypes.c_int, wintypes.DWORD]
+        gdi32.GetDIBits.argtypes = [wintypes.HDC, wintypes.HBITMAP, wintypes.UINT, wintypes.UINT,
+                                    ctypes.c_void_p, ctypes.c_void_p, wintypes.UINT]
+
+    def _ensure_bitmap(self, width, height):
+        """Пересоздает битмап только при смене размера области"""
+        if self._size == (width, height):
+            return
+
+        self._release_bitmap()
+        self._bitmap = self.gdi32.CreateCompatibleBitmap(self._screen_dc, width, height)
+        self._previous_bitmap = self.gdi32.SelectObject(self._memory_dc, self._bitmap)
+        self._size = (width, height)
+        self._buffer = np.empty((height, width, 4), dtype=np.uint8)
+
+        self._info.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+        self._info.biWidth = width
+        self._info.biHeight = -height  # Строки сверху вниз
+        self._info.biPlanes = 1
+        self._info.biBitCount = 32
+        self._info.biCompression = self.BI_RGB
+
+    def _release_bitmap(self):
+        if self._bitmap:
+            self.gdi32.SelectObject(self._memory_dc, self._previous_bitmap)
+            self.gdi32.DeleteObject(self._bitmap)
+        self._bitmap = None
+        self._size = (0, 0)
+
+    def grab(self, region):
+        left, top, width, height = (int(v) for v in region)
+        with self._lock:
+            self._ensure_bitmap(width, height)
+
+            self.gdi32.BitBlt(self._memory_dc, 0, 0, width, height,
+                              self._screen_dc, left, top, self.SRCCOPY)
+            lines = self.gdi32.GetDIBits(self._memory_dc, self._bitmap, 0, height,
+                                         self._buffer.ctypes.data, ctypes.byref(self._info),
+                                         self.DIB_RGB_COLORS)
+            if lines != height:
+                raise OSError(f"GetDIBits вернул {lines} строк из {height}")
+
+            # BGRA -> RGB
+            return self._buffer[..., 2::-1].copy()
+
+    def close(self):
+        with self._lock:
+            self._release_bitmap()
+        if self._memory_dc:
+            self.gdi32.DeleteDC(self._memory_dc)
+            self._memory_dc = None
+        if self._screen_dc:
+            self.user32.ReleaseDC(None, self._screen_dc)
+            self._screen_dc = None
+
+
+class FileScreenSource(ScreenSource):
+    """Кадры из сохраненных скриншотов (проверка без экрана и повтор записи)
+
+    С advance_on_tick каждый тик проверок берет следующий кадр записи (повтор в приложении);
+    без него кадр переключает next_frame (бенчмарки).
+    """
+
+    name = 'file'
+
+    def __init__(self, paths, loop=True, advance_on_tick=False):
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        self.paths = list(paths)
+        if not self.paths:
+            raise ValueError("Нет кадров для файлового источника")
+        self.loop = loop
+        self.advance_on_tick = advance_on_tick
+        self.frames = [np.asarray(Image.open(path).convert('RGB')) for path in self.paths]
+        self.index = 0
+        self._ticks = 0
+
+    @property
+    def image(self):
+        return self.frames[self.index]
+
+    def next_frame(self):
+        """Переходит к следующему кадру записи"""
+        if self.index + 1 < len(self.frames):
+            self.index += 1
+        elif self.loop:
+            self.index = 0
+        return self.image
+
+    def begin_tick(self):
+        # Первый тик показывает первый кадр
+        if self.advance_on_tick and self._ticks:
+            self.next_frame()
+        self._ticks += 1
+
+    def grab(self, region):
+        """Вырезает область из текущего кадра, за границами - черные пиксели"""
+        left, top, width, height = (int(v) for v in region)
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+
+        img_height, img_width = self.image.shape[:2]
+        src_left, src_top = max(0, left), max(0, top)
+        src_right = min(img_width, left + width)
+        src_bottom = min(img_height, top + height)
+
+        if src_right > src_left and src_bottom > src_top:
+            frame[src_top - top:src_bottom - top, src_left - left:src_right - left] = \
+                self.image[src_top:src_bottom, src_left:src_right]
+        return frame
+
+
+def _replay_paths(replay):
+    """Список PNG для файлового источника: файл или папка со скриншотами"""
+    if os.path.isdir(replay):
+        return [os.path.join(replay, name) for name in sorted(os.listdir(replay))
+                if name.lower().endswith(('.png', '.bmp', '.jpg'))]
+    return [replay]
+
+
+def load_backend_settings(app_settings):
+    """screen_backend и screen_replay из настроек app_settings.json"""
+    return app_settings.get('screen_backend', 'auto'), app_settings.get('screen_replay')
+
+
+def create_screen_source(backend=None, settings=None, replay=None):
+    """Создает источник по имени: auto, gdi, pyautogui или file
+
+    Если имя не задано, оно берется из настроек app_settings.json (settings).
+    auto выбирает GDI на Windows и pyautogui в остальных случаях. file повторяет
+    запись replay (файл или папка) по кадру на тик; без записи - ValueError.
+    """
+    if backend is None:
+        backend, settings_replay = load_backend_settings(settings or {})
+        replay = replay or settings_replay
+
+    if backend == 'file':
+        # Ошибка настройки повтора не подменяется захватом настоящего экрана
+        if not replay or not os.path.exists(replay):
+            raise ValueError(f"Для источника file нужна запись screen_replay (файл или папка), задано: {replay!r}")
+        return FileScreenSource(_replay_paths(replay), advance_on_tick=True)
+
+    try:
+        if backend == 'gdi' or (backend == 'auto' and sys.platform == 'win32'):
+            return GdiScreenSource()
+        if backend not in ('auto', 'pyautogui'):
+            logging.warning(f"Неизвестный источник захвата {backend}, используется pyautogui")
+    except Exception as e:
+        logging.error(f"Ошибка создания источника захвата {backend}: {e}")
+
+    return PyAutoGuiScreenSource()
+
+
+BACKENDS = {
+    'gdi': GdiScreenSource,
+    'pyautogui': PyAutoGuiScreenSource,
+    'file': FileScreenSource,
+}
@@ -0,0 +1,226 @@
+import time
+import logging
+import threading
+from collections import deque
+
+from PyQt6.QtCore import QCoreApplication
+
+from . import input_plan
+from .input_plan import PASTE_SETTLE_MS
+
+
+class TokenBucket:
+    """Ограничение rate сообщений за per секунд
+
+    Корзина вмещает burst жетонов и пополняется на rate жетонов за per секунд.
+    В любом окне per секунд проходит не больше burst + rate - 1 сообщений,
+    поэтому при burst=1 лимит соблюдается строго. Жетон берется только
+    в момент отправки, так что дрожание таймера не сжимает интервалы.
+    """
+
+    def __init__(self, rate=3, per=2.0, burst=1, clock=time.monotonic):
+        self.rate = max(1, int(rate))
+        self.per = max(0.001, float(per))
+        self.burst = max(1, int(burst))
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate / self.per)
+        self._updated = now
+
+    def delay(self):
+        """Секунды до появления жетона, не забирая его; 0 - жетон есть"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.per / self.rate
+
+    def acquire(self):
+        """Берет жетон и возвращает 0; если жетона нет - секунды до следующего"""
+        delay = self.delay()
+        if delay == 0:
+            self.tokens -= 1
+        return delay
+
+
+class SendQueue:
+    """Очередь чат-команд поверх потока ввода
+
+    Одинаковые команды для одной цели в пределах dedupe_window секунд
+    отбрасываются (двойной клик). Для каждой цели действует ограничение
+    rate сообщений за per секунд (см. TokenBucket). Команды ждут жетон
+    здесь, а не в потоке ввода: задание ставится в поток, когда жетон
+    появился, поэтому ответы и клики не стоят за ожиданием лимита, а буфер
+    обмена занимается только на время самой отправки. Для каждой цели
+    в потоке ввода не больше одной команды, так что порядок сохраняется.
+    """
+
+    def __init__(self, worker, rate=3, per=2.0, burst=1, dedupe_window=1.0, history=50,
+                 clock=time.monotonic):
+        self.worker = worker
+        self.rate = rate
+        self.per = per
+        self.burst = burst
+        self.dedupe_window = dedupe_window
+        self.clock = clock
+
+        self._buckets = {}
+        self._last_submit = {}
+        self._last_paste = 0.0
+        self._pending = {}
+        self._in_flight = set()
+        self._timers = {}
+        self._stopped = False
+        self._lock = threading.Lock()
+        self.depth = 0
+        self.history = deque(maxlen=history)
+        self.stats = {
+            'submitted': 0,
+            'deduped': 0,
+            'rejected': 0,
+            'sent': 0,
+            'max_depth': 0
+        }
+
+        app = QCoreApplication.instance()
+        if app:
+            app.aboutToQuit.connect(self.stop)
+
+    def submit(self, command, target='chat', name=None):
+        """Ставит команду в очередь; True - принята, None - повтор или очередь остановлена"""
+        key = (target, command)
+        now = self.clock()
+        with self._lock:
+            if self._stopped:
+                return None
+            last = self._last_submit.get(key)
+            if last is not None and now - last < self.dedupe_window:
+                self.stats['deduped'] += 1
+                logging.info(f"Повтор команды {command} отброшен")
+                return None
+            self._last_submit[key] = now
+            self._pending.setdefault(target, deque()).append((name or command, command, now))
+            self.depth += 1
+            self.stats['submitted'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], self.depth)
+
+        self._pump(target)
+        return True
+
+    def _pump(self, target):
+        """Передает первую команду цели в поток ввода, если жетон есть; иначе ставит таймер"""
+        while True:
+            with self._lock:
+                pending = self._pending.get(target)
+                if self._stopped or not pending or target in self._in_flight or target in self._timers:
+                    return
+                delay = self._bucket(target).delay()
+                if delay > 0:
+                    timer = threading.Timer(delay, self._on_timer, (target,))
+                    timer.daemon = True
+                    self._timers[target] = timer
+                    timer.start()
+                    return
+                name, command, queued = pending.popleft()
+                self._in_flight.add(target)
+
+            job_id = self.worker.submit(name, self._send, name, command, target, queued, self.clock())
+            if job_id is not None:
+                return
+            with self._lock:
+                self._in_flight.discard(target)
+                self.depth -= 1
+                self.stats['rejected'] += 1
+                # Отклоненная команда не должна глушить повторный клик
+                self._last_submit.pop((target, command), None)
+
+    def _on_timer(self, target):
+        with self._lock:
+            self._timers.pop(target, None)
+        self._pump(target)
+
+    def _bucket(self, target):
+        bucket = self._buckets.get(target)
+        if bucket is None:
+            bucket = self._buckets[target] = TokenBucket(self.rate, self.per, self.burst, self.clock)
+        return bucket
+
+    def _send(self, sink, name, command, target, queued, scheduled):
+        """Задание потока ввода: жетон, буфер, вставка и Enter"""
+        started = self.clock()
+        with self._lock:
+            # Жетон берется в момент отправки; если его уже нет, команда ждет следующий
+            taken = self._bucket(target).acquire() == 0
+            if not taken:
+                self._pending.setdefault(target, deque()).appendleft((name, command, queued))
+                self._in_flight.discard(target)
+        if not taken:
+            self._pump(target)
+            return None
+
+        try:
+            # Окно читает буфер при обработке прошлого Ctrl+V - даем ему время
+            settle = PASTE_SETTLE_MS / 1000 - (self.clock() - self._last_paste)
+            if settle > 0:
+                sink.sleep(settle)
+            sink.set_clipboard(command)
+            sent_at = self.clock()
+            input_plan.execute(input_plan.command_plan(), sink)
+            self._last_paste = self.clock()
+        finally:
+            with self._lock:
+                self.depth -= 1
+                self._in_flight.discard(target)
+            self._pump(target)
+
+        entry = {
+            'command': command,
+            'target': target,
+            'queue_ms': (started - scheduled) * 1000,
+            'wait_ms': (scheduled - queued) * 1000,
+            'sent_at': sent_at
+        }
+        with self._lock:
+            self.stats['sent'] += 1
+            self.history.append(entry)
+        logging.info(f"Отправлена команда: {command}")
+        return entry
+
+    def stop(self):
+        """Отменяет таймеры и отбрасывает команды, которые еще ждут жетон"""
+        with self._lock:
+            self._stopped = True
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+            dropped = sum(len(pending) for pending in self._pending.values())
+            self._pending.clear()
+            self.depth -= dropped
+
+    def metrics(self):
+        """Глубина очереди, ожидание жетона (wait_ms) и потока ввода (queue_ms) по последним отправкам"""
+        with self._lock:
+            waits = [entry['wait_ms'] for entry in self.history]
+            queued = [entry['queue_ms'] for entry in self.history]
+            return dict(self.stats,
+                        depth=self.depth,
+                        wait_ms_avg=sum(waits) / len(waits) if waits else 0.0,
+                        wait_ms_max=max(waits, default=0.0),
+                        queue_ms_avg=sum(queued) / len(queued) if queued else 0.0)
+
+
+def load_send_queue_settings(app_settings):
+    """chat_rate_limit, chat_rate_period, chat_rate_burst и chat_dedupe_window
+    из настроек app_settings.json"""
+    settings = {'rate': 3, 'per': 2.0, 'burst': 1, 'dedupe_window': 1.0}
+    try:
+        settings['rate'] = int(app_settings.get('chat_rate_limit', settings['rate']))
+        settings['per'] = float(app_settings.get('chat_rate_period', settings['per']))
+        settings['burst'] = int(app_settings.get('chat_rate_burst', settings['burst']))
+        settings['dedupe_window'] = float(app_settings.get('chat_dedupe_window', settings['dedupe_window']))
+    except Exception as e:
+        logging.error(f"Ошибка чтения настроек очереди команд: {e}")
+    return settings
@@ -0,0 +1,137 @@
+import os
+import sys
+import copy
+import json
+import logging
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+try:
+    from .config_writer import ConfigWriter
+except ImportError:
+    # Запуск как отдельного скрипта (printet.py)
+    from config_writer import ConfigWriter
+
+
+# Файлы настроек в scripts/settings; .json разбираются, остальные читаются как текст
+SETTINGS_FILES = (
+    'app_settings.json',
+    'color_settings.json',
+    'chat_detection_settings.json',
+    'hotkey_settings.json',
+    'main_size_settings.json',
+    'chat_size_settings.json',
+    'button_width.cfg',
+)
+
+
+def get_base_path():
+    """Возвращает правильный базовый путь для всех режимов работы"""
+    if getattr(sys, 'frozen', False):
+        # Режим EXE - берем папку, где лежит исполняемый файл
+        return os.path.dirname(sys.executable)
+    else:
+        # Режим разработки - берем папку проекта (ATools)
+        return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_settings_dir():
+    """Папка scripts/settings для всех модулей"""
+    return os.path.join(get_base_path(), "scripts", "settings")
+
+
+class SettingsStore(QObject):
+    """Настройки приложения в памяти
+
+    При первом обращении папка настроек просматривается один раз, и каждый
+    известный файл разбирается один раз. Дальше чтение идет из памяти: get
+    отдает копию, чтобы изменения вызывающего не попадали в кэш. Запись
+    обновляет кэш, уходит в ConfigWriter и сообщается сигналом changed(имя файла, содержимое).
+    """
+
+    changed = pyqtSignal(str, object)
+
+    def __init__(self, settings_dir=None, writer=None, parent=None):
+        super().__init__(parent)
+        self.settings_dir = settings_dir or get_settings_dir()
+        self.writer = writer or ConfigWriter()
+        self._data = {}
+        self._loaded = False
+        self.stats = {
+            'scans': 0,
+            'parses': 0,
+            'errors': 0,
+            'writes': 0
+        }
+
+    def path(self, name):
+        """Полный путь к файлу настроек"""
+        return os.path.join(self.settings_dir, name)
+
+    def load(self):
+        """Читает все известные файлы папки настроек"""
+        self._loaded = True
+        try:
+            os.makedirs(self.settings_dir, exist_ok=True)
+            with os.scandir(self.settings_dir) as entries:
+                files = [entry for entry in entries if entry.name in SETTINGS_FILES and entry.is_file()]
+            self.stats['scans'] += 1
+        except Exception as e:
+            logging.error(f"Ошибка чтения папки настроек {self.settings_dir}: {e}")
+            return
+
+        for entry in files:
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                self._data[entry.name] = json.loads(text) if entry.name.endswith('.json') else text.strip()
+                self.stats['parses'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                logging.error(f"Ошибка чтения настроек {entry.name}: {e}")
+
+    def get(self, name, default=None):
+        """Содержимое файла настроек или default, если файла нет"""
+        if not self._loaded:
+            self.load()
+        if name not in self._data:
+            return default
+        return copy.deepcopy(self._data[name])
+
+    def section(self, name):
+        """Содержимое JSON-файла как словарь; пустой словарь, если файла нет или он не словарь"""
+        value = self.get(name)
+        return value if isinstance(value, dict) else {}
+
+    def set(self, name, value):
+        """Заменяет содержимое файла настроек и ставит его запись"""
+        if not self._loaded:
+            self.load()
+        self._data[name] = copy.deepcopy(value)
+        if name.endswith('.json'):
+            self.writer.write_json(self.path(name), self._data[name], indent=2, ensure_ascii=False)
+        else:
+            self.writer.write_text(self.path(name), str(value))
+        self.stats['writes'] += 1
+        self.changed.emit(name, copy.deepcopy(value))
+
+    def update(self, name, values):
+        """Меняет ключи JSON-файла, сохраняя остальные"""
+        settings = self.section(name)
+        settings.update(values)
+        self.set(name, settings)
+
+    def metrics(self):
+        """Просмотры папки, разобранные файлы, ошибки чтения и записи"""
+        return dict(self.stats, files=sorted(self._data))
+
+
+_store = None
+
+
+def get_settings_store():
+    """Общее хранилище настроек процесса"""
+    global _store
+    if _store is None:
+        _store = SettingsStore()
+    return _store
@@ -0,0 +1,128 @@
+import time
+import logging
+
+from . import input_plan
+from .input_plan import InputPlan
+
+
+# Способы ввода ответа: автоматически, через буфер обмена или набором символов
+INJECTION_MODES = ('auto', 'paste', 'type')
+
+# Короче этого ответы набираются символами, длиннее - вставляются
+TYPE_THRESHOLD = 64
+
+
+def choose_injection_mode(text, mode='auto', threshold=TYPE_THRESHOLD):
+    """Выбирает 'paste' или 'type' для ответа"""
+    if mode in ('paste', 'type'):
+        return mode
+    # Перевод строки при наборе сработал бы как Enter
+    if len(text) < threshold and '\n' not in text and '\r' not in text:
+        return 'type'
+    return 'paste'
+
+
+def wait_clipboard_change(sink, sequence, timeout=0.1, step=0.005):
+    """Ждет, пока окно положит скопированный текст в буфер (не дольше timeout)"""
+    if sequence is None:
+        sink.sleep(timeout)
+        return False
+    deadline = time.perf_counter() + timeout
+    while sink.clipboard_sequence() == sequence:
+        if time.perf_counter() >= deadline:
+            return False
+        sink.sleep(step)
+    return True
+
+
+def read_field_text(sink, before=None):
+    """Копирует содержимое поля ввода (Ctrl+A, Ctrl+C) и возвращает его
+
+    before - план, который отправляется тем же пакетом перед копированием.
+    """
+    sequence = sink.clipboard_sequence()
+    plan = InputPlan().extend(before) if before else InputPlan()
+    input_plan.execute(plan.extend(input_plan.select_copy_plan()), sink)
+    wait_clipboard_change(sink, sequence)
+
+    inserted_text = sink.get_clipboard()
+    # Скопированный текст тоже наш: восстановлению сессии он не мешает
+    sink.clipboard_session.touch()
+    return inserted_text
+
+
+def texts_match(expected_text, inserted_text):
+    """Сравнение без учета регистра и пробелов по краям"""
+    return inserted_text.strip().lower() == expected_text.strip().lower()
+
+
+def send_response(sink, text, click_point, auto_enter=False, verifier=None):
+    """Вставляет ответ в поле ввода по точке click_point и при необходимости отправляет
+
+    verifier проверяет вставку до Enter; без него ответ уходит без проверки.
+    """
+    # Раскладка берется из кэша; переключаем явно и только если она не английская.
+    # Раскладку пользователя поток ввода вернет после серии отправок
+    if sink.layout and sink.layout.switch_to_english():
+        logging.info("Раскладка клавиатуры не английская - переключаем")
+
+    # Прежнее содержимое буфера вернет сессия после серии отправок
+    sink.set_clipboard(text)
+
+    # Клик по полю ввода с возвратом курсора на место
+    sink.pointer.click(click_point)
+
+    paste = input_plan.paste_plan()
+    verified = None
+    if verifier:
+        # Вставка и копирование для проверки уходят одним пакетом
+        verified = verifier.check(sink, text, before=paste)
+    else:
+        input_plan.execute(paste, sink)
+    input_plan.execute(input_plan.finish_plan(auto_enter), sink)
+
+    return {'verified': verified}
+
+
+def type_response(sink, text, click_point, auto_enter=False):
+    """Набирает ответ символами Unicode: без буфера обмена и переключения раскладки"""
+    sink.pointer.click(click_point)
+
+    input_plan.execute(input_plan.type_plan(text, auto_enter), sink)
+    return {'verified': None}
+
+
+def send_text(sink, text, click_point, auto_enter=False, mode='auto', verifier=None):
+    """Отправляет ответ способом mode ('auto', 'paste' или 'type')"""
+    if choose_injection_mode(text, mode) == 'type':
+        return type_response(sink, text, click_point, auto_enter)
+    return send_response(sink, text, click_point, auto_enter, verifier)
+
+
+def send_command(sink, command):
+    """Вставляет чат-команду и отправляет ее Enter
+
+    Enter и возврат прежнего буфера - только после паузы PASTE_SETTLE_MS:
+    иначе окно может прочитать при вставке уже другой буфер.
+    """
+    sink.set_clipboard(command)
+    input_plan.execute(input_plan.command_plan(), sink)
+
+    logging.info(f"Отправлена команда: {command}")
+    return {'command': command}
+
+
+def send_to_window(sink, text, title="RAGE Multiplayer"):
+    """Активирует окно title и вставляет в него текст"""
+    sink.set_clipboard(text)
+
+    plan = input_plan.paste_plan()
+    try:
+        if sink.activate_window(title):
+            # Окну нужно время принять фокус до вставки
+            plan = InputPlan().wait(200).extend(plan)
+    except Exception as e:
+        logging.info(f"Ошибка активации окна: {e}")
+
+    input_plan.execute(plan, sink)
+    return {'window': title}
@@ -0,0 +1,254 @@
+import sys
+import ctypes
+import logging
+from ctypes import wintypes
+
+from PyQt6.QtCore import QObject, QCoreApplication, pyqtSignal
+
+
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+EVENT_OBJECT_NAMECHANGE = 0x800C
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+OBJID_WINDOW = 0
+CHILDID_SELF = 0
+
+
+class WindowEventSource:
+    """Источник событий окон: уведомления и запросы о состоянии окна"""
+
+    def start(self, callback):
+        """Начинает доставку событий callback(event, hwnd)"""
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def watch_process(self, pid):
+        """Ограничивает события перемещения и смены заголовка окнами процесса pid"""
+        pass
+
+    def get_foreground(self):
+        raise NotImplementedError
+
+    def get_rect(self, hwnd):
+        raise NotImplementedError
+
+    def get_title(self, hwnd):
+        raise NotImplementedError
+
+    def get_process(self, hwnd):
+        return 0
+
+
+class WinEventHookSource(WindowEventSource):
+    """События SetWinEventHook; доставляются в поток с циклом сообщений, который их установил"""
+
+    # WINFUNCTYPE есть только на Windows; CFUNCTYPE нужен лишь для импорта модуля
+    WinEventProc = getattr(ctypes, 'WINFUNCTYPE', ctypes.CFUNCTYPE)(
+        None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+        wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+    )
+
+    def __init__(self):
+        import win32gui
+        import win32process
+        self.win32gui = win32gui
+        self.win32process = win32process
+
+        self.user32 = ctypes.windll.user32
+        self.user32.SetWinEventHook.argtypes = [
+            wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, self.WinEventProc,
+            wintypes.DWORD, wintypes.DWORD, wintypes.DWORD
+        ]
+        self.user32.SetWinEventHook.restype = wintypes.HANDLE
+        self.user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+
+        self._callback = None
+        # Ссылка на обработчик нужна, пока хуки установлены
+        self._proc = self.WinEventProc(self._on_event)
+        self._foreground_hook = None
+        self._location_hook = None
+        self._watched_pid = None
+
+    def _on_event(self, hook, event, hwnd, id_object, id_child, thread_id, timestamp):
+        # Курсор, каретка и дочерние объекты нам не нужны
+        if id_object != OBJID_WINDOW or id_child != CHILDID_SELF or not hwnd:
+            return
+        try:
+            self._callback(event, hwnd)
+        except Exception as e:
+            logging.error(f"Ошибка обработки события окна: {e}")
+
+    def _hook(self, event, pid=0, event_max=None):
+        return self.user32.SetWinEventHook(event, event_max or event, None, self._proc, pid, 0,
+                                           WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS)
+
+    def start(self, callback):
+        self._callback = callback
+        self._foreground_hook = self._hook(EVENT_SYSTEM_FOREGROUND)
+        if not self._foreground_hook:
+            raise OSError("SetWinEventHook(EVENT_SYSTEM_FOREGROUND) не установлен")
+
+    def watch_process(self, pid):
+        if pid == self._watched_pid:
+            return
+        if self._location_hook:
+            self.user32.UnhookWinEvent(self._location_hook)
+        # Коды перемещения и смены заголовка соседние - один хук на оба
+        self._location_hook = self._hook(EVENT_OBJECT_LOCATIONCHANGE, pid, EVENT_OBJECT_NAMECHANGE)
+        self._watched_pid = pid
+
+    def stop(self):
+        for hook in (self._foreground_hook, self._location_hook):
+            if hook:
+                self.user32.UnhookWinEvent(hook)
+        self._foreground_hook = self._location_hook = None
+        self._watched_pid = None
+
+    def get_foreground(self):
+        return self.win32gui.GetForegroundWindow()
+
+    def get_rect(self, hwnd):
+        return tuple(self.win32gui.GetWindowRect(hwnd))
+
+    def get_title(self, hwnd):
+        return self.win32gui.GetWindowText(hwnd)
+
+    def get_process(self, hwnd):
+        return self.win32process.GetWindowThreadProcessId(hwnd)[1]
+
+
+class FakeWindowEventSource(WindowEventSource):
+    """Ручной источник событий для проверки логики без Windows"""
+
+    def __init__(self, windows=None, foreground=0):
+        # hwnd -> {'rect': (left, top, right, bottom), 'title': str, 'pid': int}
+        self.windows = dict(windows or {})
+        self.foreground = foreground
+        self.watched_pid = None
+        self._callback = None
+
+    def start(self, callback):
+        self._callback = callback
+
+    def stop(self):
+        self._callback = None
+
+    def watch_process(self, pid):
+        self.watched_pid = pid
+
+    def set_foreground(self, hwnd):
+        """Имитирует переключение на окно hwnd"""
+        self.foreground = hwnd
+        if self._callback:
+            self._callback(EVENT_SYSTEM_FOREGROUND, hwnd)
+
+    def move(self, hwnd, rect):
+        """Имитирует перемещение или изменение размера окна"""
+        self.windows.setdefault(hwnd, {})['rect'] = tuple(rect)
+        pid = self.get_process(hwnd)
+        if self._callback and (self.watched_pid is None or self.watched_pid == pid):
+            self._callback(EVENT_OBJECT_LOCATIONCHANGE, hwnd)
+
+    def rename(self, hwnd, title):
+        """Имитирует смену заголовка окна"""
+        self.windows.setdefault(hwnd, {})['title'] = title
+        pid = self.get_process(hwnd)
+        if self._callback and (self.watched_pid is None or self.watched_pid == pid):
+            self._callback(EVENT_OBJECT_NAMECHANGE, hwnd)
+
+    def get_foreground(self):
+        return self.foreground
+
+    def get_rect(self, hwnd):
+        return self.windows.get(hwnd, {}).get('rect', (0, 0, 0, 0))
+
+    def get_title(self, hwnd):
+        return self.windows.get(hwnd, {}).get('title', '')
+
+    def get_process(self, hwnd):
+        return self.windows.get(hwnd, {}).get('pid', 0)
+
+
+def create_window_event_source():
+    """SetWinEventHook на Windows, иначе None (трекер остается пустым)"""
+    if sys.platform != 'win32':
+        return None
+    try:
+        return WinEventHookSource()
+    except Exception as e:
+        logging.error(f"Ошибка создания источника событий окон: {e}")
+        return None
+
+
+class WindowTracker(QObject):
+    """Активное окно, его заголовок и прямоугольник по событиям системы, без опроса"""
+
+    foreground_changed = pyqtSignal(int, str)
+    geometry_changed = pyqtSignal(int, object)
+    title_changed = pyqtSignal(int, str)
+
+    def __init__(self, source=None, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.current_hwnd = 0
+        self.current_title = ''
+        self.current_rect = None
+
+        app = QCoreApplication.instance()
+        if app:
+            app.aboutToQuit.connect(self.stop)
+
+    def start(self):
+        """Подписывается на события и берет текущее активное окно"""
+        if not self.source:
+            return
+        try:
+            self.source.start(self.handle_event)
+            self._set_foreground(self.source.get_foreground())
+        except Exception as e:
+            logging.error(f"Ошибка запуска отслеживания окон: {e}")
+
+    def stop(self):
+        if self.source:
+            self.source.stop()
+
+    def size(self):
+        """Размер активного окна (ширина, высота) или None"""
+        rect = self.current_rect
+        if not rect:
+            return None
+        return (rect[2] - rect[0], rect[3] - rect[1])
+
+    def handle_event(self, event, hwnd):
+        if event == EVENT_SYSTEM_FOREGROUND:
+            self._set_foreground(hwnd)
+        elif event == EVENT_OBJECT_LOCATIONCHANGE and hwnd == self.current_hwnd:
+            self._update_rect()
+        elif event == EVENT_OBJECT_NAMECHANGE and hwnd == self.current_hwnd:
+            self._update_title()
+
+    def _set_foreground(self, hwnd):
+        if not hwnd:
+            return
+        changed = hwnd != self.current_hwnd
+        self.current_hwnd = hwnd
+        self.current_title = self.source.get_title(hwnd)
+        self.source.watch_process(self.source.get_process(hwnd))
+        if changed:
+            self.foreground_changed.emit(hwnd, self.current_title)
+        self._update_rect()
+
+    def _update_title(self):
+        title = self.source.get_title(self.current_hwnd)
+        if title != self.current_title:
+            self.current_title = title
+            self.title_changed.emit(self.current_hwnd, title)
+
+    def _update_rect(self):
+        rect = self.source.get_rect(self.current_hwnd)
+        if rect != self.current_rect:
+            self.current_rect = rect
+            self.geometry_changed.emit(self.current_hwnd, rect)
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def evaluate_zone(zone, target_color, tolerance, min_matches_required, check_step):
+    """Проверяет цветовую зону чата векторно по массиву RGB (высота x ширина x 3)
+
+    Повторяет логику ChatExecutor.check_chat_zone: точки берутся с шагом check_step,
+    совпадение - покомпонентный допуск, евклидово расстояние или яркость,
+    порог совпадений зависит от средней уверенности.
+    """
+    step = max(1, int(check_step))
+    # Порядок обхода как в исходном цикле: сначала x, затем y
+    points = np.swapaxes(np.asarray(zone)[::step, ::step, :3], 0, 1).reshape(-1, 3).astype(np.int32)
+    target = np.asarray(target_color[:3], dtype=np.int32)
+
+    diff = points - target
+    abs_diff = np.abs(diff)
+
+    simple_match = (abs_diff <= tolerance).all(axis=1)
+    euclidean_match = np.sqrt((diff * diff).sum(axis=1)) <= tolerance * 1.7
+    brightness_match = np.abs(points.sum(axis=1) / 3 - int(target.sum()) / 3) <= tolerance
+    matched = simple_match | euclidean_match | brightness_match
+
+    matches_found = int(np.count_nonzero(matched))
+    total_checked = len(points)
+
+    if matches_found:
+        max_deviation = abs_diff[matched].max(axis=1)
+        confidence_scores = np.maximum(0, 100 - (max_deviation * 100 / tolerance))
+        # Суммируем последовательно, чтобы порог совпадал с прежним до бита
+        avg_confidence = sum(confidence_scores.tolist()) / matches_found
+        dynamic_threshold = max(1, int(min_matches_required * (1 - avg_confidence / 100)))
+    else:
+        avg_confidence = 0
+        dynamic_threshold = min_matches_required
+
+    return {
+        'result': matches_found >= dynamic_threshold,
+        'matches': matches_found,
+        'checked': total_checked,
+        'threshold': dynamic_threshold,
+        'confidence': avg_confidence
+    }